@@ -0,0 +1,58 @@
+#!/usr/bin/env python3
+"""
+Usage:
+  python benchmarks/bench_formatter.py [--sections 300] [--rounds 5]
+
+Compares html_to_markdown engines on a large reference-style page (headings,
+nested lists, a long code block and a big table):
+- markdownify: clean + str() + re-parse + markdownify (the original path)
+- native:      single walk over the already-parsed node
+"""
+import argparse
+import time
+
+from bs4 import BeautifulSoup
+
+from wikiscrapper.formatter import html_to_markdown
+from wikiscrapper.pipeline import choose_parser
+
+def make_page(sections: int) -> bytes:
+    body = "".join(
+        f"<h2>Section {i}</h2><p>Paragraph {i} with <code>inline_code</code> and "
+        f'<a href="https://example.com/{i}">a link</a>. More text_{i} and *stars*.</p>'
+        for i in range(sections)
+    )
+    items = "".join(f"<li>Item {i} <strong>bold</strong><ul><li>sub {i}</li></ul></li>" for i in range(sections))
+    code = "\n".join(f"    line_{i} = compute({i}) * 2" for i in range(sections))
+    rows = "".join(
+        f"<tr><td><code>opt_{i}</code></td><td>int</td><td>Option <em>{i}</em> <a href='/o{i}'>docs</a></td></tr>"
+        for i in range(sections)
+    )
+    return (
+        f"<html><body><article>{body}<ul>{items}</ul><pre><code>{code}</code></pre>"
+        f"<table><thead><tr><th>Name</th><th>Type</th><th>Desc</th></tr></thead><tbody>{rows}</tbody></table>"
+        f"</article></body></html>"
+    ).encode("utf-8")
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--sections", type=int, default=300)
+    ap.add_argument("--rounds", type=int, default=5)
+    args = ap.parse_args()
+
+    html = make_page(args.sections)
+    parser = choose_parser()
+    print(f"page: {len(html) / 1024:.0f} KiB, parser={parser}")
+    timings = {}
+    for engine in ("markdownify", "native"):
+        # each round gets a fresh tree: the markdownify path mutates it
+        nodes = [BeautifulSoup(html, parser).select_one("article") for _ in range(args.rounds)]
+        t0 = time.perf_counter()
+        for node in nodes:
+            html_to_markdown(node, engine=engine)
+        timings[engine] = (time.perf_counter() - t0) / args.rounds
+        print(f"{engine:12} {timings[engine] * 1000:.1f} ms/page")
+    print(f"speedup: {timings['markdownify'] / timings['native']:.1f}x")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,64 @@
+#!/usr/bin/env python3
+"""
+Usage:
+  python benchmarks/bench_links.py [--nav 400] [--body 1500] [--pages 50]
+
+Compares link extraction on a large nav-heavy fixture page:
+- before: BeautifulSoup find_all("a") + urljoin + normalize_url per href
+- after:  wikiscrapper.links.LinkExtractor (lxml parser target + memoized normalization)
+Prints links/sec for both.
+"""
+import argparse
+import time
+
+from bs4 import BeautifulSoup
+
+from wikiscrapper.links import LinkExtractor
+from wikiscrapper.pipeline import choose_parser
+from wikiscrapper.utils import normalize_url, ensure_relative_link
+
+def make_page(i: int, nav: int, body: int) -> bytes:
+    nav_html = "".join(f'<li><a href="/docs/section{j % 40}/page{j}">Link {j}</a></li>' for j in range(nav))
+    body_html = "".join(f'<p>Paragraph {j} <a href="../ref{j}.html">ref</a> <code>x = {j}</code></p>' for j in range(body))
+    return (
+        f"<html><head><title>Page {i}</title></head><body><nav><ul>{nav_html}</ul></nav>"
+        f"<main><h1>Page {i}</h1>{body_html}</main></body></html>"
+    ).encode("utf-8")
+
+def baseline(content: bytes, page_url: str, parser: str) -> list:
+    soup = BeautifulSoup(content, parser)
+    links = []
+    for a in soup.find_all("a", href=True):
+        href = a["href"].strip()
+        if href.startswith(("mailto:", "tel:", "javascript:")):
+            continue
+        links.append(normalize_url(ensure_relative_link(page_url, href)))
+    return list(dict.fromkeys(links))
+
+def run(label, fn, pages):
+    total = 0
+    t0 = time.perf_counter()
+    for url, content in pages:
+        total += len(fn(content, url))
+    elapsed = time.perf_counter() - t0
+    print(f"{label:8} {total} links in {elapsed:.3f}s -> {total / elapsed:,.0f} links/sec")
+    return total / elapsed
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--nav", type=int, default=400, help="nav links per page")
+    ap.add_argument("--body", type=int, default=1500, help="body paragraphs (one link each) per page")
+    ap.add_argument("--pages", type=int, default=50)
+    args = ap.parse_args()
+
+    pages = [(f"https://docs.example.com/docs/section{i % 40}/page{i}", make_page(i, args.nav, args.body))
+             for i in range(args.pages)]
+    parser = choose_parser()
+    print(f"{args.pages} pages, {len(pages[0][1]) / 1024:.0f} KiB each, parser={parser}")
+    before = run("before", lambda c, u: baseline(c, u, parser), pages)
+    extractor = LinkExtractor()
+    after = run("after", extractor.extract, pages)
+    print(f"speedup: {after / before:.1f}x")
+
+if __name__ == "__main__":
+    main()
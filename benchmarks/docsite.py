@@ -0,0 +1,79 @@
+"""
+Synthetic documentation site for benchmarks: nav-heavy pages with code blocks
+and tables, served from a local http.server with optional per-request latency.
+
+  from docsite import generate_site, serve
+  generate_site(root, pages=500)
+  with serve(root, latency=0.02) as base_url:
+      ...
+"""
+import contextlib
+import threading
+import time
+from functools import partial
+from http.server import ThreadingHTTPServer, SimpleHTTPRequestHandler
+from pathlib import Path
+
+def page_html(i: int, pages: int, nav: int = 150, paragraphs: int = 20, code_lines: int = 60, table_rows: int = 30) -> str:
+    section = i % 20
+    nav_html = "".join(
+        f'<li><a href="/docs/s{j % 20}/page{j}.html">Page {j}</a></li>' for j in range(max(0, i - nav // 2), min(pages, i + nav // 2))
+    )
+    body = "".join(
+        f"<h2>Topic {i}.{k}</h2><p>Paragraph {k} of page {i} explains <code>option_{k}</code> "
+        f'with a <a href="../s{(i + k) % pages % 20}/page{(i + k) % pages}.html">related page</a> and <em>some</em> detail.</p>'
+        for k in range(paragraphs)
+    )
+    code = "\n".join(f"    result_{k} = client.call('endpoint_{k}', retries={k % 5})" for k in range(code_lines))
+    rows = "".join(
+        f"<tr><td><code>param_{k}</code></td><td>str</td><td>Parameter {k} for page {i}.</td></tr>" for k in range(table_rows)
+    )
+    return (
+        f"<!doctype html><html><head><title>Docs page {i}</title></head><body>"
+        f'<header class="site-header"><a href="/">Home</a></header>'
+        f'<nav class="sidebar"><ul>{nav_html}</ul></nav>'
+        f'<main><article class="docs-content"><h1>Docs page {i}</h1>{body}'
+        f"<pre><code>{code}</code></pre>"
+        f"<table><thead><tr><th>Name</th><th>Type</th><th>Description</th></tr></thead><tbody>{rows}</tbody></table>"
+        f"</article></main><footer>section {section}</footer></body></html>"
+    )
+
+def generate_site(root, pages: int = 200, **weights) -> Path:
+    """Write pages docs/s<N>/page<i>.html (+ index.html, robots.txt) under root."""
+    root = Path(root)
+    for i in range(pages):
+        p = root / "docs" / f"s{i % 20}" / f"page{i}.html"
+        p.parent.mkdir(parents=True, exist_ok=True)
+        p.write_text(page_html(i, pages, **weights), encoding="utf-8")
+    links = "".join(f'<li><a href="/docs/s{i % 20}/page{i}.html">Page {i}</a></li>' for i in range(pages))
+    (root / "index.html").write_text(
+        f"<html><head><title>Docs</title></head><body><main><h1>Docs</h1><ul>{links}</ul></main></body></html>",
+        encoding="utf-8",
+    )
+    (root / "robots.txt").write_text("User-agent: *\nDisallow:\n", encoding="utf-8")
+    return root
+
+class _Handler(SimpleHTTPRequestHandler):
+    latency = 0.0
+
+    def do_GET(self):
+        if self.latency:
+            time.sleep(self.latency)
+        super().do_GET()
+
+    def log_message(self, *args):
+        pass
+
+@contextlib.contextmanager
+def serve(root, latency: float = 0.0):
+    """Serve root on 127.0.0.1 (random port); yields the base URL."""
+    handler = type("LatencyHandler", (_Handler,), {"latency": latency})
+    server = ThreadingHTTPServer(("127.0.0.1", 0), partial(handler, directory=str(root)))
+    server.daemon_threads = True
+    t = threading.Thread(target=server.serve_forever, daemon=True)
+    t.start()
+    try:
+        yield f"http://127.0.0.1:{server.server_address[1]}"
+    finally:
+        server.shutdown()
+        server.server_close()
@@ -0,0 +1,148 @@
+#!/usr/bin/env python3
+"""
+Usage:
+  python benchmarks/run_bench.py [--pages 300] [--latency 0.01] [-c 8] [-w 0]
+                                 [--format md] [--skip-e2e] [--out results.json]
+
+Generates a synthetic doc site (see docsite.py), serves it locally and runs
+core.run_scrape end-to-end against it, plus micro-benchmarks of normalize_url,
+detect_best_selector, html_to_markdown and save_checkpoint. Prints one JSON
+document (pages/sec, CPU time per stage, peak RSS) so runs can be diffed
+across versions.
+"""
+import argparse
+import contextlib
+import io
+import json
+import os
+import platform
+import resource
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent))
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from docsite import generate_site, page_html, serve  # noqa: E402
+
+from wikiscrapper import core  # noqa: E402
+from wikiscrapper.formatter import html_to_markdown  # noqa: E402
+from wikiscrapper.pipeline import parse_html  # noqa: E402
+from wikiscrapper.storage import save_checkpoint  # noqa: E402
+from wikiscrapper.utils import normalize_url, detect_best_selector  # noqa: E402
+
+def peak_rss_mb() -> float:
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # KiB on Linux, bytes on macOS
+    return rss / (1024 * 1024) if sys.platform == "darwin" else rss / 1024
+
+def measure(fn, repeat: int) -> dict:
+    """Wall and CPU time of `repeat` calls of fn."""
+    fn()  # warm-up
+    w0, c0 = time.perf_counter(), time.process_time()
+    for _ in range(repeat):
+        fn()
+    wall, cpu = time.perf_counter() - w0, time.process_time() - c0
+    return {"calls": repeat, "wall_s": round(wall, 6), "cpu_s": round(cpu, 6), "per_call_us": round(wall / repeat * 1e6, 2)}
+
+def micro_benchmarks(pages: int, rounds: int) -> dict:
+    urls = [f"https://Docs.Example.com/docs/s{i % 20}/page{i}.html?b=2&a=1#frag" for i in range(1000)]
+    html = page_html(7, max(pages, 200))
+    soup = parse_html(html.encode("utf-8"))
+    article = soup.select_one("article")
+    visited = [u.split("#")[0] for u in urls] * 20
+    queue = [(u, 1) for u in urls] * 5
+
+    with tempfile.TemporaryDirectory() as tmp:
+        ckpt = str(Path(tmp) / "ckpt.json")
+        return {
+            "normalize_url_x1000": measure(lambda: [normalize_url(u) for u in urls], rounds),
+            "detect_best_selector_html": measure(lambda: detect_best_selector(html), rounds),
+            "detect_best_selector_tree": measure(lambda: detect_best_selector(soup), rounds),
+            "html_to_markdown": measure(lambda: html_to_markdown(article), rounds),
+            "save_checkpoint_20k": measure(lambda: save_checkpoint(ckpt, visited, queue), rounds),
+        }
+
+def end_to_end(args) -> dict:
+    with tempfile.TemporaryDirectory() as tmp:
+        root = generate_site(Path(tmp) / "site", pages=args.pages)
+        out = Path(tmp) / "out"
+        with serve(root, latency=args.latency) as base:
+            usage0 = os.times()
+            t0 = time.perf_counter()
+            # run_scrape reports on the console; keep the JSON on stdout clean
+            with contextlib.redirect_stdout(io.StringIO()):
+                core.console.file = sys.stdout
+                try:
+                    core.run_scrape(
+                        start_url=f"{base}/index.html",
+                        output_dir=str(out),
+                        selector=args.selector,
+                        max_depth=2,
+                        delay=0,
+                        file_format=args.format,
+                        checkpoint_path=str(Path(tmp) / "ckpt.json"),
+                        quiet=True,
+                        concurrency=args.concurrency,
+                        parse_workers=args.workers,
+                        incremental=False,
+                        metrics_path=str(Path(tmp) / "metrics.json"),
+                    )
+                finally:
+                    core.console.file = None
+            wall = time.perf_counter() - t0
+            usage1 = os.times()
+        saved = sum(1 for p in out.rglob(f"*.{args.format}"))
+        stages = json.loads((Path(tmp) / "metrics.json").read_text(encoding="utf-8"))["stages"]
+    return {
+        "pages": args.pages + 1,
+        "saved": saved,
+        "wall_s": round(wall, 3),
+        "pages_per_sec": round(saved / wall, 2) if wall else None,
+        "cpu_user_s": round(usage1.user - usage0.user, 3),
+        "cpu_system_s": round(usage1.system - usage0.system, 3),
+        # parse workers show up as child CPU time
+        "cpu_children_s": round((usage1.children_user + usage1.children_system)
+                                - (usage0.children_user + usage0.children_system), 3),
+        # time per stage as recorded by run_scrape (see wikiscrapper.metrics)
+        "stages_s": {k: {"total": v["sum"], "mean": v["mean"], "p95": v["p95"]} for k, v in stages.items()},
+        "settings": {
+            "latency_s": args.latency,
+            "concurrency": args.concurrency,
+            "workers": args.workers,
+            "format": args.format,
+            "selector": args.selector,
+        },
+    }
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--pages", type=int, default=300, help="pages in the synthetic site")
+    ap.add_argument("--latency", type=float, default=0.01, help="server latency per request (seconds)")
+    ap.add_argument("-c", "--concurrency", type=int, default=8)
+    ap.add_argument("-w", "--workers", type=int, default=0)
+    ap.add_argument("--format", default="md", choices=("md", "txt"))
+    ap.add_argument("--selector", default=None, help="CSS selector (default: auto-detect)")
+    ap.add_argument("--rounds", type=int, default=20, help="repetitions per micro-benchmark")
+    ap.add_argument("--skip-e2e", action="store_true", help="only run the micro-benchmarks")
+    ap.add_argument("--out", help="also write the JSON report to this file")
+    args = ap.parse_args()
+
+    report = {
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "micro": micro_benchmarks(args.pages, args.rounds),
+    }
+    if not args.skip_e2e:
+        report["end_to_end"] = end_to_end(args)
+    report["peak_rss_mb"] = round(peak_rss_mb(), 1)
+
+    text = json.dumps(report, indent=2)
+    print(text)
+    if args.out:
+        Path(args.out).write_text(text + "\n", encoding="utf-8")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,84 @@
+#!/usr/bin/env python3
+"""
+Usage:
+  python benchmarks/startup.py [--runs 10] [--module wikiscrapper.cli] [--top 15] [--out startup.json]
+                               [--budget-ms 150]
+
+CLI startup cost: runs `python -X importtime -c "import <module>"` in fresh
+interpreters and reports the median cumulative import time of the module, the
+slowest imports below it (median per module) and the wall time of
+`python -m wikiscrapper --help`. Prints one JSON document; with --budget-ms it
+exits with status 1 when the median import time is over the budget.
+"""
+import argparse
+import json
+import statistics
+import subprocess
+import sys
+import time
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+
+def import_times(module: str) -> dict:
+    """Cumulative import time (us) of module and of everything imported under it, from one fresh interpreter."""
+    proc = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        cwd=ROOT, capture_output=True, text=True, check=True,
+    )
+    entries = []
+    for line in proc.stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        _, cumulative, name = line[len("import time:"):].split("|")
+        entries.append((name.strip(), len(name) - len(name.lstrip()), int(cumulative)))
+    # children are listed (more indented) right before their parent
+    times = {}
+    for i, (name, indent, cumulative) in enumerate(entries):
+        if name != module:
+            continue
+        times[name] = cumulative
+        for child, child_indent, child_cumulative in reversed(entries[:i]):
+            if child_indent <= indent:
+                break
+            times[child] = child_cumulative
+    return times
+
+def help_wall(runs: int) -> float:
+    walls = []
+    for _ in range(runs):
+        t0 = time.perf_counter()
+        subprocess.run([sys.executable, "-m", "wikiscrapper", "--help"], cwd=ROOT, capture_output=True, check=True)
+        walls.append(time.perf_counter() - t0)
+    return statistics.median(walls)
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--runs", type=int, default=10)
+    ap.add_argument("--module", default="wikiscrapper.cli")
+    ap.add_argument("--top", type=int, default=15, help="slowest imports to list")
+    ap.add_argument("--out", help="also write the JSON report to this file")
+    ap.add_argument("--budget-ms", type=float, help="fail when the median import time of --module is above this")
+    args = ap.parse_args()
+
+    samples = [import_times(args.module) for _ in range(args.runs)]
+    names = set().union(*samples)
+    median = {n: statistics.median(s.get(n, 0) for s in samples) for n in names}
+    heavy = sorted((n for n in names if n != args.module), key=median.get, reverse=True)[:args.top]
+    report = {
+        "python": sys.version.split()[0],
+        "module": args.module,
+        "import_ms": round(median[args.module] / 1000, 2),
+        "slowest_ms": {n: round(median[n] / 1000, 2) for n in heavy},
+        "help_wall_ms": round(help_wall(args.runs) * 1000, 1),
+        "runs": args.runs,
+    }
+    text = json.dumps(report, indent=2)
+    print(text)
+    if args.out:
+        Path(args.out).write_text(text + "\n", encoding="utf-8")
+    if args.budget_ms is not None and report["import_ms"] > args.budget_ms:
+        sys.exit(f"import {args.module} took {report['import_ms']}ms (budget {args.budget_ms:g}ms)")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,60 @@
+import threading
+from functools import partial
+from http.server import ThreadingHTTPServer, SimpleHTTPRequestHandler
+from pathlib import Path
+
+import pytest
+
+
+class QuietHandler(SimpleHTTPRequestHandler):
+    # handle_get(handler) -> True when it answered the GET itself; otherwise the file is served
+    handle_get = None
+
+    def do_GET(self):
+        if self.handle_get is None or not self.handle_get():
+            super().do_GET()
+
+    def log_message(self, *args):
+        pass
+
+
+def _make_site(root: Path, pages: int = 12):
+    nav = "".join(f'<a href="/p{i}.html">p{i}</a>' for i in range(pages))
+    for i in range(pages):
+        (root / f"p{i}.html").write_text(
+            f"<html><head><title>Page {i}</title></head><body><nav>{nav}</nav>"
+            f"<article><h1>Page {i}</h1><p>Hello {i}</p></article></body></html>",
+            encoding="utf-8",
+        )
+    (root / "robots.txt").write_text("User-agent: *\nDisallow:\n", encoding="utf-8")
+
+
+@pytest.fixture
+def serve(tmp_path):
+    """
+    Start local HTTP servers for a test: serve(name, pages=n, handle_get=None) -> base URL.
+    The server's files are tmp_path/name, with an n-page site written there when pages is
+    given; handle_get(handler) can answer a GET itself (returning True) instead.
+    """
+    servers = []
+
+    def start(name: str = "site", pages: int = None, handle_get=None):
+        root = tmp_path / name
+        root.mkdir(exist_ok=True)
+        if pages is not None:
+            _make_site(root, pages)
+        handler = type("Handler", (QuietHandler,), {"handle_get": handle_get})
+        server = ThreadingHTTPServer(("127.0.0.1", 0), partial(handler, directory=str(root)))
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        servers.append(server)
+        return f"http://127.0.0.1:{server.server_address[1]}"
+
+    yield start
+    for server in servers:
+        server.shutdown()
+        server.server_close()
+
+
+@pytest.fixture
+def site(serve):
+    return serve(pages=12)
@@ -0,0 +1,51 @@
+import json
+
+import pytest
+
+from wikiscrapper.batch import load_manifest, run_batch
+
+
+@pytest.fixture
+def two_sites(serve):
+    return [serve(f"site-{name}", pages=5) for name in ("a", "b")]
+
+
+def test_load_manifest_formats(tmp_path):
+    (tmp_path / "sites.json").write_text(json.dumps({
+        "defaults": {"depth": 2},
+        "sites": ["https://a.example/docs/", {"url": "https://a.example/docs/", "selector": "main", "format": "txt"}],
+    }), encoding="utf-8")
+    sites = load_manifest(str(tmp_path / "sites.json"))
+    assert [s.name for s in sites] == ["a.example-docs", "a.example-docs-2"]
+    assert sites[0].depth == 2 and sites[1].selector == "main" and sites[1].format == "txt"
+
+    (tmp_path / "sites.csv").write_text("url,depth,delay\nhttps://b.example/,3,\n", encoding="utf-8")
+    (site,) = load_manifest(str(tmp_path / "sites.csv"))
+    assert (site.url, site.depth, site.delay) == ("https://b.example/", 3, None)
+
+    (tmp_path / "bad.json").write_text(json.dumps([{"url": "https://a.example/", "dept": 2}]), encoding="utf-8")
+    with pytest.raises(ValueError, match="dept"):
+        load_manifest(str(tmp_path / "bad.json"))
+
+
+def test_load_manifest_yaml(tmp_path):
+    pytest.importorskip("yaml")
+    (tmp_path / "sites.yaml").write_text("sites:\n  - url: https://a.example/\n    name: a\n    depth: 0\n", encoding="utf-8")
+    (site,) = load_manifest(str(tmp_path / "sites.yaml"))
+    assert (site.name, site.depth) == ("a", 0)
+
+
+def test_run_batch_crawls_sites_side_by_side(two_sites, tmp_path):
+    manifest = tmp_path / "sites.json"
+    manifest.write_text(json.dumps([
+        {"url": f"{two_sites[0]}/p0.html", "name": "a", "selector": "article"},
+        {"url": f"{two_sites[1]}/p0.html", "name": "b", "format": "txt", "max_pages": 3},
+    ]), encoding="utf-8")
+    out = tmp_path / "out"
+    results = run_batch(load_manifest(str(manifest)), str(out), concurrency=3, delay=0)
+    assert results["a"]["saved"] == 5 and results["b"]["saved"] == 3
+    assert len(list((out / "a").rglob("*.md"))) == 5
+    assert len(list((out / "b").rglob("*.txt"))) == 3
+    assert (out / "a" / ".wikiscrapper-checkpoint.json").exists()
+    report = json.loads((out / "batch-report.json").read_text(encoding="utf-8"))
+    assert set(report["sites"]) == {"a", "b"}
@@ -0,0 +1,329 @@
+import pytest
+
+from wikiscrapper.core import run_scrape
+
+
+@pytest.mark.parametrize("concurrency,parse_workers", [(1, 0), (4, 0), (2, 2)])
+def test_run_scrape_local_site(site, tmp_path, concurrency, parse_workers):
+    out = tmp_path / "out"
+    run_scrape(
+        start_url=f"{site}/p0.html",
+        output_dir=str(out),
+        selector="article",
+        max_depth=1,
+        delay=0,
+        file_format="md",
+        checkpoint_path=str(tmp_path / "ckpt.json"),
+        quiet=True,
+        concurrency=concurrency,
+        parse_workers=parse_workers,
+    )
+    saved = sorted(p.name for p in out.rglob("*.md"))
+    assert saved == sorted(f"p{i}.html.md" for i in range(12))
+    assert "Hello 3" in next(out.rglob("p3.html.md")).read_text(encoding="utf-8")
+
+
+def test_resume_from_journal(site, tmp_path):
+    from wikiscrapper.storage import load_checkpoint
+
+    ckpt = tmp_path / "ckpt.json"
+    kwargs = dict(output_dir=str(tmp_path / "out"), selector="article", max_depth=1, delay=0,
+                  checkpoint_path=str(ckpt), quiet=True)
+    run_scrape(start_url=f"{site}/p0.html", max_pages=3, **kwargs)
+    visited, queue = load_checkpoint(str(ckpt))
+    assert len(visited) == 3
+    assert len(queue) == 9
+
+    run_scrape(start_url=f"{site}/p0.html", **kwargs)
+    visited, queue = load_checkpoint(str(ckpt))
+    assert len(visited) == 12
+    assert queue == []
+
+
+def test_resume_from_sqlite_frontier(site, tmp_path):
+    import sqlite3
+
+    db = tmp_path / "ckpt.sqlite"
+    kwargs = dict(output_dir=str(tmp_path / "out"), selector="article", max_depth=1, delay=0,
+                  checkpoint_path=str(tmp_path / "ckpt.json"), quiet=True, frontier_store="sqlite")
+    run_scrape(start_url=f"{site}/p0.html", max_pages=3, **kwargs)
+    with sqlite3.connect(db) as conn:
+        assert conn.execute("SELECT state, COUNT(*) FROM urls GROUP BY state").fetchall() == [(0, 9), (2, 3)]
+
+    run_scrape(start_url=f"{site}/p0.html", **kwargs)
+    with sqlite3.connect(db) as conn:
+        assert conn.execute("SELECT state, COUNT(*) FROM urls GROUP BY state").fetchall() == [(2, 12)]
+    assert len(list((tmp_path / "out").rglob("*.txt"))) == 12
+    assert not (tmp_path / "ckpt.json").exists()
+
+
+def test_incremental_recrawl_skips_unchanged_pages(site, tmp_path):
+    out = tmp_path / "out"
+    kwargs = dict(start_url=f"{site}/p0.html", output_dir=str(out), selector="article", max_depth=1,
+                  delay=0, checkpoint_path=str(tmp_path / "ckpt.json"), quiet=True)
+    run_scrape(**kwargs)
+    page = next(out.rglob("p3.html.txt"))
+    page.write_text("marker", encoding="utf-8")
+
+    # a fresh nightly run: every page answers 304, nothing is rewritten, links still come from the store
+    run_scrape(ignore_checkpoint=True, **kwargs)
+    assert page.read_text(encoding="utf-8") == "marker"
+    assert len(list(out.rglob("*.txt"))) == 12
+
+    run_scrape(ignore_checkpoint=True, incremental=False, **kwargs)
+    assert "Hello 3" in page.read_text(encoding="utf-8")
+
+
+def test_reprocess_from_cache(site, tmp_path):
+    from wikiscrapper.core import reprocess_cache
+
+    cache = tmp_path / "cache"
+    run_scrape(start_url=f"{site}/p0.html", output_dir=str(tmp_path / "out"), selector="article", max_depth=1,
+               delay=0, checkpoint_path=str(tmp_path / "ckpt.json"), quiet=True, cache_dir=str(cache))
+    # one compressed object per distinct body
+    assert len(list((cache / "objects").rglob("*.gz"))) == 12
+
+    out2 = tmp_path / "out2"
+    reprocess_cache(str(cache), str(out2), selector="h1", file_format="md", workers=2, quiet=True)
+    page = next(out2.rglob("p3.html.md")).read_text(encoding="utf-8")
+    assert 'selector: "h1"' in page
+    assert "Hello 3" not in page
+
+
+def test_cache_added_to_existing_output_gets_unchanged_pages(site, tmp_path):
+    out = tmp_path / "out"
+    cache = tmp_path / "cache"
+    kwargs = dict(start_url=f"{site}/p0.html", output_dir=str(out), selector="article", max_depth=1, delay=0,
+                  checkpoint_path=str(tmp_path / "ckpt.json"), ignore_checkpoint=True, quiet=True)
+    run_scrape(**kwargs)
+    stats = run_scrape(**kwargs, cache_dir=str(cache))
+    assert stats["unchanged"] == 12
+    assert len(list((cache / "objects").rglob("*.gz"))) == 12
+    # once cached, unchanged pages are asked for conditionally again (and not re-cached)
+    stats = run_scrape(**kwargs, cache_dir=str(cache))
+    assert stats["unchanged"] == 12
+    assert len((cache / "index.jsonl").read_text(encoding="utf-8").splitlines()) == 12
+
+
+def test_sitemap_seeding_uses_lastmod(site, tmp_path):
+    import gzip
+    import os
+    import time
+
+    root = tmp_path / "site"
+    (root / "deep.html").write_text("<html><body><article><p>Deep v1</p></article></body></html>", encoding="utf-8")
+    urlset = (
+        '<?xml version="1.0" encoding="UTF-8"?>'
+        '<urlset xmlns="http://www.sitemaps.org/schemas/sitemap/0.9">'
+        f"<url><loc>{site}/deep.html</loc><lastmod>2024-01-01</lastmod></url>"
+        f"<url><loc>{site}/p5.html</loc></url>"
+        "</urlset>"
+    )
+    (root / "pages.xml.gz").write_bytes(gzip.compress(urlset.encode("utf-8")))
+    (root / "index.xml").write_text(
+        '<sitemapindex xmlns="http://www.sitemaps.org/schemas/sitemap/0.9">'
+        "<sitemap><loc>/pages.xml.gz</loc></sitemap></sitemapindex>",
+        encoding="utf-8",
+    )
+    (root / "robots.txt").write_text(f"User-agent: *\nDisallow:\nSitemap: {site}/index.xml\n", encoding="utf-8")
+
+    out = tmp_path / "out"
+    kwargs = dict(start_url=f"{site}/p0.html", output_dir=str(out), selector="article", max_depth=0,
+                  delay=0, checkpoint_path=str(tmp_path / "ckpt.json"), quiet=True, use_sitemap=True)
+    run_scrape(**kwargs)
+    assert sorted(p.name for p in out.rglob("*.txt")) == ["deep.html.txt", "p0.html.txt", "p5.html.txt"]
+
+    # same <lastmod>: the page is not requested at all, even though its body changed
+    (root / "deep.html").write_text("<html><body><article><p>Deep v2</p></article></body></html>", encoding="utf-8")
+    os.utime(root / "deep.html", (time.time() + 5, time.time() + 5))  # Last-Modified has 1s resolution
+    run_scrape(ignore_checkpoint=True, **kwargs)
+    assert "Deep v1" in next(out.rglob("deep.html.txt")).read_text(encoding="utf-8")
+
+    (root / "pages.xml.gz").write_bytes(gzip.compress(urlset.replace("2024-01-01", "2024-02-01").encode("utf-8")))
+    run_scrape(ignore_checkpoint=True, **kwargs)
+    assert "Deep v2" in next(out.rglob("deep.html.txt")).read_text(encoding="utf-8")
+
+
+def test_bundle_sink_and_incremental_reuse(site, tmp_path):
+    from wikiscrapper.sink import BundleReader
+
+    out = tmp_path / "out"
+    kwargs = dict(start_url=f"{site}/p0.html", output_dir=str(out), selector="article", max_depth=1,
+                  delay=0, checkpoint_path=str(tmp_path / "ckpt.json"), quiet=True, sink="bundle")
+    run_scrape(**kwargs)
+    reader = BundleReader(out / "bundle")
+    assert len(reader) == 12
+    assert "Hello 3" in reader.get(f"{site}/p3.html")
+    assert not list(out.rglob("*.html.txt"))
+
+    # unchanged pages are found in the bundle index, nothing new is appended
+    run_scrape(ignore_checkpoint=True, **kwargs)
+    assert len((out / "bundle" / "index.jsonl").read_text(encoding="utf-8").splitlines()) == 12
+
+
+def test_near_duplicates_are_aliased(site, tmp_path):
+    import json
+
+    root = tmp_path / "site"
+    (root / "print").mkdir()
+    links = ""
+    for i in range(12):
+        # enough text to fingerprint (too short a body is never called a duplicate)
+        words = " ".join(f"term{i}x{k}" for k in range(12))
+        page = (root / f"p{i}.html").read_text(encoding="utf-8").replace(f"Hello {i}", f"Hello {i} {words}")
+        (root / f"p{i}.html").write_text(page, encoding="utf-8")
+        (root / "print" / f"p{i}.html").write_text(page, encoding="utf-8")
+        links += f'<a href="/print/p{i}.html">print</a>'
+    p0 = (root / "p0.html").read_text(encoding="utf-8")
+    (root / "p0.html").write_text(p0.replace("</nav>", links + "</nav>"), encoding="utf-8")
+
+    out = tmp_path / "out"
+    run_scrape(start_url=f"{site}/p0.html", output_dir=str(out), selector="article", max_depth=1, delay=0,
+               checkpoint_path=str(tmp_path / "ckpt.json"), quiet=True, dedup="alias")
+    assert len(list(out.rglob("p*.html.txt"))) == 12
+    aliases = [json.loads(line) for line in (out / "aliases.jsonl").read_text(encoding="utf-8").splitlines()]
+    assert sorted(a["url"] for a in aliases) == sorted(f"{site}/print/p{i}.html" for i in range(12))
+    assert all(a["duplicate_of"] == a["url"].replace("/print", "") for a in aliases)
+
+
+def test_metrics_report(site, tmp_path):
+    import json
+
+    report = tmp_path / "metrics.json"
+    prom = tmp_path / "metrics.prom"
+    run_scrape(start_url=f"{site}/p0.html", output_dir=str(tmp_path / "out"), selector="article", max_depth=1,
+               delay=0, checkpoint_path=str(tmp_path / "ckpt.json"), quiet=True, concurrency=2,
+               metrics_path=str(report), prometheus_path=str(prom))
+    data = json.loads(report.read_text(encoding="utf-8"))
+    for stage in ("robots", "fetch_ttfb", "fetch_body", "parse", "select", "format", "write", "checkpoint"):
+        assert data["stages"][stage]["count"] > 0, stage
+    assert data["stages"]["parse"]["count"] == 12
+    assert sum(data["status_by_host"][site.split("//")[1]].values()) == 12
+    assert data["counters"]["bytes_in"] > 0 and data["counters"]["bytes_out"] > 0
+    assert "wikiscrapper_pages_saved 12" in prom.read_text(encoding="utf-8")
+
+
+def test_adaptive_rate_backs_off_on_429(serve, tmp_path):
+    import json
+
+    throttled = set()
+
+    def throttle(handler):
+        # every page answers 429 once before it is served
+        if handler.path.endswith(".html") and handler.path not in throttled:
+            throttled.add(handler.path)
+            handler.send_response(429)
+            handler.send_header("Retry-After", "0")
+            handler.send_header("Content-Length", "0")
+            handler.end_headers()
+            return True
+        return False
+
+    site = serve(pages=4, handle_get=throttle)
+    out = tmp_path / "out"
+    ckpt = tmp_path / "ckpt.json"
+    run_scrape(start_url=f"{site}/p0.html", output_dir=str(out), selector="article", max_depth=1,
+               file_format="md", delay=0, max_delay=0.05, checkpoint_path=str(ckpt), quiet=True, concurrency=2,
+               retry_backoff=0.05)
+    assert sorted(p.name for p in out.rglob("*.md")) == [f"p{i}.html.md" for i in range(4)]
+    assert len(throttled) == 4
+    rate = json.loads(ckpt.read_text(encoding="utf-8"))["rate"]
+    assert rate[site.split("//")[1]]["steady"] is True
+
+
+def test_page_budget_goes_to_the_most_valuable_pages(site, tmp_path):
+    from wikiscrapper.storage import load_checkpoint
+
+    root = tmp_path / "site"
+    (root / "docs" / "reference").mkdir(parents=True)
+    (root / "changelog").mkdir()
+    links = "".join(f'<a href="/changelog/v{i}.html">v{i}</a>' for i in range(6))
+    links += '<a href="/docs/intro.html?page=2">2</a><a href="/docs/guide.html">Guide</a>'
+    links += '<a href="/docs/reference/api.html">API reference</a>'
+    for path in ["docs/index.html", "docs/guide.html", "docs/reference/api.html", "docs/intro.html"] + [
+        f"changelog/v{i}.html" for i in range(6)
+    ]:
+        (root / path).write_text(
+            f"<html><body><nav>{links}</nav><article><p>{path}</p></article></body></html>", encoding="utf-8"
+        )
+
+    out = tmp_path / "out"
+    ckpt = tmp_path / "ckpt.json"
+    run_scrape(start_url=f"{site}/docs/index.html", output_dir=str(out), selector="article", max_depth=2,
+               delay=0, checkpoint_path=str(ckpt), quiet=True, max_pages=3, priority="auto")
+    assert sorted(p.name for p in out.rglob("*.txt")) == ["api.html.txt", "guide.html.txt", "index.html.txt"]
+
+    # priorities are checkpointed (in crawl order): the resumed crawl picks up where it stopped
+    _, queue = load_checkpoint(str(ckpt))
+    assert len(queue) == 7 and all(len(item) == 3 for item in queue)
+    assert [item[2] for item in queue] == sorted((item[2] for item in queue), reverse=True)
+    run_scrape(start_url=f"{site}/docs/index.html", output_dir=str(out), selector="article", max_depth=2,
+               delay=0, checkpoint_path=str(ckpt), quiet=True, max_pages=1, priority="auto")
+    assert len(list(out.rglob("*.txt"))) == 4
+    assert load_checkpoint(str(ckpt))[1] == queue[1:]
+
+
+def test_crawler_traps_are_pruned_at_enqueue_time(serve, tmp_path):
+    import json
+    import re
+
+    fetched = []
+
+    def trap(handler):
+        fetched.append(handler.path)
+        m = re.match(r"/cal/(\d+)", handler.path)
+        month = int(m.group(1)) if m else 0
+        # an endless calendar, a session id on every link and a self-nesting relative link
+        links = (f'<a href="/cal/{month + 1}">next</a><a href="/docs/a?sid={month}">docs</a>'
+                 '<a href="loop/">loop</a><a href="/private/x">private</a>')
+        body = f"<html><body><nav>{links}</nav><article><p>{handler.path}</p></article></body></html>".encode()
+        handler.send_response(200)
+        handler.send_header("Content-Type", "text/html")
+        handler.send_header("Content-Length", str(len(body)))
+        handler.end_headers()
+        handler.wfile.write(body)
+        return True
+
+    site = serve(handle_get=trap)
+    metrics = tmp_path / "metrics.json"
+    prom = tmp_path / "metrics.prom"
+    stats = run_scrape(start_url=f"{site}/cal/0", output_dir=str(tmp_path / "out"), selector="article",
+                       max_depth=50, delay=0, checkpoint_path=str(tmp_path / "ckpt.json"), quiet=True,
+                       no_robots=True, exclude=[r"/private/"], pattern_cap=5, metrics_path=str(metrics),
+                       prometheus_path=str(prom))
+    # start + 5 calendar pages + /docs/a (session id stripped) + loop/ nesting up to two levels
+    assert "/docs/a" in fetched and not any("sid=" in p or "/private/" in p for p in fetched)
+    assert stats["pruned"]["exclude /private/"] == 1
+    assert stats["pruned"][f"page cap {site.split('//')[1]}/cal/{{n}}"] == 1
+    assert stats["pruned"]["repeated path segments"] >= 1
+    assert len(fetched) == stats["fetched"] < 20
+    assert json.loads(metrics.read_text(encoding="utf-8"))["counters"]["urls_pruned"] == sum(stats["pruned"].values())
+    assert f"wikiscrapper_urls_pruned_total {sum(stats['pruned'].values())}" in prom.read_text(encoding="utf-8")
+
+
+def test_failed_fetches_are_retried_without_blocking(serve, tmp_path):
+    import json
+
+    failing = set()
+
+    def flaky(handler):
+        # p1 fails twice, then is served; p3 is gone
+        if handler.path == "/p1.html" and len(failing) < 2:
+            failing.add(len(failing))
+            handler.send_response(500)
+            handler.send_header("Content-Length", "0")
+            handler.end_headers()
+            return True
+        return False
+
+    site = serve(pages=4, handle_get=flaky)
+    (tmp_path / "site" / "p3.html").unlink()
+    out = tmp_path / "out"
+    stats = run_scrape(start_url=f"{site}/p0.html", output_dir=str(out), selector="article", max_depth=1,
+                       delay=0, checkpoint_path=str(tmp_path / "ckpt.json"), quiet=True, retry_backoff=0.05,
+                       concurrency=2)
+    assert sorted(p.name for p in out.rglob("*.txt")) == ["p0.html.txt", "p1.html.txt", "p2.html.txt"]
+    assert stats["retried"] == 2 and stats["failed"] == 1
+    failures = [json.loads(line) for line in (out / "failures.jsonl").read_text(encoding="utf-8").splitlines()]
+    assert failures == [{"url": f"{site}/p3.html", "status": 404, "error": failures[0]["error"],
+                         "attempts": 1, "permanent": True}]
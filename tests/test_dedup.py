@@ -0,0 +1,43 @@
+from wikiscrapper.dedup import simhash, hamming, SimHashIndex, NearDuplicateFilter
+
+TEXT = " ".join(f"word{i % 97} token{i % 13} item{i}" for i in range(400))
+
+
+def test_simhash_is_stable_and_near_for_small_edits():
+    assert simhash(TEXT) == simhash(TEXT)
+    edited = TEXT.replace("item200 ", "item200 version 2.1 banner ")
+    assert hamming(simhash(TEXT), simhash(edited)) <= 3
+    other = "a completely different page about something else, written in other words entirely"
+    assert hamming(simhash(TEXT), simhash(other)) > 3
+
+
+def test_short_bodies_get_no_fingerprint():
+    # hub pages with hardly any text must not all look like duplicates of each other
+    assert simhash("") is None
+    assert simhash("See also: Setup, Usage") is None
+    f = NearDuplicateFilter()
+    assert f.check("http://a/1", simhash("Contents")) is None
+    assert f.check("http://a/2", simhash("Index")) is None
+
+
+def test_index_finds_within_threshold_only():
+    index = SimHashIndex(threshold=3)
+    index.add("a", 0b1011)
+    assert index.find(0b1011 ^ 0b111 << 40) == "a"
+    assert index.find(0b1011 ^ 0b1111 << 40) is None
+    assert index.find(0b1011, exclude="a") is None
+    index.remove("a")
+    assert len(index) == 0 and index.find(0b1011) is None
+
+
+def test_filter_learns_duplicate_url_patterns():
+    f = NearDuplicateFilter(min_evidence=3)
+    for i in range(5):
+        fp = simhash(TEXT.replace("word", f"w{i}x"))
+        assert f.check(f"https://d.test/docs/p{i}", fp) is None
+        assert f.check(f"https://d.test/docs/p{i}?lang=en", fp) == f"https://d.test/docs/p{i}"
+    assert f.blocked("https://d.test/docs/p9?lang=de") == ("query", "lang")
+    assert f.blocked("https://d.test/docs/p9?lang=de") == ("query", "lang")
+    assert f.pruned == 1
+    assert f.blocked("https://d.test/docs/p9") is None
+    assert "?lang=" in f.rules()
@@ -0,0 +1,67 @@
+import time
+
+import pytest
+
+from wikiscrapper.distributed import SharedFrontier, init_shared, release_owner, run_workers, shard_of
+
+
+def test_shared_frontier_leases_and_recovery(tmp_path):
+    db = str(tmp_path / "frontier.sqlite")
+    init_shared(db, "http://a/0", shards=2)
+    urls = [f"http://a/{i}" for i in range(20)]
+    mine = [u for u in urls if shard_of(u, 2) == 0]
+
+    w0 = SharedFrontier(db, 0, 2, lease=0.5)
+    w1 = SharedFrontier(db, 1, 2, lease=0.5)
+    for u in urls:
+        w0.add(u, 1)
+    assert w1.add(urls[3], 1) is True  # not written yet; harmless duplicate
+    w0.commit()
+    w1.commit()
+    assert w1.add(urls[3], 1) is False
+    assert w0 and {w0.pop()[0] for _ in range(len(w0))} == set(mine)
+    assert not w1.finished()
+    w0.abandon()  # worker 0 dies holding its claims
+
+    # once worker 0's heartbeat and leases are stale, worker 1 takes its shard over
+    time.sleep(0.6)
+    taken = []
+    while w1:
+        url, _ = w1.pop()
+        taken.append(url)
+        w1.done(url)
+    assert set(taken) == set(urls)
+    assert w1.finished()
+    w1.close()
+
+
+def test_one_process_per_shard_and_one_shard_layout(tmp_path):
+    db = str(tmp_path / "frontier.sqlite")
+    init_shared(db, "http://a/0", shards=2)
+    # a worker joining with another layout would hash URLs into the wrong shards
+    with pytest.raises(ValueError):
+        init_shared(db, "http://a/0", shards=3)
+    with pytest.raises(ValueError):
+        init_shared(db, "http://a/0", shards=2, by="host")
+
+    s = shard_of("http://a/0", 2)
+    other = SharedFrontier(db, s, 2)
+    other.owner = f"{s}@elsewhere:1"  # the same shard, run by a process on another machine
+    assert other.claim() == 1
+    with pytest.raises(RuntimeError):
+        SharedFrontier(db, s, 2)
+    # once that process is known to be gone, its claims go back to the shard
+    release_owner(db, other.owner)
+    w = SharedFrontier(db, s, 2)
+    assert w and w.pop() == ("http://a/0", 0)
+    w.close()
+
+def test_run_workers_splits_crawl(site, tmp_path):
+    out = tmp_path / "out"
+    assert run_workers(start_url=f"{site}/p0.html", output_dir=str(out), procs=3, selector="article", max_depth=1,
+                       delay=0, file_format="md", checkpoint_path=str(tmp_path / "ckpt.json"), quiet=True)
+    pages = [p.name for p in out.rglob("*.md")]
+    assert sorted(pages) == sorted(f"p{i}.html.md" for i in range(12))  # each page exactly once
+    # every worker writes its own shard of the output
+    assert all((out / f"worker-{i:02d}").is_dir() for i in range(3))
+    assert len({p.relative_to(out).parts[0] for p in out.rglob("*.md")}) > 1
@@ -0,0 +1,62 @@
+import threading
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+
+import pytest
+
+from wikiscrapper.fetcher import make_session, fetch, is_denied_url, sniff_charset, SkippedContent
+from wikiscrapper.pipeline import extract_page
+
+BODIES = {
+    "/page": ("text/html; charset=iso-8859-1", "<html><body><article><p>café</p></article></body></html>".encode("latin-1")),
+    "/doc.bin": ("application/pdf", b"%PDF-1.4" + b"\0" * 1000),
+    "/big": ("text/html", b"<html><body>" + b"x" * 200_000 + b"</body></html>"),
+}
+
+
+class Handler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        ctype, body = BODIES[self.path]
+        self.send_response(200)
+        self.send_header("Content-Type", ctype)
+        if self.path != "/big":  # chunked-style: no length up front, the cap must trip while reading
+            self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def server():
+    httpd = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+    threading.Thread(target=httpd.serve_forever, daemon=True).start()
+    yield f"http://127.0.0.1:{httpd.server_address[1]}"
+    httpd.shutdown()
+    httpd.server_close()
+
+
+def test_streamed_fetch_sets_charset(server):
+    resp = fetch(make_session(), f"{server}/page", {})
+    assert resp.encoding == "iso8859-1"
+    page = extract_page(f"{server}/page", resp.content, ["article"], "txt", encoding=resp.encoding)
+    assert "café" in page.final
+
+
+def test_non_html_and_oversized_bodies_are_skipped(server):
+    session = make_session()
+    with pytest.raises(SkippedContent, match="application/pdf"):
+        fetch(session, f"{server}/doc.bin", {})
+    with pytest.raises(SkippedContent, match="exceeds"):
+        fetch(session, f"{server}/big", {}, max_bytes=100_000)
+    assert len(fetch(session, f"{server}/big", {}, max_bytes=0).content) > 200_000
+
+
+def test_denylist_and_sniffing():
+    assert is_denied_url("https://a.test/files/report.PDF")
+    assert is_denied_url("https://a.test/img/logo.png?v=2")
+    assert not is_denied_url("https://a.test/v1.2/guide")
+    assert not is_denied_url("https://a.test/page.html")
+    assert sniff_charset("text/html", b'<meta charset="windows-1252">') == "cp1252"
+    assert sniff_charset("text/html; charset=bogus", b"\xef\xbb\xbf<html>") == "utf-8"
+    assert sniff_charset("text/html", b"<html>") is None
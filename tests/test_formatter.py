@@ -0,0 +1,28 @@
+from pathlib import Path
+
+import pytest
+from bs4 import BeautifulSoup
+
+from wikiscrapper.formatter import html_to_markdown, html_to_text
+
+GOLDEN = Path(__file__).parent / "golden"
+
+
+def _content(name):
+    html = (GOLDEN / f"{name}.html").read_bytes()
+    return BeautifulSoup(html, "lxml").select_one("article")
+
+
+@pytest.mark.parametrize("engine", ["native", "markdownify"])
+def test_markdown_matches_golden(engine):
+    expected = (GOLDEN / "reference.md").read_text(encoding="utf-8").strip()
+    assert html_to_markdown(_content("reference"), engine=engine) == expected
+
+
+def test_text_matches_golden_and_leaves_tree_untouched():
+    node = _content("reference")
+    before = str(node)
+    expected = (GOLDEN / "reference.txt").read_text(encoding="utf-8").strip()
+    assert html_to_text(node) == expected
+    html_to_markdown(node)
+    assert str(node) == before
@@ -0,0 +1,68 @@
+from wikiscrapper.frontier import Frontier
+
+
+def test_frontier_dedupes_and_keeps_shallowest_depth():
+    f = Frontier(queue=[("http://a/x", 2), ("http://a/x", 2)])
+    assert len(f) == 1
+    assert f.add("http://a/x", 1) is False
+    assert f.add("http://a/y", 3) is True
+    assert f.pop() == ("http://a/x", 1)
+
+    # active and visited urls are rejected too
+    assert f.add("http://a/x", 0) is False
+    f.done("http://a/x")
+    assert f.add("http://a/x", 0) is False
+    assert f.pending() == [("http://a/y", 3)]
+
+
+def test_sqlite_frontier_matches_memory_frontier_and_resumes(tmp_path):
+    from wikiscrapper.frontier import SqliteFrontier
+
+    path = str(tmp_path / "frontier.sqlite")
+    f = SqliteFrontier(path, batch_size=2)
+    assert f.is_empty()
+    for i in range(5):
+        assert f.add(f"http://a/{i}", 2) is True
+    assert f.add("http://a/0", 1) is False
+    assert len(f) == 5
+    assert f.pop() == ("http://a/0", 1)
+    assert f.pop() == ("http://a/1", 2)
+    assert f.add("http://a/0", 0) is False  # active
+    f.done("http://a/0")
+    assert f.add("http://a/0", 0) is False  # visited
+    assert f.is_seen("http://a/4") and not f.is_seen("http://a/9")
+    f.set_extra("rate", {"a": {"delay": 0.5}})
+    f.commit()
+    f.add("http://a/5", 3)  # never committed
+    f._db.close()  # simulated crash
+
+    # active pages go back to the queue; uncommitted changes are lost
+    f = SqliteFrontier(path)
+    assert f.extra == {"rate": {"a": {"delay": 0.5}}}
+    assert f.visited_count() == 1
+    assert f.pending() == [(f"http://a/{i}", 2) for i in range(1, 5)]
+    assert [f.pop() for _ in range(len(f))] == [(f"http://a/{i}", 2) for i in range(1, 5)]
+    assert not f
+    f.close()
+
+
+def test_scored_frontier_pops_highest_priority_and_rescoring_only_raises():
+    def score(url, depth, anchor, inlinks):
+        return inlinks - depth + (5 if anchor == "API" else 0)
+
+    f = Frontier(score=score)
+    assert f.add("http://a/x", 1) and f.add("http://a/y", 1) and f.add("http://a/z", 2, anchor="API")
+    # two more links to y: 3 in-links beat x's 1
+    f.add("http://a/y", 1)
+    f.add("http://a/y", 2)
+    assert len(f) == 3
+    assert f.pending() == [("http://a/z", 2, 4), ("http://a/y", 1, 2), ("http://a/x", 1, 0)]
+    assert f.pop() == ("http://a/z", 2)
+
+    # stored priorities are used as is on resume (the active page comes back too); ties keep insertion order
+    g = Frontier(queue=f.pending() + [("http://a/w", 0, 2)], score=score)
+    assert [g.pop()[0] for _ in range(len(g))] == ["http://a/z", "http://a/y", "http://a/w", "http://a/x"]
+
+    # without a score function it's plain BFS, stored priorities are ignored
+    h = Frontier(queue=[("http://a/1", 1, 0.5), ("http://a/2", 1, 9.0)])
+    assert h.pending() == [("http://a/1", 1), ("http://a/2", 1)]
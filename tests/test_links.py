@@ -0,0 +1,31 @@
+from urllib.parse import urljoin
+
+from wikiscrapper.links import LinkExtractor
+from wikiscrapper.utils import normalize_url
+
+
+def test_extract_honors_base_and_matches_urljoin():
+    html = b"""<html><head><base href="/docs/v2/"></head><body>
+      <a href="intro">a</a> <a href="/abs?b=2&a=1">b</a> <a href="mailto:x@y">c</a>
+      <a href="https://other.example/x#frag">d</a> <a href="intro">dup</a>
+    </body></html>"""
+    links = LinkExtractor().extract(html, "https://docs.example.com/start/page")
+    assert links == [
+        "https://docs.example.com/docs/v2/intro",
+        "https://docs.example.com/abs?a=1&b=2",
+        "https://other.example/x",
+    ]
+
+
+def test_memoized_resolution_is_per_base():
+    ex = LinkExtractor()
+    for base in ("http://a/x/y", "http://a/x/", "http://a/z", "https://a/x/y?q=1", "http://b/x/y"):
+        for href in ("c", "../c", "/c", "?p=1", "#f", "", "//h/c", "http://h/c"):
+            assert ex.resolve(base, href) == normalize_url(urljoin(base, href)), (base, href)
+
+
+def test_extract_anchors_keeps_first_nonempty_text():
+    html = b"""<a href="/img"><img src="x.png"></a> <a href="/img">Images  <b>guide</b></a>
+      <a href="/api">API</a> <a href="/api">other</a> <a href="mailto:x@y">mail</a>"""
+    anchors = LinkExtractor().extract_anchors(html, "https://a.example/docs/")
+    assert anchors == {"https://a.example/img": "Images guide", "https://a.example/api": "API"}
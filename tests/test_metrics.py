@@ -0,0 +1,33 @@
+from wikiscrapper.metrics import Histogram, Metrics
+
+
+def test_histogram_quantiles():
+    h = Histogram()
+    for v in [0.001] * 90 + [0.2] * 10:
+        h.observe(v)
+    assert h.count == 100
+    assert h.quantile(0.5) == 0.001
+    assert h.quantile(0.95) == 0.25
+    assert h.to_dict()["buckets"]["0.25"] == 10
+
+
+def test_prometheus_and_json_export(tmp_path):
+    m = Metrics()
+    with m.timer("parse"):
+        pass
+    m.observe("fetch_ttfb", 0.02)
+    m.inc("bytes_in", 1234)
+    m.status("a.test", 200)
+    m.status("a.test", 404)
+    m.set("queue", 3)
+
+    m.write_prometheus(str(tmp_path / "m.prom"))
+    text = (tmp_path / "m.prom").read_text(encoding="utf-8")
+    assert 'wikiscrapper_stage_seconds_bucket{stage="fetch_ttfb",le="+Inf"} 1' in text
+    assert "wikiscrapper_bytes_in_total 1234" in text
+    assert 'wikiscrapper_responses_total{host="a.test",status="404"} 1' in text
+    assert "wikiscrapper_queue 3" in text
+
+    report = m.to_dict()
+    assert report["stages"]["parse"]["count"] == 1
+    assert report["status_by_host"] == {"a.test": {"200": 1, "404": 1}}
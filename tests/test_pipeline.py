@@ -0,0 +1,36 @@
+from wikiscrapper.pipeline import extract_page, dom_fingerprint, parse_html
+
+LANDING = (
+    '<html><body><div class="hero"><div class="hero-content"><p>Welcome {n}</p></div></div>'
+    "<footer>f</footer></body></html>"
+)
+ARTICLE = (
+    '<html><body><nav class="sidebar"><a href="/a">a</a></nav>'
+    "<article><h1>Title {n}</h1><p>Body {n}</p><p>More</p></article></body></html>"
+)
+
+
+def test_same_template_same_fingerprint():
+    a = dom_fingerprint(parse_html(ARTICLE.format(n=1).encode()))
+    b = dom_fingerprint(parse_html(ARTICLE.replace("<p>More</p>", "<p>x</p><p>y</p>").format(n=2).encode()))
+    assert a == b
+    assert a != dom_fingerprint(parse_html(LANDING.format(n=1).encode()))
+
+
+def test_detection_is_per_template_and_cached():
+    templates = {}
+    for html in (LANDING, ARTICLE):
+        page = extract_page("https://a.test/x", html.format(n=1).encode(), None, "txt", templates=templates)
+        templates[page.template] = page.selectors
+    landing_fp, article_fp = templates
+    assert templates[landing_fp][0] == ".hero-content"
+    assert templates[article_fp][0] == "article"
+
+    # a known template reuses the cached selectors instead of detecting again
+    templates[article_fp] = ["nav.sidebar"]
+    page = extract_page("https://a.test/y", ARTICLE.format(n=2).encode(), None, "txt", templates=templates)
+    assert page.selector == "nav.sidebar"
+
+    # explicit selectors bypass templates entirely
+    page = extract_page("https://a.test/y", ARTICLE.format(n=2).encode(), ["article"], "txt", templates=templates)
+    assert page.template is None and page.selector == "article"
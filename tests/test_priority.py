@@ -0,0 +1,28 @@
+import pytest
+
+from wikiscrapper.priority import LinkScorer, make_scorer
+
+
+def test_link_scorer_prefers_reference_pages_over_archives():
+    score = LinkScorer("https://docs.example.com/docs/index.html")
+    reference = score("https://docs.example.com/docs/reference/api.html", 2, "API reference")
+    page = score("https://docs.example.com/docs/install.html", 1)
+    assert reference > page
+    assert page > score("https://docs.example.com/docs/install.html", 2)
+    assert page > score("https://docs.example.com/blog/post.html", 1)
+    for low in ("/docs/changelog/1.2.html", "/docs/tags/python.html", "/docs/list?page=3", "/docs/2023/04/"):
+        assert score(f"https://docs.example.com{low}", 1) < page, low
+    assert score("https://docs.example.com/docs/list.html", 1, "Next »") < page
+    # more links to a page raise it
+    assert score("https://docs.example.com/docs/install.html", 1, inlinks=8) > page
+
+
+def test_make_scorer():
+    assert make_scorer("bfs", "http://a/") is None
+    assert make_scorer("auto", "http://a/") is None
+    assert isinstance(make_scorer("auto", "http://a/", max_pages=10), LinkScorer)
+    assert make_scorer("os.path:join", "http://a/") is __import__("os").path.join
+    with pytest.raises(ValueError):
+        make_scorer("nope", "http://a/")
+    with pytest.raises(ValueError):
+        make_scorer("os.path:missing", "http://a/")
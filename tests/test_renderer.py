@@ -30,3 +30,29 @@ def test_render_simple_file_tmp():
         except RuntimeError as e:
             pytest.skip(f"Playwright runtime not available: {e}")
         assert "Hello World" in content
+
+def test_browser_pool_reuses_pages_and_waits_for_selector():
+    from wikiscrapper.renderer import BrowserPool
+
+    html = """<!doctype html>
+    <html><body>
+      <img src="missing.png">
+      <script>setTimeout(function () {
+        var d = document.createElement('div'); d.id = 'ready'; d.innerText = 'Loaded'; document.body.appendChild(d);
+      }, 100);</script>
+    </body></html>
+    """
+    with tempfile.TemporaryDirectory() as td:
+        fn = os.path.join(td, "late.html")
+        with open(fn, "w", encoding="utf-8") as f:
+            f.write(html)
+        pool = BrowserPool(size=2, wait_for="#ready")
+        try:
+            pool.start()
+        except RuntimeError as e:
+            pytest.skip(f"Playwright runtime not available: {e}")
+        try:
+            for _ in range(3):
+                assert "Loaded" in pool.render("file://" + fn, timeout=5000)
+        finally:
+            pool.close()
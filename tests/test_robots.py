@@ -0,0 +1,93 @@
+import threading
+from functools import partial
+from http.server import ThreadingHTTPServer, SimpleHTTPRequestHandler
+
+import pytest
+import requests
+
+from wikiscrapper.robots import RobotsCache
+
+
+class QuietHandler(SimpleHTTPRequestHandler):
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def origin(tmp_path):
+    (tmp_path / "robots.txt").write_text(
+        "User-agent: *\nDisallow: /private/\nCrawl-delay: 2\nRequest-rate: 1/5\n", encoding="utf-8"
+    )
+    server = ThreadingHTTPServer(("127.0.0.1", 0), partial(QuietHandler, directory=str(tmp_path)))
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    yield f"http://127.0.0.1:{server.server_address[1]}"
+    server.shutdown()
+    server.server_close()
+
+
+def test_rules_delay_and_persistence(origin, tmp_path):
+    path = tmp_path / "robots.json"
+    robots = RobotsCache(requests.Session(), timeout=5, path=str(path))
+    assert not robots.ready(f"{origin}/a")
+    robots.prefetch(f"{origin}/a")
+    assert robots.allowed("bot", f"{origin}/docs/a")
+    assert robots.ready(f"{origin}/a")
+    assert not robots.allowed("bot", f"{origin}/private/x")
+    # Request-rate 1/5 is stricter than Crawl-delay 2
+    assert robots.delay("bot", f"{origin}/a") == 5
+    robots.close()
+
+    class NoNetwork(requests.Session):
+        def get(self, *args, **kwargs):
+            raise AssertionError("robots.txt should come from the persisted cache")
+
+    cached = RobotsCache(NoNetwork(), path=str(path))
+    assert cached.ready(f"{origin}/b")
+    assert not cached.allowed("bot", f"{origin}/private/y")
+
+    expired = RobotsCache(requests.Session(), path=str(path), ttl=0)
+    assert not expired.ready(f"{origin}/b")
+
+
+def test_unreachable_robots_disallows(tmp_path):
+    robots = RobotsCache(requests.Session(), timeout=1, unreachable_retries=0)
+    assert not robots.allowed("bot", "http://127.0.0.1:9/page")
+    assert robots.ready("http://127.0.0.1:9/other")
+    assert robots.delay("bot", "http://127.0.0.1:9/page") is None
+
+
+def test_robots_503_disallows_until_refetched(tmp_path):
+    import time
+
+    (tmp_path / "robots.txt").write_text("User-agent: *\nDisallow: /private/\n", encoding="utf-8")
+    requests_seen = []
+
+    class FlakyRobots(QuietHandler):
+        def do_GET(self):
+            requests_seen.append(self.path)
+            if len(requests_seen) == 1:
+                self.send_response(503)
+                self.send_header("Content-Length", "0")
+                self.end_headers()
+                return
+            super().do_GET()
+
+    server = ThreadingHTTPServer(("127.0.0.1", 0), partial(FlakyRobots, directory=str(tmp_path)))
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    origin = f"http://127.0.0.1:{server.server_address[1]}"
+    path = tmp_path / "robots.json"
+    try:
+        robots = RobotsCache(requests.Session(), timeout=5, path=str(path), retry_backoff=0.05)
+        # a 5xx disallows everything, but only until robots.txt is fetched again
+        assert not robots.allowed("bot", f"{origin}/docs/a")
+        assert robots.ready(f"{origin}/docs/a") and 0 < robots.retry_in(f"{origin}/docs/a") <= 0.05
+        assert not robots.allowed("bot", f"{origin}/docs/b") and len(requests_seen) == 1
+        time.sleep(0.06)
+        assert not robots.ready(f"{origin}/docs/a")
+        assert robots.allowed("bot", f"{origin}/docs/a")
+        assert not robots.allowed("bot", f"{origin}/private/x")
+        assert robots.retry_in(f"{origin}/docs/a") is None and len(requests_seen) == 2
+        robots.close()
+    finally:
+        server.shutdown()
+        server.server_close()
@@ -0,0 +1,77 @@
+from wikiscrapper.scheduler import HostScheduler, RateController, RetryLane
+
+
+def test_parked_item_released_when_host_ready():
+    s = HostScheduler(delay=0.05)
+    s.acquire("a.example")
+    assert s.wait_time("a.example") > 0
+    assert s.wait_time("b.example") == 0
+
+    s.park("a.example", ("http://a.example/x", 1))
+    assert len(s) == 1
+    assert s.pop_ready() is None
+    assert 0 < s.next_ready_in() <= 0.05
+
+    import time
+    time.sleep(0.06)
+    assert s.pop_ready() == ("http://a.example/x", 1)
+    assert len(s) == 0
+    assert s.next_ready_in() is None
+
+
+def test_defer_holds_host():
+    s = HostScheduler(delay=0)
+    s.defer("a.example", 0.05)
+    s.park("a.example", ("http://a.example/x", 0))
+    assert s.pop_ready() is None
+    assert 0 < s.next_ready_in() <= 0.05
+
+
+def test_rate_controller_aimd():
+    r = RateController(floor=0.1, ceiling=2.0)
+    assert r.delay("a") == 2.0
+    # slow start: speeds up multiplicatively while responses stay fast
+    for _ in range(40):
+        r.on_success("a", 0.01)
+    assert r.delay("a") == 0.1
+    # overload halves the rate, then it only grows additively
+    assert r.on_overload("a") == 0.25
+    assert 0.1 < r.on_success("a", 0.01) < 0.25
+    assert r.on_error("b") == 2.0  # never above the ceiling
+
+    r.set_floor("a", 1.0)  # robots.txt Crawl-delay
+    assert r.delay("a") == 1.0
+
+    restored = RateController(floor=0.1, ceiling=2.0)
+    restored.load(r.state())
+    assert restored.delay("a") == 1.0 and not restored.changed
+
+
+def test_rate_controller_holds_when_latency_grows():
+    r = RateController(floor=0, ceiling=1.0)
+    r.on_success("a", 0.01)
+    d = r.delay("a")
+    for _ in range(10):
+        r.on_success("a", 1.0)
+    assert r.delay("a") >= d / 1.25 ** 2
+
+
+def test_retry_lane_backoff_and_permanent_failures():
+    import time
+
+    lane = RetryLane(max_attempts=3, base=0.02)
+    assert lane.fail("http://a.example/gone", 1, status=404) is None
+    assert lane.fail("http://a.example/x", 1, status=503) <= 0.025
+    assert len(lane) == 1 and lane.pop_ready() is None
+    time.sleep(0.03)
+    assert lane.pop_ready() == ("http://a.example/x", 1)
+    # the delay doubles with each attempt, and Retry-After wins when it is longer
+    assert 0.03 <= lane.fail("http://a.example/x", 1) <= 0.05
+    assert lane.failed_attempts("http://a.example/x") == 2
+    assert lane.fail("http://a.example/x", 1) is None  # out of attempts
+    assert lane.fail("http://a.example/y", 0, status=429, retry_after=30) == 30
+    assert lane.retried == 3
+
+    resumed = RetryLane(max_attempts=3)
+    resumed.load(lane.state())
+    assert resumed.failed_attempts("http://a.example/y") == 1 and len(resumed) == 0
@@ -0,0 +1,69 @@
+import pytest
+
+from wikiscrapper.metrics import Metrics
+from wikiscrapper.scope import ScopeRules, repeated_segments, url_pattern
+
+
+def test_canonical_strips_tracking_and_session_params():
+    rules = ScopeRules(strip_params=("utm_*", "sid", "ref"))
+    assert rules.canonical("http://a/x?id=3&sid=abc&utm_source=x") == "http://a/x?id=3"
+    assert rules.canonical("http://a/x?UTM_Medium=y&ref=z") == "http://a/x"
+    assert rules.canonical("http://a/x?id=3") == "http://a/x?id=3"
+    assert ScopeRules(strip_params=()).canonical("http://a/x?sid=1") == "http://a/x?sid=1"
+
+
+def test_url_pattern_and_repeated_segments():
+    assert url_pattern("http://a/cal/2024/05?view=month") == "a/cal/{n}/{n}?view=month"
+    assert url_pattern("http://a/list?page=7") == "a/list?page={n}"
+    assert url_pattern("http://a/issues/5f3a9c2e1b") == "a/issues/{n}"
+    assert url_pattern("http://a/docs/page1.html?title=Intro") is None
+    assert repeated_segments(["a", "b", "a", "b", "a", "b"])
+    assert repeated_segments(["x", "docs", "docs", "docs"])
+    assert not repeated_segments(["a", "b", "a", "b"])
+
+
+def test_rules_prune_and_report():
+    rules = ScopeRules(include=[r"^http://a/docs/"], exclude=[r"/tags?/", r"\.bak$"],
+                       max_path_depth=4, pattern_cap=2)
+    rules.metrics = Metrics()
+    assert rules.check("http://a/docs/intro") is None
+    assert rules.check("http://a/docs/tag/x") == "exclude /tags?/"
+    assert rules.check("http://a/docs/old.bak") == "exclude \\.bak$"
+    assert rules.check("http://a/blog/x") == "not included"
+    assert rules.check("http://a/docs/1/2/3/4") == "path depth > 4"
+    assert rules.check("http://a/docs/x/x/x") == "repeated path segments"
+    # only URLs that were actually queued count towards the cap
+    assert rules.check("http://a/docs/list?page=0") is None
+    rules.queued("http://a/docs/list?page=0")
+    assert rules.check("http://a/docs/list?page=1") is None
+    assert rules.check("http://a/docs/list?page=1") is None
+    rules.queued("http://a/docs/list?page=1")
+    assert [rules.check(f"http://a/docs/list?page={i}") for i in range(2, 4)] == ["page cap a/docs/list?page={n}"] * 2
+    # a URL is counted once, however often it is seen
+    rules.check("http://a/blog/x")
+    assert rules.report()[0] == ("page cap a/docs/list?page={n}", 2)
+    assert dict(rules.report())["not included"] == 1
+    assert rules.metrics.counters["urls_pruned"] == 7
+
+    # pattern counts carry over to a resumed crawl
+    resumed = ScopeRules(pattern_cap=2)
+    resumed.load(rules.state())
+    assert resumed.check("http://a/docs/list?page=9") == "page cap a/docs/list?page={n}"
+
+
+def test_pattern_counts_are_bounded():
+    rules = ScopeRules(pattern_cap=3, max_patterns=4)
+    for _ in range(3):
+        rules.queued("http://a/big/1")
+    for i in range(10):
+        rules.queued(f"http://a/s{i}/1")
+    # the least-seen patterns go first; the capped one is kept
+    assert len(rules.pattern_counts) <= 4
+    assert rules.check("http://a/big/2") == "page cap a/big/{n}"
+
+
+def test_invalid_rule_names_the_culprit():
+    import re
+
+    with pytest.raises(re.error):
+        ScopeRules(exclude=["ok", "(bad"])
@@ -0,0 +1,81 @@
+from wikiscrapper.sink import TreeSink, JsonlSink, BundleSink, BundleReader, iter_jsonl
+
+
+def test_tree_sink_writes_files_in_background(tmp_path):
+    sink = TreeSink(str(tmp_path), "md")
+    path = sink.write("https://a.test/docs/x", "page x")
+    assert sink.exists("https://a.test/docs/x")
+    sink.close()
+    assert path.endswith("a.test/docs/x.md")
+    assert (tmp_path / "a.test" / "docs" / "x.md").read_text(encoding="utf-8") == "page x"
+    assert TreeSink(str(tmp_path), "md").exists("https://a.test/docs/x")
+
+
+def test_jsonl_gzip_sink_appends_across_runs(tmp_path):
+    path = tmp_path / "pages.jsonl.gz"
+    sink = JsonlSink(path, "md", compression="gzip")
+    sink.write("https://a.test/1", "one")
+    sink.close()
+    sink = JsonlSink(path, "md", compression="gzip")
+    assert sink.exists("https://a.test/1")
+    sink.write("https://a.test/2", "two ü")
+    sink.close()
+    records = list(iter_jsonl(path, "gzip"))
+    assert [(r["url"], r["content"]) for r in records] == [("https://a.test/1", "one"), ("https://a.test/2", "two ü")]
+
+
+def test_bundle_sink_random_access(tmp_path):
+    sink = BundleSink(tmp_path / "bundle", "md", shard_bytes=16)
+    for i in range(5):
+        sink.write(f"https://a.test/{i}", f"page number {i} ✓")
+    sink.close()
+    assert len(list((tmp_path / "bundle").glob("shard-*.md"))) == 5
+
+    reader = BundleReader(tmp_path / "bundle")
+    assert len(reader) == 5
+    assert reader.get("https://a.test/3") == "page number 3 ✓"
+    assert reader.get("https://a.test/missing") is None
+
+
+def test_truncated_gzip_sink_is_resumed(tmp_path):
+    path = tmp_path / "pages.jsonl.gz"
+    sink = JsonlSink(path, "md", compression="gzip")
+    sink.write("https://a.test/1", "one")
+    sink.close()
+    sink = JsonlSink(path, "md", compression="gzip")
+    sink.write("https://a.test/2", "two")
+    sink.close()
+    # a crash before the end of the second gzip member was written
+    path.write_bytes(path.read_bytes()[:-10])
+    assert [r["url"] for r in iter_jsonl(path, "gzip")] == ["https://a.test/1", "https://a.test/2"]
+
+    sink = JsonlSink(path, "md", compression="gzip")
+    assert sink.exists("https://a.test/2")
+    sink.write("https://a.test/3", "three")
+    sink.close()
+    assert [r["url"] for r in iter_jsonl(path, "gzip")] == ["https://a.test/1", "https://a.test/2", "https://a.test/3"]
+
+
+def test_failed_sync_is_raised_instead_of_hanging(tmp_path):
+    import pytest
+
+    class FullDisk(JsonlSink):
+        def _sync(self):
+            raise OSError(28, "No space left on device")
+
+    sink = FullDisk(tmp_path / "pages.jsonl", "md")
+    sink.write("https://a.test/1", "one")
+    with pytest.raises(OSError):
+        sink.flush()
+    sink.write("https://a.test/2", "two")
+    with pytest.raises(OSError):
+        sink.close()
+
+
+def test_jsonl_sink_url_set_is_bounded(tmp_path):
+    sink = JsonlSink(tmp_path / "pages.jsonl", "md", max_urls=2)
+    for i in range(3):
+        sink.write(f"http://a/{i}", "# Page\n")
+    sink.close()
+    assert len(sink._urls) == 1
+    assert sink.exists("http://a/2")
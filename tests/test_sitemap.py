@@ -0,0 +1,28 @@
+import gzip
+
+from wikiscrapper.sitemap import parse_sitemap, default_sitemaps
+
+
+def test_parse_urlset_and_index():
+    urlset = (
+        b'<?xml version="1.0"?><urlset xmlns="http://www.sitemaps.org/schemas/sitemap/0.9">'
+        b"<url><loc> https://a.test/x </loc><lastmod>2024-05-01</lastmod></url>"
+        b"<url><loc>https://a.test/y</loc></url></urlset>"
+    )
+    assert list(parse_sitemap([urlset[:40], urlset[40:]])) == [
+        ("url", ("https://a.test/x", "2024-05-01")),
+        ("url", ("https://a.test/y", None)),
+    ]
+    index = b"<sitemapindex><sitemap><loc>https://a.test/s1.xml.gz</loc></sitemap></sitemapindex>"
+    assert list(parse_sitemap([index])) == [("sitemap", ("https://a.test/s1.xml.gz", None))]
+
+
+def test_gzipped_body_is_detected():
+    body = gzip.compress(b"<urlset><url><loc>https://a.test/</loc></url></urlset>")
+    chunks = [body[i:i + 7] for i in range(0, len(body), 7)]
+    assert [e.url for _, e in parse_sitemap(chunks)] == ["https://a.test/"]
+
+
+def test_default_sitemaps():
+    assert default_sitemaps("https://a.test/docs/") == ["https://a.test/sitemap.xml"]
+    assert default_sitemaps("https://a.test/", ["https://a.test/s.xml", "https://a.test/s.xml"]) == ["https://a.test/s.xml"]
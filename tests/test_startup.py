@@ -0,0 +1,12 @@
+import subprocess
+import sys
+
+# `import wikiscrapper.cli` (which is what `wikiscrapper --help` pays for) must not pull in
+# core or its dependencies; the time it takes is tracked by benchmarks/startup.py --budget-ms.
+HEAVY = ("requests", "bs4", "lxml", "markdownify", "rich", "playwright", "wikiscrapper.core")
+
+
+def test_cli_import_stays_light():
+    code = "import sys, wikiscrapper.cli; print(','.join(m for m in %r if m in sys.modules))" % (HEAVY,)
+    loaded = subprocess.run([sys.executable, "-c", code], capture_output=True, text=True, check=True).stdout.strip()
+    assert loaded == ""
@@ -0,0 +1,106 @@
+import json
+
+from wikiscrapper.storage import (
+    CheckpointJournal, SqliteValidatorStore, ValidatorStore, load_checkpoint, journal_path,
+)
+
+
+def test_journal_replays_snapshot_and_log(tmp_path):
+    path = str(tmp_path / "ckpt.json")
+    # plain JSON checkpoint written by older versions
+    (tmp_path / "ckpt.json").write_text(
+        json.dumps({"visited": ["http://a/"], "queue": [["http://a/x", 1], ["http://a/x", 1]]}), encoding="utf-8"
+    )
+    j = CheckpointJournal(path)
+    visited, queue = j.load()
+    assert visited == {"http://a/"}
+    assert queue == [("http://a/x", 1)]
+
+    j.enqueued("http://a/y", 2)
+    j.visited("http://a/x")
+    j.close()
+    # simulate a crash in the middle of an append
+    with journal_path(path).open("a", encoding="utf-8") as f:
+        f.write('{"e":"v","u":"http://a/')
+
+    visited, queue = load_checkpoint(path)
+    assert visited == {"http://a/", "http://a/x"}
+    assert queue == [("http://a/y", 2)]
+
+    j = CheckpointJournal(path)
+    j.compact(visited, queue)
+    j.close()
+    assert journal_path(path).read_text(encoding="utf-8") == ""
+    assert load_checkpoint(path) == (visited, queue)
+
+    # reopening after a torn write must not glue new events onto the partial line
+    with journal_path(path).open("a", encoding="utf-8") as f:
+        f.write('{"e":"q","u":"http://a/')
+    j = CheckpointJournal(path)
+    j.enqueued("http://a/z", 1)
+    j.close()
+    assert load_checkpoint(path)[1] == [("http://a/y", 2), ("http://a/z", 1)]
+
+
+def test_journal_events_reach_disk_only_on_flush(tmp_path):
+    path = str(tmp_path / "ckpt.json")
+    j = CheckpointJournal(path)
+    j.enqueued("http://a/x", 1)
+    j.visited("http://a/x")
+    # killed before the flush: the page isn't marked visited (its output may not be written yet)
+    assert load_checkpoint(path) == (set(), [])
+    j.flush()
+    assert load_checkpoint(path) == ({"http://a/x"}, [])
+    j.close()
+
+def test_journal_extra_survives_replay_and_compaction(tmp_path):
+    path = str(tmp_path / "ckpt.json")
+    j = CheckpointJournal(path)
+    j.load()
+    j.set_extra("rate", {"a": {"delay": 0.5, "steady": True}})
+    j.set_extra("rate", {"a": {"delay": 0.25, "steady": True}})
+    j.close()
+
+    j = CheckpointJournal(path)
+    j.load()
+    assert j.extra["rate"] == {"a": {"delay": 0.25, "steady": True}}
+    j.compact(set(), [])
+    j.close()
+    j = CheckpointJournal(path)
+    j.load()
+    assert j.extra["rate"]["a"]["delay"] == 0.25
+
+
+def test_journal_keeps_priorities(tmp_path):
+    path = str(tmp_path / "ckpt.json")
+    j = CheckpointJournal(path)
+    j.load()
+    j.enqueued("http://a/x", 2, 1.5)
+    j.enqueued("http://a/y", 1)
+    j.enqueued("http://a/x", 1, 0.5)  # shallower, but the higher priority wins
+    j.close()
+    visited, queue = load_checkpoint(path)
+    assert queue == [("http://a/x", 1, 1.5), ("http://a/y", 1)]
+
+    j = CheckpointJournal(path)
+    j.compact(visited, queue)
+    j.close()
+    assert load_checkpoint(path) == (visited, queue)
+
+
+def test_sqlite_validators_import_jsonl_and_persist(tmp_path):
+    jsonl = str(tmp_path / "validators.jsonl")
+    v = ValidatorStore(jsonl)
+    v.put("http://a/", etag='"1"', content_hash="h1", outlinks=["http://a/b"])
+    v.close()
+
+    s = SqliteValidatorStore(str(tmp_path / "validators.sqlite"), import_from=jsonl)
+    assert s.conditional_headers("http://a/") == {"If-None-Match": '"1"'}
+    s.put("http://a/b", content_hash="h2", simhash=7)
+    s.close()
+
+    s = SqliteValidatorStore(str(tmp_path / "validators.sqlite"), import_from=jsonl)
+    assert len(s) == 2
+    assert s.get("http://a/")["outlinks"] == ["http://a/b"]
+    assert dict(s.items())["http://a/b"]["simhash"] == 7
+    s.close()
@@ -0,0 +1,223 @@
+import csv
+import json
+import re
+import threading
+import time
+from collections import namedtuple
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait
+from pathlib import Path
+from urllib.parse import urlparse
+
+from rich.console import Console
+
+from .fetcher import make_session, DEFAULT_MAX_BYTES
+from .robots import RobotsCache
+from .core import run_scrape
+
+console = Console()
+
+# manifest fields; anything else is rejected so a typo doesn't silently fall back to a default
+SITE_FIELDS = ("url", "name", "selector", "depth", "format", "delay", "mode", "max_pages")
+
+Site = namedtuple("Site", SITE_FIELDS, defaults=(None,) * (len(SITE_FIELDS) - 1))
+
+_NAME_RE = re.compile(r"[^a-z0-9._-]+")
+
+def site_name(url: str) -> str:
+    """Directory name for a site: host + path, e.g. docs.example.com-guide."""
+    p = urlparse(url)
+    return _NAME_RE.sub("-", f"{p.netloc}{p.path}".lower()).strip("-.") or "site"
+
+def _read_manifest(path: Path):
+    suffix = path.suffix.lower()
+    if suffix == ".csv":
+        with path.open("r", encoding="utf-8", newline="") as f:
+            rows = [{k.strip(): (v.strip() or None) for k, v in row.items() if k} for row in csv.DictReader(f)]
+        return rows, {}
+    if suffix in (".yaml", ".yml"):
+        try:
+            import yaml
+        except ImportError as e:
+            raise RuntimeError("YAML manifests need the 'pyyaml' package (pip install pyyaml)") from e
+        with path.open("r", encoding="utf-8") as f:
+            data = yaml.safe_load(f)
+    elif suffix == ".json":
+        with path.open("r", encoding="utf-8") as f:
+            data = json.load(f)
+    else:
+        raise ValueError(f"{path}: manifest must be .json, .yaml/.yml or .csv")
+    if isinstance(data, dict):
+        return data.get("sites") or [], data.get("defaults") or {}
+    return data or [], {}
+
+def _coerce(field: str, value):
+    if value is None:
+        return None
+    if field in ("depth", "max_pages"):
+        return int(value)
+    if field == "delay":
+        return float(value)
+    return str(value)
+
+def load_manifest(path: str) -> list:
+    """
+    Sites of a batch manifest (list of Site). JSON / YAML hold a list of sites (a bare
+    string is just the url) or {"defaults": {...}, "sites": [...]}; CSV has one site per
+    row with the field names as header. Site names (output directories) are made unique.
+    """
+    path = Path(path)
+    entries, defaults = _read_manifest(path)
+    sites = []
+    names = set()
+    for i, entry in enumerate(entries, 1):
+        if isinstance(entry, str):
+            entry = {"url": entry}
+        if not isinstance(entry, dict):
+            raise ValueError(f"{path}: site {i} must be a URL or a mapping")
+        entry = {**defaults, **entry}
+        unknown = sorted(set(entry) - set(SITE_FIELDS))
+        if unknown:
+            raise ValueError(f"{path}: site {i}: unknown field(s) {', '.join(unknown)} (allowed: {', '.join(SITE_FIELDS)})")
+        if not entry.get("url") or not urlparse(entry["url"]).netloc:
+            raise ValueError(f"{path}: site {i}: missing or invalid url")
+        try:
+            site = Site(**{k: _coerce(k, v) for k, v in entry.items()})
+        except ValueError as e:
+            raise ValueError(f"{path}: site {i}: {e}") from e
+        if site.format not in (None, "md", "txt"):
+            raise ValueError(f"{path}: site {i}: format must be 'md' or 'txt'")
+        if site.mode not in (None, "docs", "site"):
+            raise ValueError(f"{path}: site {i}: mode must be 'docs' or 'site'")
+        name = base = site.name or site_name(site.url)
+        n = 2
+        while name in names:
+            name = f"{base}-{n}"
+            n += 1
+        names.add(name)
+        sites.append(site._replace(name=name))
+    return sites
+
+def run_batch(
+    sites: list,
+    output_dir: str,
+    concurrency: int = 16,
+    per_site: int = 2,
+    delay: float = 1.0,
+    depth: int = 1,
+    file_format: str = "md",
+    user_agent: str = None,
+    fresh: bool = False,
+    verbose: bool = False,
+    no_robots: bool = False,
+    incremental: bool = True,
+    sink: str = "tree",
+    max_bytes: int = DEFAULT_MAX_BYTES,
+    parse_workers: int = 0,
+    priority="auto",
+) -> dict:
+    """
+    Crawl many sites in one process: one connection pool, one robots.txt cache and at most
+    `concurrency` fetches in flight across all sites (`per_site` per site). Sites on the same
+    host run one after another so the per-host delay holds; everything else runs side by side.
+    parse_workers > 0 runs parse/format for all sites in one shared process pool; priority
+    is the crawl order of each site (see priority.make_scorer; 'auto' scores sites with max_pages).
+    Each site gets output_dir/<name>/ with its own checkpoint. Returns name -> counts (or
+    error); the same report is written to output_dir/batch-report.json.
+    """
+    out = Path(output_dir)
+    out.mkdir(parents=True, exist_ok=True)
+    headers = {"User-Agent": user_agent or "wikiscrapper/0.2 (+https://github.com/liyankova/wiki-scrapper)"}
+    # one pool per host (up to `concurrency` hosts crawled at once), per_site connections each;
+    # failed fetches are retried by each site's crawl loop, not inside urllib3
+    session = make_session(pool_size=max(10, concurrency, per_site), retries=0, retry_statuses=())
+    robots = RobotsCache(session, headers, path=str(out / ".wikiscrapper-robots.json"),
+                         prefetch_workers=min(16, max(4, concurrency // 2)))
+    slots = threading.BoundedSemaphore(max(1, concurrency))
+    stop = threading.Event()
+    results = {}
+    parse_pool = None
+    if parse_workers:
+        from concurrent.futures import ProcessPoolExecutor
+        parse_pool = ProcessPoolExecutor(max_workers=parse_workers)
+
+    groups = {}
+    for site in sites:
+        groups.setdefault(urlparse(site.url).netloc.lower(), []).append(site)
+
+    def crawl_site(site: Site):
+        site_dir = out / site.name
+        t0 = time.perf_counter()
+        stats = run_scrape(
+            start_url=site.url,
+            output_dir=str(site_dir),
+            selector=site.selector,
+            max_depth=site.depth if site.depth is not None else depth,
+            user_agent=headers["User-Agent"],
+            delay=site.delay if site.delay is not None else delay,
+            file_format=site.format or file_format,
+            same_host=(site.mode or "docs") == "docs",
+            max_pages=site.max_pages or 0,
+            checkpoint_path=str(site_dir / ".wikiscrapper-checkpoint.json"),
+            ignore_checkpoint=fresh,
+            quiet=True,
+            verbose=verbose,
+            no_robots=no_robots,
+            concurrency=per_site,
+            incremental=incremental,
+            sink=sink,
+            max_bytes=max_bytes,
+            session=session,
+            robots=robots,
+            fetch_slots=slots,
+            stop=stop,
+            progress=False,
+            parse_pool=parse_pool,
+            priority=priority,
+        )
+        return dict(stats, elapsed_s=round(time.perf_counter() - t0, 3))
+
+    def crawl_group(group):
+        for site in group:
+            if stop.is_set():
+                return
+            try:
+                results[site.name] = crawl_site(site)
+            except Exception as e:
+                results[site.name] = {"error": f"{type(e).__name__}: {e}"}
+            r = results[site.name]
+            if "error" in r:
+                console.print(f"[red]{site.name}: failed:[/red] {r['error']}")
+            else:
+                console.print(
+                    f"[green]{site.name}:[/green] Fetched: {r['fetched']}  Saved: {r['saved']}  "
+                    f"Unchanged: {r['unchanged']}  Skipped: {r['skipped']}  ({r['elapsed_s']:.1f}s)"
+                )
+
+    t0 = time.perf_counter()
+    pool = ThreadPoolExecutor(max_workers=max(1, min(len(groups), concurrency)), thread_name_prefix="wikiscrapper-site")
+    try:
+        pending = {pool.submit(crawl_group, g) for g in groups.values()}
+        while pending:
+            done, pending = wait(pending, timeout=0.5, return_when=FIRST_COMPLETED)
+            for fut in done:
+                fut.result()
+    except KeyboardInterrupt:
+        # let the running sites finish their in-flight pages and write their checkpoints
+        console.print("[yellow]Stopping: waiting for in-flight pages (checkpoints are kept)...[/yellow]")
+        stop.set()
+        raise
+    finally:
+        pool.shutdown(wait=True)
+        if parse_pool is not None:
+            parse_pool.shutdown()
+        robots.close()
+
+    report = {"elapsed_s": round(time.perf_counter() - t0, 3), "sites": results}
+    (out / "batch-report.json").write_text(json.dumps(report, indent=2) + "\n", encoding="utf-8")
+    failed = sum(1 for r in results.values() if "error" in r)
+    saved = sum(r.get("saved", 0) for r in results.values())
+    console.print(
+        f"[bold green]Batch done. Sites: {len(results)}  Failed: {failed}  Saved: {saved}  "
+        f"({report['elapsed_s']:.1f}s)[/bold green]"
+    )
+    return results
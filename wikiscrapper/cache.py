@@ -0,0 +1,89 @@
+import gzip
+import json
+from datetime import datetime
+from pathlib import Path
+
+from .storage import content_hash, _trim_torn_tail
+
+class ResponseCache:
+    """
+    Content-addressed on-disk cache of raw responses.
+
+    Bodies are gzip-compressed under objects/<aa>/<sha256>.gz, so identical
+    bodies served under different URLs are stored once. index.jsonl maps each
+    URL to its body hash, status and headers (appended, last entry wins).
+    """
+    def __init__(self, root: str):
+        self.root = Path(root)
+        self.objects = self.root / "objects"
+        self.objects.mkdir(parents=True, exist_ok=True)
+        self.index_path = self.root / "index.jsonl"
+        self._index = load_index(self.root)
+        _trim_torn_tail(self.index_path)
+        self._log = self.index_path.open("a", encoding="utf-8")
+
+    def put(self, url: str, content: bytes, headers: dict = None, status: int = 200) -> str:
+        digest = content_hash(content)
+        known = self._index.get(url)
+        if known is not None and known["hash"] == digest and known.get("status") == status:
+            return digest
+        obj = object_path(self.root, digest)
+        if not obj.exists():
+            obj.parent.mkdir(parents=True, exist_ok=True)
+            tmp = obj.with_suffix(".tmp")
+            with gzip.open(tmp, "wb") as f:
+                f.write(content)
+            tmp.replace(obj)
+        entry = {
+            "url": url,
+            "hash": digest,
+            "status": status,
+            "headers": dict(headers or {}),
+            "fetched_at": datetime.utcnow().isoformat() + "Z",
+        }
+        self._index[url] = entry
+        self._log.write(json.dumps(entry, separators=(",", ":")) + "\n")
+        return digest
+
+    def get(self, url: str):
+        """Return (content bytes, entry) or None if url is not cached."""
+        entry = self._index.get(url)
+        if entry is None:
+            return None
+        return read_object(self.root, entry["hash"]), entry
+
+    def has(self, url: str) -> bool:
+        return url in self._index
+
+    def urls(self) -> list:
+        return list(self._index)
+
+    def flush(self):
+        self._log.flush()
+
+    def close(self):
+        self._log.close()
+
+    def __len__(self):
+        return len(self._index)
+
+def object_path(root, digest: str) -> Path:
+    return Path(root) / "objects" / digest[:2] / f"{digest}.gz"
+
+def read_object(root, digest: str) -> bytes:
+    with gzip.open(object_path(root, digest), "rb") as f:
+        return f.read()
+
+def load_index(root) -> dict:
+    """Read index.jsonl without opening the cache for writing (used by reprocess workers)."""
+    index = {}
+    p = Path(root) / "index.jsonl"
+    if p.exists():
+        with p.open("r", encoding="utf-8") as f:
+            for line in f:
+                try:
+                    entry = json.loads(line)
+                except ValueError:
+                    continue
+                index[entry["url"]] = entry
+    return index
@@ -1,13 +1,26 @@
 import typer
+import re
+from typing import List
 from typing_extensions import Annotated
-from rich.console import Console
 from urllib.parse import urlparse
 from pathlib import Path
+from functools import partial
 
-from . import core
+# Startup matters (the CLI is launched from cron fan-outs): everything beyond typer --
+# rich, requests, bs4, lxml, core -- is imported inside the command that needs it.
+# tests/test_startup.py keeps `import wikiscrapper.cli` within a time budget.
 
 app = typer.Typer(name="wikiscrapper", help="Scrape documentation sites (compact CLI)", add_completion=False)
-console = Console()
+
+class _LazyConsole:
+    """rich.console.Console, created on first use."""
+    def __getattr__(self, name):
+        global console
+        from rich.console import Console
+        console = Console()
+        return getattr(console, name)
+
+console = _LazyConsole()
 
 # Compact flags:
 OptOut = Annotated[str, typer.Option("-o", "--output", help="Output directory (default: ./llm_docs)")]
@@ -15,9 +28,35 @@ OptDepth = Annotated[int, typer.Option("-d", "--depth", help="Depth (0=start onl
 OptSelector = Annotated[str, typer.Option("-s", "--selector", help="CSS selector (comma-separated). If omitted, auto-detect.)")]
 OptFormat = Annotated[str, typer.Option("-f", "--format", help="Output format: md or txt")]
 OptJs = Annotated[bool, typer.Option("-j", "--js", help="Enable JS render (Playwright, opt-in)")]
+OptJsWait = Annotated[str, typer.Option("--js-wait", help="JS readiness: load, domcontentloaded, networkidle, or a CSS selector to wait for")]
 OptFresh = Annotated[bool, typer.Option("-F", "--fresh", help="Ignore existing checkpoint and start fresh")]
 OptQuiet = Annotated[bool, typer.Option("-q", "--quiet", help="Quiet mode (compact progress)")]
 OptVerbose = Annotated[bool, typer.Option("-v", "--verbose", help="Verbose mode (show saved paths and warnings)")]
+OptConcurrency = Annotated[int, typer.Option("-c", "--concurrency", help="Max in-flight requests (1 = serial). Delay is enforced per host.")]
+OptNoIncremental = Annotated[bool, typer.Option("--no-incremental", help="Refetch and rewrite every page (ignore stored ETag/Last-Modified/hash).")]
+OptCache = Annotated[str, typer.Option("--cache", help="Keep raw responses in this directory (for `reprocess`).")]
+OptSitemap = Annotated[bool, typer.Option("--sitemap", help="Seed the crawl from sitemap.xml / robots.txt Sitemap: lines (uses <lastmod> on re-runs).")]
+OptSink = Annotated[str, typer.Option("--sink", help="Output layout: tree (one file per page), jsonl, jsonl.gz, jsonl.zst or bundle (sharded, indexed).")]
+OptDedup = Annotated[str, typer.Option("--dedup", help="Near-duplicate pages: 'skip' them, or 'alias' (skip and list them in aliases.jsonl).")]
+OptMetrics = Annotated[str, typer.Option("--metrics", help="Write a JSON report of per-stage timings, bytes and statuses to this file.")]
+OptPrometheus = Annotated[str, typer.Option("--prometheus", help="Keep a Prometheus text file with the crawl metrics up to date (textfile collector).")]
+OptProfile = Annotated[bool, typer.Option("--profile", help="Run under cProfile + tracemalloc; results go to OUTPUT/profile*.")]
+OptMaxSize = Annotated[float, typer.Option("--max-size", help="Skip pages whose body is larger than this many MB (0 = no limit).")]
+OptMaxDelay = Annotated[float, typer.Option("--max-delay", help="Adapt the per-host delay between --delay (floor) and this ceiling (AIMD; backs off on 429/503).")]
+OptFrontier = Annotated[str, typer.Option("--frontier", help="Frontier/visited store: 'memory' (default) or 'sqlite' (on disk next to --checkpoint, for very large crawls).")]
+OptProcs = Annotated[int, typer.Option("--procs", help="Split the crawl across N worker processes sharing one frontier (output in OUTPUT/worker-NN).")]
+OptShard = Annotated[str, typer.Option("--shard", help="Run shard I of an N-shard crawl (e.g. 2/4; with --procs P, shards I..I+P-1) on a machine that mounts the same OUTPUT. Machines must not run the same shard.")]
+OptShardBy = Annotated[str, typer.Option("--shard-by", help="Split URLs between workers by 'url' (hash) or 'host' (keeps each host's delay in one worker).")]
+OptMaxPages = Annotated[int, typer.Option("--max-pages", help="Stop after saving this many pages (0 = no limit).")]
+OptPriority = Annotated[str, typer.Option("--priority", help="Crawl order: 'auto' (scored with --max-pages, else BFS), 'bfs', 'score', or module:function(url, depth, anchor, inlinks) -> float.")]
+OptPriorityKeywords = Annotated[str, typer.Option("--priority-keywords", help="Comma-separated link-text keywords that raise a page's priority (default: api, reference, guide, ...).")]
+OptInclude = Annotated[List[str], typer.Option("--include", help="Only queue URLs matching this regex (repeatable).")]
+OptExclude = Annotated[List[str], typer.Option("--exclude", help="Never queue URLs matching this regex (repeatable).")]
+OptStripParam = Annotated[List[str], typer.Option("--strip-param", help="Drop this query parameter (glob, repeatable) on top of the built-in tracking/session list.")]
+OptMaxPathDepth = Annotated[int, typer.Option("--max-path-depth", help="Skip URLs with more path segments than this (0 = no limit).")]
+OptPatternCap = Annotated[int, typer.Option("--pattern-cap", help="Queue at most this many URLs per pattern with numbers/dates/ids in it, e.g. calendars or ?page=N (0 = no limit).")]
+OptRetries = Annotated[int, typer.Option("--retries", help="Retry a failed page (timeout, 5xx, 429) up to this many times, with growing delays, while the crawl goes on.")]
+OptWorkers = Annotated[int, typer.Option("-w", "--workers", help="Worker processes for parse/format (0 = in the main process).")]
 OptMode = Annotated[str, typer.Option("--mode", help="Preset mode: 'docs' (default) or 'site')")]
 # Hidden/opt-in: ignore robots.txt (use responsibly). Not documented in README.
 OptNoRobots = Annotated[bool, typer.Option("--no-robots", help="Ignore robots.txt (use responsibly).")]  # hidden gem (opt-in)
@@ -30,23 +69,138 @@ def run(
     selector: OptSelector = None,
     file_format: OptFormat = "md",
     delay: float = 1.0,
+    concurrency: OptConcurrency = 1,
+    workers: OptWorkers = 0,
     ua: str = "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/115.0 Safari/537.36",
     js: OptJs = False,
+    js_wait: OptJsWait = "networkidle",
     fresh: OptFresh = False,
     quiet: OptQuiet = False,
     verbose: OptVerbose = False,
     mode: OptMode = "docs",
     checkpoint: str = "wikiscrapper-checkpoint.json",
     no_robots: OptNoRobots = False,
+    no_incremental: OptNoIncremental = False,
+    cache: OptCache = None,
+    sitemap: OptSitemap = False,
+    sink: OptSink = "tree",
+    dedup: OptDedup = None,
+    metrics: OptMetrics = None,
+    prometheus: OptPrometheus = None,
+    profile: OptProfile = False,
+    max_size: OptMaxSize = 10,
+    max_delay: OptMaxDelay = None,
+    frontier: OptFrontier = "memory",
+    procs: OptProcs = 1,
+    shard: OptShard = None,
+    shard_by: OptShardBy = "url",
+    max_pages: OptMaxPages = 0,
+    priority: OptPriority = "auto",
+    priority_keywords: OptPriorityKeywords = None,
+    include: OptInclude = None,
+    exclude: OptExclude = None,
+    strip_param: OptStripParam = None,
+    max_path_depth: OptMaxPathDepth = 15,
+    pattern_cap: OptPatternCap = 500,
+    retries: OptRetries = 3,
 ):
     """
     Compact CLI: fewer flags. Example:
       wikiscrapper run https://example.com/docs -s "article,.content" -d 1 -o ./out -v
     """
+    from . import core
+    from .distributed import SHARD_BY
+    from .priority import make_scorer
+    from .scope import ScopeRules
+    from .sink import SINK_KINDS, require_sink
+
     if file_format not in ("md", "txt"):
         console.print("[red]--format must be 'md' or 'txt'[/red]")
         raise typer.Exit(1)
 
+    if concurrency < 1:
+        console.print("[red]--concurrency must be >= 1[/red]")
+        raise typer.Exit(1)
+
+    if workers < 0:
+        console.print("[red]--workers must be >= 0[/red]")
+        raise typer.Exit(1)
+
+    if max_size < 0:
+        console.print("[red]--max-size must be >= 0[/red]")
+        raise typer.Exit(1)
+
+    if max_delay is not None and max_delay < delay:
+        console.print("[red]--max-delay must be >= --delay[/red]")
+        raise typer.Exit(1)
+
+    if frontier not in ("memory", "sqlite"):
+        console.print("[red]--frontier must be 'memory' or 'sqlite'[/red]")
+        raise typer.Exit(1)
+
+    if procs < 1:
+        console.print("[red]--procs must be >= 1[/red]")
+        raise typer.Exit(1)
+
+    if shard_by not in SHARD_BY:
+        console.print("[red]--shard-by must be 'url' or 'host'[/red]")
+        raise typer.Exit(1)
+
+    shard_index = None
+    if shard is not None:
+        try:
+            i, n = (int(x) for x in shard.split("/"))
+        except ValueError:
+            i, n = -1, 0
+        if not 0 <= i < n:
+            console.print("[red]--shard must look like I/N with 0 <= I < N[/red]")
+            raise typer.Exit(1)
+        shard_index = (i, n)
+        if i + procs > n:
+            console.print(f"[red]--shard {shard} with --procs {procs} runs shards past {n - 1}[/red]")
+            raise typer.Exit(1)
+
+    if dedup not in (None, "skip", "alias"):
+        console.print("[red]--dedup must be 'skip' or 'alias'[/red]")
+        raise typer.Exit(1)
+
+    if sink not in SINK_KINDS:
+        console.print(f"[red]--sink must be one of: {', '.join(SINK_KINDS)}[/red]")
+        raise typer.Exit(1)
+    try:
+        require_sink(sink)
+    except RuntimeError as e:
+        console.print(f"[red]{e}[/red]")
+        raise typer.Exit(1)
+
+    if max_pages < 0:
+        console.print("[red]--max-pages must be >= 0[/red]")
+        raise typer.Exit(1)
+
+    # the priority queue lives in memory: sqlite / shared frontiers crawl in BFS order
+    disk_frontier = frontier != "memory" or procs > 1 or shard is not None
+    if priority == "auto" and disk_frontier:
+        priority = "bfs"
+    elif priority != "bfs" and disk_frontier:
+        console.print("[red]--priority needs the in-memory frontier (not --frontier sqlite, --procs or --shard)[/red]")
+        raise typer.Exit(1)
+    try:
+        make_scorer(priority, url)
+    except ValueError as e:
+        console.print(f"[red]{e}[/red]")
+        raise typer.Exit(1)
+    keywords = [k.strip() for k in priority_keywords.split(",") if k.strip()] if priority_keywords else None
+
+    if max_path_depth < 0 or pattern_cap < 0 or retries < 0:
+        console.print("[red]--max-path-depth, --pattern-cap and --retries must be >= 0[/red]")
+        raise typer.Exit(1)
+
+    try:
+        ScopeRules(include, exclude)
+    except re.error as e:
+        console.print(f"[red]Invalid --include / --exclude regex:[/red] {e}")
+        raise typer.Exit(1)
+
     parsed = urlparse(url)
     if not parsed.netloc:
         console.print(f"[red]Invalid URL: {url}[/red]")
@@ -61,16 +215,38 @@ def run(
         mode = "docs"
 
     # Show compact startup summary
-    console.print(f"--- [green]WikiScrapper v2[/green] ---")
+    console.print("--- [green]WikiScrapper v2[/green] ---")
     console.print(f"URL: {url}  Mode: {mode}  Out: {out_path}")
-    console.print(f"Selector: {selector or '(auto)'}  Depth: {depth}  Format: {file_format}  JS: {js}")
+    console.print(f"Selector: {selector or '(auto)'}  Depth: {depth}  Format: {file_format}  Sink: {sink}  JS: {js}  Concurrency: {concurrency}  Workers: {workers}")
     console.print(f"Fresh: {fresh}  Checkpoint: {checkpoint}  Quiet: {quiet}  Verbose: {verbose}")
+    if max_pages:
+        console.print(f"Max pages: {max_pages}  Priority: {priority}")
     # Keep the no-robots flag output minimal (hidden gem). Only warn if set.
     if no_robots:
         console.print("[yellow]Warning: running with --no-robots (ignoring robots.txt). Use responsibly.[/yellow]")
     console.print("-----------------------------")
 
-    core.run_scrape(
+    if procs > 1:
+        # coordinator: seed the shared frontier and run the workers (of this machine's shards) locally
+        from .distributed import run_workers
+        target = partial(run_workers, procs=procs, shard_by=shard_by,
+                         shards=shard_index[1] if shard_index else None, first_shard=shard_index[0] if shard_index else 0)
+    elif shard_index is not None:
+        from .distributed import init_shared, shared_db_path, worker_output_dir
+        from .utils import normalize_url
+        db_path = shared_db_path(str(out_path))
+        try:
+            init_shared(db_path, normalize_url(url), shard_index[1], shard_by)
+        except ValueError as e:
+            console.print(f"[red]{e}[/red]")
+            raise typer.Exit(1)
+        target = partial(core.run_scrape, shared_frontier=db_path, shard=shard_index, shard_by=shard_by)
+        out_path = Path(worker_output_dir(str(out_path), shard_index[0]))
+    else:
+        target = core.run_scrape
+
+    scrape = partial(
+        target,
         start_url=url,
         output_dir=str(out_path),
         selector=selector,
@@ -79,11 +255,177 @@ def run(
         delay=delay,
         file_format=file_format,
         same_host=(mode == "docs"),
-        max_pages=0,
+        max_pages=max_pages,
         checkpoint_path=checkpoint,
         js_render=js,
         ignore_checkpoint=fresh,
         quiet=quiet,
         verbose=verbose,
         no_robots=no_robots,
+        concurrency=concurrency,
+        incremental=not no_incremental,
+        cache_dir=str(Path(cache).expanduser().resolve()) if cache else None,
+        parse_workers=workers,
+        js_wait=js_wait,
+        use_sitemap=sitemap,
+        sink=sink,
+        dedup=dedup,
+        metrics_path=metrics,
+        prometheus_path=prometheus,
+        max_bytes=int(max_size * 1024 * 1024),
+        max_delay=max_delay,
+        frontier_store=frontier,
+        priority=priority,
+        priority_keywords=keywords,
+        include=include,
+        exclude=exclude,
+        strip_params=strip_param,
+        max_path_depth=max_path_depth,
+        pattern_cap=pattern_cap,
+        retries=retries,
     )
+    if not profile:
+        ok = scrape()
+    else:
+        from .metrics import profiled
+        prefix = str(out_path / "profile")
+        with profiled(prefix):
+            ok = scrape()
+        console.print(f"[blue]Profile written:[/blue] {prefix}.pstats, {prefix}-cpu.txt, {prefix}-memory.txt")
+    # run_workers reports whether every shard finished
+    if ok is False:
+        raise typer.Exit(1)
+
+@app.command()
+def reprocess(
+    cache_dir: Annotated[str, typer.Argument(..., metavar="CACHE_DIR")],
+    output: OptOut = "llm_docs",
+    selector: OptSelector = None,
+    file_format: OptFormat = "md",
+    workers: Annotated[int, typer.Option("-w", "--workers", help="Worker processes (0 = one per core).")] = 0,
+    quiet: OptQuiet = False,
+    verbose: OptVerbose = False,
+):
+    """
+    Re-run extraction over a --cache directory without touching the network. Example:
+      wikiscrapper reprocess ./cache -s "article" -f txt -o ./out
+    """
+    from . import core
+
+    if file_format not in ("md", "txt"):
+        console.print("[red]--format must be 'md' or 'txt'[/red]")
+        raise typer.Exit(1)
+
+    cache_path = Path(cache_dir).expanduser().resolve()
+    if not (cache_path / "index.jsonl").exists():
+        console.print(f"[red]Not a response cache: {cache_path}[/red]")
+        raise typer.Exit(1)
+
+    out_path = Path(output).expanduser().resolve()
+    out_path.mkdir(parents=True, exist_ok=True)
+
+    core.reprocess_cache(
+        cache_dir=str(cache_path),
+        output_dir=str(out_path),
+        selector=selector,
+        file_format=file_format,
+        workers=workers,
+        quiet=quiet,
+        verbose=verbose,
+    )
+
+@app.command()
+def batch(
+    manifest: Annotated[str, typer.Argument(..., metavar="MANIFEST")],
+    output: OptOut = "llm_docs",
+    depth: OptDepth = 1,
+    file_format: OptFormat = "md",
+    delay: float = 1.0,
+    concurrency: Annotated[int, typer.Option("-c", "--concurrency", help="Max in-flight requests across all sites.")] = 16,
+    per_site: Annotated[int, typer.Option("--per-site", help="Max in-flight requests per site.")] = 2,
+    workers: Annotated[int, typer.Option("-w", "--workers", help="Worker processes for parse/format, shared by all sites (0 = in the main process).")] = 0,
+    ua: str = "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/115.0 Safari/537.36",
+    fresh: OptFresh = False,
+    verbose: OptVerbose = False,
+    no_robots: OptNoRobots = False,
+    no_incremental: OptNoIncremental = False,
+    sink: OptSink = "tree",
+    max_size: OptMaxSize = 10,
+    priority: OptPriority = "auto",
+):
+    """
+    Crawl every site of a manifest (.json, .yaml or .csv: url, name, selector, depth, format,
+    delay, mode, max_pages) in one process; each site goes to OUTPUT/<name>. Example:
+      wikiscrapper batch sites.yaml -c 32 -o ./out
+    Depth, format and delay given here are defaults for sites that don't set them.
+    """
+    from .batch import load_manifest, run_batch
+    from .priority import make_scorer
+    from .sink import SINK_KINDS, require_sink
+
+    if file_format not in ("md", "txt"):
+        console.print("[red]--format must be 'md' or 'txt'[/red]")
+        raise typer.Exit(1)
+
+    if concurrency < 1 or per_site < 1:
+        console.print("[red]--concurrency and --per-site must be >= 1[/red]")
+        raise typer.Exit(1)
+
+    if workers < 0:
+        console.print("[red]--workers must be >= 0[/red]")
+        raise typer.Exit(1)
+
+    if max_size < 0:
+        console.print("[red]--max-size must be >= 0[/red]")
+        raise typer.Exit(1)
+
+    if sink not in SINK_KINDS:
+        console.print(f"[red]--sink must be one of: {', '.join(SINK_KINDS)}[/red]")
+        raise typer.Exit(1)
+    try:
+        require_sink(sink)
+    except RuntimeError as e:
+        console.print(f"[red]{e}[/red]")
+        raise typer.Exit(1)
+
+    try:
+        make_scorer(priority, "http://example.com/")
+    except ValueError as e:
+        console.print(f"[red]{e}[/red]")
+        raise typer.Exit(1)
+
+    try:
+        sites = load_manifest(manifest)
+    except (OSError, ValueError, RuntimeError) as e:
+        console.print(f"[red]Invalid manifest:[/red] {e}")
+        raise typer.Exit(1)
+    if not sites:
+        console.print(f"[yellow]No sites in {manifest}[/yellow]")
+        return
+
+    out_path = Path(output).expanduser().resolve()
+    console.print("--- [green]WikiScrapper v2 batch[/green] ---")
+    console.print(f"Manifest: {manifest}  Sites: {len(sites)}  Out: {out_path}")
+    console.print(f"Concurrency: {concurrency} (per site {per_site})  Workers: {workers}  Depth: {depth}  Format: {file_format}  Sink: {sink}")
+    console.print("-----------------------------")
+
+    results = run_batch(
+        sites,
+        str(out_path),
+        concurrency=concurrency,
+        per_site=per_site,
+        delay=delay,
+        depth=depth,
+        file_format=file_format,
+        user_agent=ua,
+        fresh=fresh,
+        verbose=verbose,
+        no_robots=no_robots,
+        incremental=not no_incremental,
+        sink=sink,
+        max_bytes=int(max_size * 1024 * 1024),
+        parse_workers=workers,
+        priority=priority,
+    )
+    if any("error" in r for r in results.values()):
+        raise typer.Exit(1)
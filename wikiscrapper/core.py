@@ -1,33 +1,81 @@
+import json
 import time
 from datetime import datetime
-from collections import deque
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
 from urllib.parse import urlparse
 from rich.console import Console
 from pathlib import Path
 import re
 
-from .fetcher import make_session, fetch
+from .fetcher import make_session, fetch, is_denied_url, parse_retry_after, SkippedContent, DEFAULT_MAX_BYTES
 from .robots import RobotsCache
-from .utils import normalize_url, is_same_domain, url_to_filepath, ensure_relative_link, detect_best_selector
-from .formatter import html_to_markdown, html_to_text, make_frontmatter
-from .storage import save_checkpoint, load_checkpoint
-from bs4 import BeautifulSoup
+from .scheduler import HostScheduler, RateController, RetryLane, host_of
+from .frontier import Frontier, SqliteFrontier
+from .priority import make_scorer
+from .scope import ScopeRules, DEFAULT_STRIP_PARAMS
+from .utils import normalize_url, is_same_domain, url_to_filepath
+from .pipeline import choose_parser, extract_page
+from .storage import CheckpointJournal, SqliteValidatorStore, ValidatorStore, content_hash
+from .cache import ResponseCache, load_index, read_object
+from .sink import make_sink
+from .dedup import NearDuplicateFilter
+from .metrics import Metrics
 import requests
 
 console = Console()
 
-def _choose_parser():
-    try:
-        import lxml
-        return "lxml"
-    except Exception:
-        return "html.parser"
-
 def _slugify(s: str) -> str:
     s = re.sub(r"[^A-Za-z0-9\-_\.]", "-", s)
     s = re.sub(r"-{2,}", "-", s)
     return s.strip("-")[:120] or "page"
 
+class RenderedResponse:
+    """Minimal stand-in for a requests.Response built from rendered HTML."""
+    status_code = 200
+    encoding = "utf-8"
+
+    def __init__(self, html: str):
+        self.content = html.encode("utf-8")
+        self.headers = {}
+
+def _start_renderer(size: int, user_agent: str, wait_for: str):
+    """Launch the shared browser pool for --js; None (simple fetch) if Playwright can't run."""
+    try:
+        from .renderer import BrowserPool
+    except Exception as re_imp:
+        console.print(f"[red]Playwright renderer import failed:[/red] {re_imp} — falling back to simple fetch.")
+        return None
+    try:
+        return BrowserPool(size=size, user_agent=user_agent, wait_for=wait_for).start()
+    except RuntimeError as re:
+        console.print(f"[red]JS render unavailable:[/red] {re} — falling back to simple fetch.")
+        return None
+
+def _fetch_page(session, url: str, headers: dict, renderer=None, validators: dict = None, metrics=None,
+                max_bytes: int = DEFAULT_MAX_BYTES, slots=None):
+    """
+    Fetch a single page, through the shared browser pool if renderer is set.
+    Safe to call from worker threads; raises requests exceptions on failure.
+    validators are conditional request headers (ignored for JS rendering).
+    slots (a semaphore) caps fetches across several crawls running side by side.
+    """
+    if slots is not None:
+        with slots:
+            return _fetch_page(session, url, headers, renderer, validators, metrics, max_bytes)
+    if renderer is not None:
+        try:
+            timeout_ms = int(getattr(session, "request_timeout", 10) * 1000)
+            t0 = time.perf_counter()
+            resp = RenderedResponse(renderer.render(url, timeout=timeout_ms))
+            if metrics is not None:
+                metrics.observe("render", time.perf_counter() - t0)
+                metrics.inc("bytes_in", len(resp.content))
+            return resp
+        except RuntimeError as re:
+            console.print(f"[red]JS render failed:[/red] {re} — falling back to simple fetch.")
+            return fetch(session, url, headers, metrics=metrics, max_bytes=max_bytes)
+    return fetch(session, url, headers, validators=validators, metrics=metrics, max_bytes=max_bytes)
+
 def run_scrape(
     start_url: str,
     output_dir: str,
@@ -44,134 +92,454 @@ def run_scrape(
     quiet: bool = False,
     verbose: bool = False,
     no_robots: bool = False,  # <-- new param to ignore robots.txt when True
+    concurrency: int = 1,
+    incremental: bool = True,
+    validators_path: str = None,
+    cache_dir: str = None,
+    parse_workers: int = 0,
+    js_wait: str = "networkidle",
+    use_sitemap: bool = False,
+    sink: str = "tree",
+    dedup: str = None,
+    dedup_threshold: int = 3,
+    metrics_path: str = None,
+    prometheus_path: str = None,
+    prometheus_every: float = 15.0,
+    max_bytes: int = DEFAULT_MAX_BYTES,
+    max_delay: float = None,
+    frontier_store: str = "memory",
+    shared_frontier: str = None,
+    shard: tuple = None,
+    shard_by: str = "url",
+    priority="bfs",
+    priority_keywords=None,
+    include=None,
+    exclude=None,
+    strip_params=None,
+    max_path_depth: int = 15,
+    pattern_cap: int = 500,
+    retries: int = 3,
+    retry_backoff: float = 2.0,
+    session=None,
+    robots=None,
+    fetch_slots=None,
+    stop=None,
+    progress: bool = True,
+    parse_pool=None,
 ):
-    session = make_session()
+    """
+    Crawl from start_url and write the extracted pages to output_dir; returns the page counts.
+    session / robots / fetch_slots / parse_pool / stop let several crawls share one connection
+    pool, one robots.txt cache, one fetch cap and one parse process pool, and be stopped from
+    outside (see batch.run_batch);
+    progress=False leaves the progress line to the caller.
+    priority picks the crawl order: 'bfs', 'score' (priority.LinkScorer), 'auto' (score
+    when max_pages is set), 'module:function' or a callable (see priority.make_scorer).
+    include / exclude / strip_params (added to scope.DEFAULT_STRIP_PARAMS) / max_path_depth /
+    pattern_cap decide which discovered URLs are queued (see scope.ScopeRules).
+    Failed fetches are retried up to `retries` times with exponential backoff from
+    retry_backoff seconds, without holding up the crawl (see scheduler.RetryLane).
+    A worker of a crawl sharded by URL (shard=(i, n), shard_by='url') waits n times the
+    delays, so a host still gets one request per `delay` from all workers together.
+    """
+    # budgeted crawls: fetch the most valuable pages first instead of plain BFS
+    score = make_scorer(priority, normalize_url(start_url), max_pages, priority_keywords)
+    if score is not None and (shared_frontier or frontier_store == "sqlite"):
+        raise ValueError("Prioritized crawls need the in-memory frontier (not --frontier sqlite or --procs)")
+    # per-stage timings, bytes and statuses; exported with metrics_path / prometheus_path
+    metrics = Metrics()
+    # scope rules and crawler-trap heuristics, applied before a URL is queued
+    scope = ScopeRules(include, exclude, DEFAULT_STRIP_PARAMS + tuple(strip_params or ()), max_path_depth, pattern_cap,
+                       metrics=metrics)
+    # workers of a shared crawl keep their own pattern counts
+    scope_key = "scope" if shard is None else f"scope-{shard[0]}"
+    retry_key = "retry" if shard is None else f"retry-{shard[0]}"
+    rate_key = "rate" if shard is None else f"rate-{shard[0]}"
+    # sharded by URL, every worker hits every host: each one keeps 1/N of the polite rate
+    politeness = shard[1] if shard is not None and shard_by == "url" else 1
+    delay = (delay or 0) * politeness
+    max_delay = max_delay * politeness if max_delay is not None else None
+    # adaptive rate control: per-host delay between `delay` (floor) and `max_delay` (ceiling)
+    rate = RateController(delay, max_delay) if max_delay is not None and max_delay > (delay or 0) else None
+    if session is None:
+        # failures come back to the crawl loop (retry lane, rate control) instead of a blocking backoff in urllib3
+        session = make_session(pool_size=max(10, concurrency), retries=0, retry_statuses=())
+    prometheus_written = time.monotonic()
     headers = {"User-Agent": user_agent or "wikiscrapper/0.2 (+https://github.com/liyankova/wiki-scrapper)"}
-    robots = RobotsCache()
-    parser = _choose_parser()
+    # robots.txt goes through the same pooled session; kept next to the output for a day
+    owns_robots = robots is None
+    if owns_robots:
+        robots = RobotsCache(session, headers, path=str(Path(output_dir) / ".wikiscrapper-robots.json"))
+    # hosts whose Crawl-delay / Request-rate has been applied to the scheduler
+    robots_delay_applied = set()
+    parser = choose_parser()
+    concurrency = max(1, int(concurrency or 1))
+    # politeness is enforced per host instead of a global sleep after every page
+    scheduler = HostScheduler(rate.ceiling if rate is not None else delay)
 
     start_norm = normalize_url(start_url)
     base_domain = urlparse(start_url).netloc
 
-    visited, queue = (set(), [])
-    if not ignore_checkpoint:
-        visited, queue = load_checkpoint(checkpoint_path)
+    if shared_frontier:
+        # one of several workers (see distributed.run_workers): claims URLs of its shard from the shared database
+        journal = None
+        from .distributed import SharedFrontier
+        frontier = SharedFrontier(shared_frontier, shard[0], shard[1], shard_by)
+        checkpoint_store = frontier
+    elif frontier_store == "sqlite":
+        # disk-backed frontier: the database is the checkpoint and nothing is loaded into memory on resume
+        journal = None
+        frontier = SqliteFrontier(str(Path(checkpoint_path).with_suffix(".sqlite")), fresh=ignore_checkpoint)
+        if not frontier.is_empty():
+            console.print(f"[yellow]Resuming from checkpoint:[/yellow] visited={frontier.visited_count()}, queued={len(frontier)}")
+        checkpoint_store = frontier
+    else:
+        # append-only checkpoint: snapshot + event log (plain JSON checkpoints from older versions load too)
+        journal = CheckpointJournal(checkpoint_path, fresh=ignore_checkpoint)
+        visited, queue = journal.load()
         if visited or queue:
             console.print(f"[yellow]Resuming from checkpoint:[/yellow] visited={len(visited)}, queued={len(queue)}")
+        # the frontier rejects duplicates at enqueue time (also collapses duplicates from old checkpoints)
+        frontier = Frontier(visited, queue, journal=journal, score=score)
+        checkpoint_store = journal
+    fresh_crawl = frontier.is_empty()
+    if fresh_crawl:
+        frontier.add(start_norm, 0)
+    if rate is not None:
+        # pick up the rates learned by the previous run instead of slow-starting again
+        rate.load(checkpoint_store.extra.get(rate_key))
+        for host in rate.state():
+            scheduler.set_delay(host, rate.delay(host))
+    scope.load(checkpoint_store.extra.get(scope_key))
+    # failed fetches wait here (with exponential backoff) while the crawl goes on; attempt counts are checkpointed
+    retry_lane = RetryLane(max_attempts=max(0, int(retries)) + 1, base=retry_backoff)
+    retry_lane.load(checkpoint_store.extra.get(retry_key))
+    extra_saved = time.monotonic()
+    journal_flushed = time.monotonic()
+    # pages given up on (permanent errors, out of retries): counted per status / error and listed in failures.jsonl
+    failures = {}
+    failures_path = Path(output_dir) / "failures.jsonl"
+    failure_log = None
+    if fresh_crawl and failures_path.exists():
+        failures_path.unlink()
 
-    if not visited and not queue:
-        queue = deque([(start_norm, 0)])
-        visited = set()
-    else:
-        queue = deque(queue)
+    # urls handed to a fetch worker but not processed yet
+    fetching = set()
+    # urls whose parse/format job is running in the process pool
+    parsing = set()
+    parse_workers = max(0, int(parse_workers or 0))
+
+    # incremental re-crawl: ETag / Last-Modified / body hash + outlinks per URL, kept across runs
+    # (on disk with the disk frontiers, where memory has to stay flat)
+    disk_state = frontier_store == "sqlite" or shared_frontier is not None
+    validators = None
+    if incremental:
+        validators_jsonl = validators_path or str(Path(output_dir) / ".wikiscrapper-validators.jsonl")
+        if disk_state:
+            validators = SqliteValidatorStore(str(Path(validators_jsonl).with_suffix(".sqlite")), import_from=validators_jsonl)
+        else:
+            validators = ValidatorStore(validators_jsonl)
+    # optional raw response cache, for re-running extraction offline (see reprocess_cache)
+    cache = ResponseCache(cache_dir) if cache_dir else None
+    # extracted pages are handed to a background writer (file tree, JSONL or sharded bundle)
+    output = make_sink(sink, output_dir, file_format, metrics=metrics, max_urls=100_000 if disk_state else None)
+    # pages are only reusable if they were written with the same output settings
+    settings_key = f"{file_format}|{selector or 'auto'}"
+
+    # near-duplicate pages (by SimHash of the extracted text) are skipped ("skip") or
+    # also listed in output_dir/aliases.jsonl ("alias"); fingerprints persist with the validators
+    near_dups = None
+    aliases = None
+    if dedup:
+        near_dups = NearDuplicateFilter(dedup_threshold)
+        if validators is not None:
+            for url, entry in validators.items():
+                if entry.get("simhash") is not None and entry.get("settings") == settings_key:
+                    near_dups.index.add(url, entry["simhash"])
+        if dedup == "alias":
+            Path(output_dir).mkdir(parents=True, exist_ok=True)
+            aliases = (Path(output_dir) / "aliases.jsonl").open("a", encoding="utf-8")
 
     pages_saved = 0
     pages_fetched = 0
     skipped = 0
+    unchanged = 0
+    duplicates = 0
+
+    # url -> sitemap <lastmod>; stored with the validators so the next run can skip pages that didn't change
+    sitemap_lastmod = {}
+    # with several workers, one of them reads the sitemaps for everybody
+    if use_sitemap and (shard is None or shard[0] == 0):
+        # sitemap pages are seeded at max depth: they are fetched, but not mined for more links
+        seeded = 0
+        robots_maps = [] if no_robots else robots.sitemaps(start_norm)
+        from .sitemap import iter_sitemap_urls, default_sitemaps
+        for entry in iter_sitemap_urls(session, default_sitemaps(start_norm, robots_maps), headers):
+            url = scope.canonical(normalize_url(entry.url))
+            if is_denied_url(url) or (same_host and not is_same_domain(url, base_domain)):
+                continue
+            if entry.lastmod:
+                sitemap_lastmod[url] = entry.lastmod
+            if frontier.is_seen(url):
+                continue
+            prev = validators.get(url) if validators is not None else None
+            if (
+                entry.lastmod
+                and prev
+                and prev.get("lastmod") == entry.lastmod
+                and prev.get("settings") == settings_key
+                and output.exists(url)
+            ):
+                # unchanged since the last run: don't even send a conditional request
+                unchanged += 1
+                frontier.done(url)
+                continue
+            if scope.check(url):
+                continue
+            frontier.add(url, max_depth)
+            scope.queued(url)
+            seeded += 1
+        if verbose:
+            console.print(f"[blue]Seeded from sitemap:[/blue] {seeded} pages ({unchanged} unchanged)")
 
     # Prepare selectors: either user-provided (comma-separated) or None (auto)
     if selector:
         selectors = [s.strip() for s in selector.split(",") if s.strip()]
     else:
-        selectors = None  # will auto-detect on first page
+        selectors = None  # auto-detected per page template (see pipeline.extract_page)
+    # DOM template fingerprint -> detected selectors, so detection runs once per template
+    templates = {}
 
     def print_summary(newline=False):
-        summary = f"Fetched: {pages_fetched}  Saved: {pages_saved}  Skipped: {skipped}  Queue: {len(queue)}"
+        pending = len(frontier) + frontier.active_count
+        metrics.set("pages_fetched", pages_fetched)
+        metrics.set("pages_saved", pages_saved)
+        metrics.set("pages_unchanged", unchanged)
+        metrics.set("pages_skipped", skipped)
+        metrics.set("queue", pending)
+        if not progress:
+            return
+        summary = f"Fetched: {pages_fetched}  Saved: {pages_saved}  Unchanged: {unchanged}  Skipped: {skipped}  Queue: {pending}"
+        if rate is not None:
+            start_delay = scheduler.delay_for(host_of(start_norm))
+            metrics.set("crawl_delay_seconds", round(start_delay, 4))
+            summary += f"  Delay: {start_delay:.2f}s"
         end_char = "\n" if newline else "\r"
         if quiet:
             console.print(summary, end=end_char)
         else:
             console.print(summary, end=end_char)
 
+    def checkpoint(final=False):
+        nonlocal prometheus_written, extra_saved, journal_flushed
+        t0 = time.perf_counter()
+        if final or time.monotonic() - extra_saved >= 5:
+            # learned per-host delays and URL pattern counts go into the checkpoint so a resumed crawl starts at them
+            if rate is not None and rate.changed:
+                checkpoint_store.set_extra(rate_key, rate.state())
+                rate.changed = False
+            if scope.changed:
+                checkpoint_store.set_extra(scope_key, scope.state())
+            if retry_lane.changed:
+                checkpoint_store.set_extra(retry_key, retry_lane.state())
+            extra_saved = time.monotonic()
+        # events are already journaled; only fold them into a snapshot once the log has grown.
+        # in-flight and parked pages are not visited yet; pending() keeps them queued so a resume retries them
+        if journal is None:
+            # sqlite frontier: batched commits; pages marked visited must be on disk by then
+            if final or frontier.needs_commit():
+                output.flush()
+                frontier.commit()
+        elif final or journal.needs_compaction():
+            output.flush()
+            journal.compact(frontier.visited, frontier.pending())
+        elif time.monotonic() - journal_flushed >= 1.0:
+            # a page is journaled visited only once the writer thread has put it on disk
+            output.flush()
+            journal.flush()
+            journal_flushed = time.monotonic()
+        if validators is not None:
+            validators.flush()
+        if cache is not None:
+            cache.flush()
+        if aliases is not None:
+            aliases.flush()
+        if failure_log is not None:
+            failure_log.flush()
+        metrics.observe("checkpoint", time.perf_counter() - t0)
+        if prometheus_path and (final or time.monotonic() - prometheus_written >= prometheus_every):
+            metrics.write_prometheus(prometheus_path)
+            prometheus_written = time.monotonic()
+
     print_summary()
 
-    auto_detected_once = False
     # If user explicitly passed no_robots, show a subtle confirmation in verbose
     if no_robots and verbose:
         console.print("[yellow]Note: robots.txt checks are disabled for this run (--no-robots).[/yellow]")
 
-    while queue:
-        current, depth = queue.popleft()
-        if current in visited:
-            continue
-        if max_depth is not None and depth > max_depth:
-            continue
-        if max_pages and pages_saved >= max_pages:
-            if verbose:
-                console.print("[yellow]Reached max-pages limit.[/yellow]")
-            break
+    def next_item():
+        """
+        Pop the next page that may be fetched right now: a parked page whose host
+        has cooled down, or a fresh page from the queue. Pages for hosts that are
+        still cooling down are parked in the scheduler. Returns None if nothing is ready.
+        """
+        while True:
+            item = scheduler.pop_ready()
+            if item is None:
+                # failed pages whose backoff is over (still active in the frontier)
+                item = retry_lane.pop_ready()
+            if item is None:
+                # bound the parked set so a single slow host can't drain the whole queue into it
+                if not frontier or len(scheduler) >= max(8, concurrency * 4):
+                    return None
+                item = frontier.pop()
+            current, depth = item
+            if max_depth is not None and depth > max_depth:
+                frontier.drop(current)
+                continue
+            host = host_of(current)
+            if scheduler.wait_time(host) > 0:
+                scheduler.park(host, item)
+                continue
 
-        # robots check (skippable with no_robots)
-        if not no_robots:
-            if not robots.allowed(headers.get("User-Agent", "*"), current):
+            # robots check (skippable with no_robots)
+            if not no_robots:
+                if not robots.ready(current):
+                    # load robots.txt in the background; pages for other hosts keep going meanwhile
+                    robots.prefetch(current)
+                    scheduler.defer(host, 0.05)
+                    scheduler.park(host, item)
+                    continue
+                robots_wait = robots.retry_in(current)
+                if robots_wait:
+                    # robots.txt unreachable (5xx / network error): hold the host until it is fetched again
+                    scheduler.defer(host, robots_wait)
+                    scheduler.park(host, item)
+                    continue
+                t0 = time.perf_counter()
+                if host not in robots_delay_applied:
+                    robots_delay_applied.add(host)
+                    robots_delay = robots.delay(headers.get("User-Agent", "*"), current)
+                    if robots_delay:
+                        robots_delay *= politeness
+                    if robots_delay and (rate is not None or robots_delay > scheduler.delay_for(host)):
+                        if rate is not None:
+                            # Crawl-delay / Request-rate is a floor the controller never goes below
+                            rate.set_floor(host, robots_delay)
+                        scheduler.set_delay(host, rate.delay(host) if rate is not None else robots_delay)
+                        if verbose:
+                            console.print(f"[blue]Crawl-delay for {host}:[/blue] {robots_delay:g}s")
+                allowed = robots.allowed(headers.get("User-Agent", "*"), current)
+                metrics.observe("robots", time.perf_counter() - t0)
+                if not allowed:
+                    if verbose:
+                        console.print(f"[yellow]Skipping (robots): {current}[/yellow]")
+                    frontier.done(current)
+                    print_summary()
+                    continue
+            else:
+                # when ignoring robots, we may optionally log minimally if verbose
                 if verbose:
-                    console.print(f"[yellow]Skipping (robots): {current}[/yellow]")
-                visited.add(current)
-                print_summary()
+                    console.print(f"[yellow]Ignoring robots.txt for: {current}[/yellow]")
+            return item
+
+    def enqueue_links(links, depth, anchors=None):
+        if depth >= max_depth:
+            return
+        for link in links:
+            # session / tracking parameters never make a different page
+            next_norm = scope.canonical(link)
+            # known binaries (pdf, images, archives, ...) are never requested
+            if is_denied_url(next_norm):
                 continue
-        else:
-            # when ignoring robots, we may optionally log minimally if verbose
-            if verbose:
-                console.print(f"[yellow]Ignoring robots.txt for: {current}[/yellow]")
+            if same_host and not is_same_domain(next_norm, base_domain):
+                continue
+            if not frontier.is_seen(next_norm):
+                # include / exclude rules and crawler traps (calendars, endless pagination, /a/b/a/b/...)
+                if scope.check(next_norm):
+                    continue
+                if near_dups is not None and near_dups.blocked(next_norm):
+                    continue
+            if anchors is not None:
+                added = frontier.add(next_norm, depth + 1, anchors.get(link))
+            else:
+                added = frontier.add(next_norm, depth + 1)
+            if added:
+                scope.queued(next_norm)
+                if not no_robots:
+                    robots.prefetch(next_norm)
 
-        pages_fetched += 1
+    def reuse_unchanged(current, depth, resp) -> bool:
+        """
+        Skip parse/format/write for a page that hasn't changed since the last run
+        (304, or same body hash) and still has its output file; links come from the stored outlinks.
+        """
+        nonlocal unchanged
+        entry = validators.get(current) if validators is not None else None
+        if not entry or entry.get("settings") != settings_key:
+            return False
+        status = getattr(resp, "status_code", 200)
+        if status != 304 and content_hash(resp.content) != entry.get("hash"):
+            return False
+        if not output.exists(current):
+            return False
+        unchanged += 1
         if verbose:
-            console.print(f"[{depth}/{max_depth}] Fetching: {current}")
+            console.print(f"[blue]Unchanged:[/blue] {current}")
+        lastmod = sitemap_lastmod.get(current)
+        if lastmod and entry.get("lastmod") != lastmod:
+            validators.put(
+                current,
+                etag=entry.get("etag"),
+                last_modified=entry.get("last_modified"),
+                content_hash=entry.get("hash"),
+                outlinks=entry.get("outlinks", []),
+                settings=entry.get("settings"),
+                lastmod=lastmod,
+                simhash=entry.get("simhash"),
+            )
+        frontier.done(current)
+        print_summary()
+        enqueue_links(entry.get("outlinks", []), depth)
+        checkpoint()
+        return True
 
-        # fetch (with optional js renderer)
-        try:
-            if js_render:
-                try:
-                    from .renderer import render_page
-                except Exception as re_imp:
-                    console.print(f"[red]Playwright renderer import failed:[/red] {re_imp} — falling back to simple fetch.")
-                    resp = fetch(session, current, headers)
-                else:
-                    try:
-                        timeout_ms = int(getattr(session, "request_timeout", 10) * 1000)
-                        html = render_page(current, timeout=timeout_ms, user_agent=headers.get("User-Agent"))
-                        class DummyResp:
-                            def __init__(self, content):
-                                self.content = content.encode("utf-8")
-                        resp = DummyResp(html)
-                    except RuntimeError as re:
-                        console.print(f"[red]JS render failed:[/red] {re} — falling back to simple fetch.")
-                        resp = fetch(session, current, headers)
-            else:
-                resp = fetch(session, current, headers)
-        except requests.RequestException as e:
-            if verbose:
-                console.print(f"[red]Request failed:[/red] {e} (url={current})")
-            visited.add(current)
-            print_summary()
-            time.sleep(delay)
-            continue
+    def prepare(current, depth, resp):
+        """
+        Coordinator-side work before extraction. Returns the extract_page() arguments,
+        or None if the page was handled already (unchanged since the last run).
+        """
+        # cached before the unchanged check: a cache added to an existing output gets every page
+        if cache is not None and getattr(resp, "status_code", 200) == 200:
+            cache.put(current, resp.content, getattr(resp, "headers", None))
+        if reuse_unchanged(current, depth, resp):
+            return None
 
-        # parse HTML
-        try:
-            soup = BeautifulSoup(resp.content, parser)
-        except Exception:
-            soup = BeautifulSoup(resp.content, "html.parser")
-
-        # if selectors not set, auto-detect from first page
-        if selectors is None and not auto_detected_once:
-            candidates = detect_best_selector(resp.content.decode("utf-8", errors="ignore"))
-            selectors = candidates if candidates else ["main", "article", "div.content"]
-            auto_detected_once = True
+        # parse -> select -> format; links are always collected when validators are kept,
+        # so the next run can reuse them
+        return (current, resp.content, selectors, file_format, parser, depth < max_depth or validators is not None,
+                near_dups is not None, templates if selectors is None else None, getattr(resp, "encoding", None),
+                score is not None)
+
+    def process(current, depth, resp):
+        args = prepare(current, depth, resp)
+        if args is not None:
+            complete(current, depth, resp, extract_page(*args))
+
+    def complete(current, depth, resp, page):
+        """Write an extracted page, enqueue its links and record it (any completion order)."""
+        nonlocal pages_saved, skipped, duplicates
+
+        if page.timings:
+            for stage, seconds in page.timings.items():
+                metrics.observe(stage, seconds)
+
+        if page.template is not None and page.template not in templates:
+            templates[page.template] = page.selectors
             if verbose:
-                console.print(f"[blue]Auto-detected selectors:[/blue] {selectors}")
-
-        # try selectors in order
-        content_node = None
-        used_sel = None
-        for sel in selectors:
-            node = soup.select_one(sel)
-            if node:
-                content_node = node
-                used_sel = sel
-                break
+                console.print(f"[blue]Auto-detected selectors for template {page.template}:[/blue] {page.selectors}")
 
-        if content_node is None:
+        if page.final is None:
             skipped += 1
             # save debug HTML
             try:
@@ -185,57 +553,390 @@ def run_scrape(
             except Exception as e:
                 if verbose:
                     console.print(f"[red]Failed saving debug HTML:[/red] {e}")
-            visited.add(current)
+            frontier.done(current)
             print_summary()
-            time.sleep(delay)
-            continue
-
-        # build output content
-        title = soup.title.string.strip() if soup.title and soup.title.string else "Scraped Page"
-        front = make_frontmatter(current, title, used_sel or selectors[0])
-        if file_format == "md":
-            body = html_to_markdown(content_node)
-            final = front + "# " + title + "\n\n" + body
-        else:
-            body = html_to_text(content_node)
-            final = front + body
+            return
 
-        filepath = url_to_filepath(output_dir, current, file_format)
-        try:
-            with open(filepath, "w", encoding="utf-8") as f:
-                f.write(final)
-            pages_saved += 1
-            if verbose:
-                console.print(f"[green]Saved:[/green] {filepath}")
-            else:
-                # compact feedback
+        if near_dups is not None and page.fingerprint is not None:
+            original = near_dups.check(current, page.fingerprint)
+            if original is not None:
+                # not written and its links not followed: they lead to more copies
+                duplicates += 1
+                if verbose:
+                    console.print(f"[yellow]Near-duplicate of {original}:[/yellow] {current}")
+                if aliases is not None:
+                    aliases.write(json.dumps({"url": current, "duplicate_of": original}) + "\n")
+                frontier.done(current)
+                print_summary()
+                checkpoint()
+                return
+
+        # queued for the writer thread; write errors are reported from there
+        location = output.write(current, page.final)
+        pages_saved += 1
+        if verbose:
+            console.print(f"[green]Saved:[/green] {location}")
+        else:
+            # compact feedback
+            if progress:
                 console.print(f"[green]Saved {pages_saved}[/green]", end="\r")
-        except Exception as e:
-            console.print(f"[red]Failed to write file:[/red] {e}")
 
-        visited.add(current)
+        frontier.done(current)
         print_summary()
-        time.sleep(delay)
 
         # enqueue links
-        if depth < max_depth:
-            for a in soup.find_all("a", href=True):
-                href = a["href"].strip()
-                if href.startswith(("mailto:", "tel:", "javascript:")):
-                    continue
-                next_url = ensure_relative_link(current, href)
-                next_norm = normalize_url(next_url)
-                if next_norm in visited:
-                    continue
-                if same_host and not is_same_domain(next_norm, base_domain):
-                    continue
-                queue.append((next_norm, depth + 1))
+        enqueue_links(page.links, depth, page.anchors)
+        if validators is not None:
+            resp_headers = getattr(resp, "headers", None) or {}
+            validators.put(
+                current,
+                etag=resp_headers.get("ETag"),
+                last_modified=resp_headers.get("Last-Modified"),
+                content_hash=content_hash(resp.content),
+                outlinks=page.links,
+                settings=settings_key,
+                lastmod=sitemap_lastmod.get(current),
+                simhash=page.fingerprint,
+            )
+
+        # checkpoint save (journal events reach the disk at most once a second, after the pages they cover)
+        checkpoint()
+
+    def adapt_rate(host, result) -> bool:
+        """Feed a fetch outcome to the rate controller; True if the server asked us to back off."""
+        resp = getattr(result, "response", None) if isinstance(result, requests.RequestException) else result
+        status = getattr(resp, "status_code", None)
+        overloaded = status in (429, 503)
+        if overloaded:
+            rate.on_overload(host)
+            retry_after = parse_retry_after(resp.headers.get("Retry-After"))
+            if retry_after:
+                scheduler.defer(host, min(retry_after, 3600))
+        elif isinstance(result, SkippedContent):
+            pass
+        elif isinstance(result, requests.RequestException) and (status is None or status >= 500):
+            rate.on_error(host)
+        elif not isinstance(result, requests.RequestException):
+            elapsed = getattr(resp, "elapsed", None)
+            rate.on_success(host, elapsed.total_seconds() if elapsed is not None else None)
+        scheduler.set_delay(host, rate.delay(host))
+        return overloaded
+
+    def record_failure(current, status, error, attempts):
+        nonlocal failure_log
+        kind = str(status) if status else type(error).__name__
+        failures[kind] = failures.get(kind, 0) + 1
+        metrics.inc("fetch_failures")
+        if failure_log is None:
+            failures_path.parent.mkdir(parents=True, exist_ok=True)
+            failure_log = failures_path.open("a", encoding="utf-8")
+        failure_log.write(json.dumps({
+            "url": current,
+            "status": status,
+            "error": str(error),
+            "attempts": attempts,
+            "permanent": retry_lane.is_permanent(status),
+        }) + "\n")
+
+    def fetch_failed(current, depth, result) -> bool:
+        """Account for a completed fetch; True if it raised (and was retried, skipped or recorded as failed)."""
+        nonlocal skipped
+        host = host_of(current)
+        fetching.discard(current)
+        # adapt first so the new delay already counts from this response
+        if rate is not None:
+            adapt_rate(host, result)
+        scheduler.release(host)
+        if isinstance(result, SkippedContent):
+            # not HTML or too large: dropped after the headers / first bytes
+            skipped += 1
+            if verbose:
+                console.print(f"[yellow]Skipping ({result.reason}):[/yellow] {current}")
+            retry_lane.forget(current)
+            frontier.done(current)
+            print_summary()
+            return True
+        if isinstance(result, requests.RequestException):
+            resp = getattr(result, "response", None)
+            status = getattr(resp, "status_code", None)
+            retry_after = parse_retry_after(resp.headers.get("Retry-After")) if status in (429, 503) else None
+            if retry_after and rate is None:
+                # adapt_rate already deferred the host otherwise
+                scheduler.defer(host, min(retry_after, 3600))
+            attempts = retry_lane.failed_attempts(current) + 1
+            wait_s = retry_lane.fail(current, depth, status, retry_after)
+            if wait_s is not None:
+                # stays active in the frontier (and queued in checkpoints) until the retry is done
+                metrics.inc("fetch_retries")
+                if verbose:
+                    console.print(f"[yellow]Request failed ({status or type(result).__name__}), retry {attempts} in {wait_s:.1f}s:[/yellow] {current}")
+                return True
+            if verbose:
+                console.print(f"[red]Request failed:[/red] {result} (url={current}, attempts={attempts})")
+            record_failure(current, status, result, attempts)
+            frontier.done(current)
+            print_summary()
+            return True
+        retry_lane.forget(current)
+        return False
+
+    def budget_left():
+        if stop is not None and stop.is_set():
+            return False
+        return not max_pages or pages_saved + len(fetching) + len(parsing) < max_pages
+
+    def dispatch(current, depth):
+        """Account for a fetch that is about to start; returns its conditional request headers."""
+        nonlocal pages_fetched
+        pages_fetched += 1
+        fetching.add(current)
+        scheduler.acquire(host_of(current))
+        if verbose:
+            console.print(f"[{depth}/{max_depth}] Fetching: {current}")
+        entry = validators.get(current) if validators is not None else None
+        # a 304 has no body, so only ask for one when the previous output can be reused
+        # (and, with --cache, the body is cached already)
+        if (
+            entry
+            and entry.get("settings") == settings_key
+            and output.exists(current)
+            and (cache is None or cache.has(current))
+        ):
+            return validators.conditional_headers(current)
+        return None
+
+    def next_wakeup():
+        """Seconds until a parked host or a failed page is due again; None if nothing waits."""
+        waits = [w for w in (scheduler.next_ready_in(), retry_lane.next_ready_in()) if w is not None]
+        return min(waits) if waits else None
+
+    def run_serial():
+        # serial engine: fetch -> process -> (per-host) wait, one page at a time
+        while frontier or len(scheduler) or len(retry_lane):
+            if not budget_left():
+                if verbose:
+                    console.print("[yellow]Reached max-pages limit.[/yellow]")
+                break
+            item = next_item()
+            if item is None:
+                wait_s = next_wakeup()
+                if wait_s is None:
+                    break
+                time.sleep(wait_s)
+                continue
+            current, depth = item
+            cond = dispatch(current, depth)
+            try:
+                result = _fetch_page(session, current, headers, renderer, cond, metrics, max_bytes, fetch_slots)
+            except requests.RequestException as e:
+                result = e
+            if not fetch_failed(current, depth, result):
+                process(current, depth, result)
+
+    def run_concurrent(parse_pool=None):
+        # concurrent engine: up to `concurrency` fetches in flight on worker threads while
+        # the main thread writes and enqueues finished pages. With a parse_pool, parse ->
+        # format -> link extraction runs in worker processes and results may come back in
+        # any order; pages stay active in the frontier (and queued in checkpoints) until then.
+        fetches = {}
+        parses = {}
+        # a parse_pool shared with other crawls is sized by the caller; keep this crawl's share of it small
+        parse_limit = (parse_workers or concurrency) * 2
+        with ThreadPoolExecutor(max_workers=concurrency, thread_name_prefix="wikiscrapper-fetch") as pool:
+            try:
+                while True:
+                    while len(fetches) < concurrency and budget_left() and (
+                        parse_pool is None or len(parses) < parse_limit
+                    ):
+                        item = next_item()
+                        if item is None:
+                            break
+                        current, depth = item
+                        cond = dispatch(current, depth)
+                        fut = pool.submit(_fetch_page, session, current, headers, renderer, cond, metrics, max_bytes, fetch_slots)
+                        fetches[fut] = item
+
+                    futures = list(fetches) + list(parses)
+                    if not futures:
+                        if not budget_left():
+                            if verbose:
+                                console.print("[yellow]Reached max-pages limit.[/yellow]")
+                            break
+                        wait_s = next_wakeup()
+                        if wait_s is None and not frontier:
+                            break
+                        time.sleep(wait_s or 0)
+                        continue
+
+                    # nothing can be dispatched: block on the next completion; otherwise also wake up for parked hosts / retries
+                    blocked = len(fetches) >= concurrency or (parse_pool is not None and len(parses) >= parse_limit)
+                    timeout = None if blocked else next_wakeup()
+                    done, _ = wait(futures, timeout=timeout, return_when=FIRST_COMPLETED)
+                    for fut in done:
+                        if fut in parses:
+                            current, depth, resp = parses.pop(fut)
+                            parsing.discard(current)
+                            complete(current, depth, resp, fut.result())
+                            continue
+                        current, depth = fetches.pop(fut)
+                        try:
+                            result = fut.result()
+                        except requests.RequestException as e:
+                            result = e
+                        if fetch_failed(current, depth, result):
+                            continue
+                        if parse_pool is None:
+                            process(current, depth, result)
+                            continue
+                        args = prepare(current, depth, result)
+                        if args is not None:
+                            parsing.add(current)
+                            parses[parse_pool.submit(extract_page, *args)] = (current, depth, result)
+            except BaseException:
+                # don't wait for queued fetches / parses on Ctrl-C / errors
+                for fut in list(fetches) + list(parses):
+                    fut.cancel()
+                raise
+
+    # --js: one Chromium for the whole crawl, one pooled page per fetch slot
+    renderer = _start_renderer(concurrency, headers["User-Agent"], js_wait) if js_render else None
 
-        # checkpoint save
-        if pages_saved % 10 == 0:
-            save_checkpoint(checkpoint_path, visited, list(queue))
+    def crawl(parse_pool=None):
+        while True:
+            if parse_pool is not None:
+                run_concurrent(parse_pool)
+            elif concurrency == 1:
+                run_serial()
+            else:
+                run_concurrent()
+            # a shared frontier can get more work from the other workers' pages: wait until the whole crawl is done
+            if shared_frontier is None or not budget_left() or frontier.finished():
+                return
+            checkpoint()
+            time.sleep(0.2)
+
+    try:
+        if parse_pool is not None:
+            crawl(parse_pool)
+        elif parse_workers:
+            from concurrent.futures import ProcessPoolExecutor  # pulls in multiprocessing
+            with ProcessPoolExecutor(max_workers=parse_workers) as parse_pool:
+                crawl(parse_pool)
+        else:
+            crawl()
+    except BaseException:
+        # Ctrl-C / errors: the queued pages reach disk first, then the journal events that mark them visited
+        try:
+            output.close()
+        finally:
+            checkpoint_store.close()
+        if validators is not None:
+            validators.close()
+        if cache is not None:
+            cache.close()
+        if renderer is not None:
+            renderer.close()
+        if owns_robots:
+            robots.close()
+        if aliases is not None:
+            aliases.close()
+        if failure_log is not None:
+            failure_log.close()
+        raise
 
     # final checkpoint + summary
-    save_checkpoint(checkpoint_path, visited, list(queue))
+    checkpoint(final=True)
+    checkpoint_store.close()
+    if validators is not None:
+        validators.close()
+    if cache is not None:
+        cache.close()
+    if renderer is not None:
+        renderer.close()
+    if owns_robots:
+        robots.close()
+    output.close()
+    if aliases is not None:
+        aliases.close()
+    if failure_log is not None:
+        failure_log.close()
     print_summary(newline=True)
-    console.print(f"[bold green]Done. Fetched: {pages_fetched}, Saved: {pages_saved}, Skipped: {skipped}[/bold green]")
+    pruned = scope.report()
+    failed = sum(failures.values())
+    if metrics_path:
+        metrics.write_json(metrics_path)
+    if verbose:
+        for line in metrics.summary_lines():
+            console.print(f"[dim]{line}[/dim]")
+    if near_dups is not None:
+        rules = near_dups.rules()
+        console.print(f"Near-duplicates: {duplicates}  Pruned by learned patterns: {near_dups.pruned}")
+        if rules:
+            console.print(f"[blue]Duplicate URL patterns:[/blue] {', '.join(rules)}")
+    if pruned and progress:
+        console.print(f"[blue]Pruned before fetching:[/blue] {sum(n for _, n in pruned)} URLs")
+        for rule, n in pruned:
+            console.print(f"  {n:>7}  {rule}")
+    if failed and progress:
+        kinds = ", ".join(f"{kind}: {n}" for kind, n in sorted(failures.items(), key=lambda kv: -kv[1]))
+        console.print(f"[red]Failed:[/red] {failed} pages ({kinds}), retried: {retry_lane.retried}; see {failures_path}")
+    if progress:
+        console.print(f"[bold green]Done. Fetched: {pages_fetched}, Saved: {pages_saved}, Unchanged: {unchanged}, Skipped: {skipped}[/bold green]")
+    return {"fetched": pages_fetched, "saved": pages_saved, "unchanged": unchanged, "skipped": skipped,
+            "pruned": dict(pruned), "failed": failed, "retried": retry_lane.retried}
+
+# per worker process: DOM template -> auto-detected selectors
+_reprocess_templates = {}
+
+def _reprocess_one(job):
+    cache_root, url, digest, selectors, file_format, output_dir = job
+    content = read_object(cache_root, digest)
+    page = extract_page(url, content, selectors, file_format, with_links=False, templates=_reprocess_templates)
+    if page.template is not None:
+        _reprocess_templates.setdefault(page.template, page.selectors)
+    if page.final is None:
+        return url, None
+    filepath = url_to_filepath(output_dir, url, file_format)
+    with open(filepath, "w", encoding="utf-8") as f:
+        f.write(page.final)
+    return url, filepath
+
+def reprocess_cache(
+    cache_dir: str,
+    output_dir: str,
+    selector: str = None,
+    file_format: str = "md",
+    workers: int = 0,
+    quiet: bool = False,
+    verbose: bool = False,
+):
+    """
+    Re-run selector matching and formatting over a response cache written by
+    run_scrape(cache_dir=...), with no network access, in parallel across cores.
+    """
+    index = load_index(cache_dir)
+    entries = [e for e in index.values() if e.get("status", 200) == 200]
+    if not entries:
+        console.print(f"[yellow]No cached pages in {cache_dir}[/yellow]")
+        return
+
+    # same rule as run_scrape: without --selector, detect once per page template
+    selectors = [s.strip() for s in selector.split(",") if s.strip()] if selector else None
+
+    jobs = [(str(cache_dir), e["url"], e["hash"], selectors, file_format, output_dir) for e in entries]
+    saved = 0
+    skipped = 0
+    from concurrent.futures import ProcessPoolExecutor
+    with ProcessPoolExecutor(max_workers=workers or None) as pool:
+        for url, filepath in pool.map(_reprocess_one, jobs, chunksize=16):
+            if filepath is None:
+                skipped += 1
+                if verbose:
+                    console.print(f"[yellow]No selector match on {url}[/yellow]")
+                continue
+            saved += 1
+            if verbose:
+                console.print(f"[green]Saved:[/green] {filepath}")
+            elif not quiet:
+                console.print(f"[green]Saved {saved}[/green]", end="\r")
+    console.print(f"[bold green]Done. Reprocessed: {len(jobs)}, Saved: {saved}, Skipped: {skipped}[/bold green]")
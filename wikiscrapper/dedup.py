@@ -0,0 +1,149 @@
+import hashlib
+import re
+from urllib.parse import urlparse, parse_qsl
+
+_WORD_RE = re.compile(r"\w+")
+
+BITS = 64
+
+def simhash(text: str, shingle: int = 3, min_shingles: int = 8):
+    """
+    64-bit SimHash of text over word shingles. Pages that differ only in a few
+    words (version banners, language switchers, dates) get fingerprints a few bits apart.
+    None for text with fewer than min_shingles shingles: too little to tell pages apart.
+    """
+    words = _WORD_RE.findall(text.lower())
+    if len(words) - shingle + 1 < max(1, min_shingles):
+        return None
+    shingles = [" ".join(words[i:i + shingle]) for i in range(len(words) - shingle + 1)]
+    bits = [
+        format(int.from_bytes(hashlib.blake2b(s.encode("utf-8"), digest_size=8).digest(), "big"), "064b")
+        for s in shingles
+    ]
+    # column-wise majority vote; zip/count keep the per-bit work in C
+    half = len(bits) / 2
+    return int("".join("1" if col.count("1") > half else "0" for col in zip(*bits)), 2)
+
+def hamming(a: int, b: int) -> int:
+    return bin(a ^ b).count("1")
+
+class SimHashIndex:
+    """
+    Near-duplicate lookup for 64-bit fingerprints within `threshold` bits.
+
+    The fingerprint is split into threshold + 1 bands; two fingerprints within
+    the threshold agree on at least one whole band (pigeonhole), so a lookup only
+    compares against pages sharing a band instead of every page seen.
+    """
+    def __init__(self, threshold: int = 3):
+        self.threshold = threshold
+        nbands = threshold + 1
+        size = BITS // nbands
+        self._bands = [(i * size, BITS if i == nbands - 1 else (i + 1) * size) for i in range(nbands)]
+        self._tables = [{} for _ in self._bands]
+        self._fps = {}  # url -> fingerprint
+
+    def _keys(self, fp: int):
+        for lo, hi in self._bands:
+            yield (fp >> lo) & ((1 << (hi - lo)) - 1)
+
+    def add(self, url: str, fp: int):
+        self.remove(url)
+        self._fps[url] = fp
+        for table, key in zip(self._tables, self._keys(fp)):
+            table.setdefault(key, []).append(url)
+
+    def remove(self, url: str):
+        fp = self._fps.pop(url, None)
+        if fp is None:
+            return
+        for table, key in zip(self._tables, self._keys(fp)):
+            urls = table.get(key)
+            if urls and url in urls:
+                urls.remove(url)
+                if not urls:
+                    del table[key]
+
+    def find(self, fp: int, exclude: str = None):
+        """URL of a stored page within threshold of fp (other than `exclude`), or None."""
+        for table, key in zip(self._tables, self._keys(fp)):
+            for url in table.get(key, ()):
+                if url != exclude and hamming(fp, self._fps[url]) <= self.threshold:
+                    return url
+        return None
+
+    def __len__(self):
+        return len(self._fps)
+
+def url_features(url: str) -> set:
+    """URL traits a duplicate can be blamed on: query keys, path segments, a trailing slash."""
+    p = urlparse(url)
+    feats = {("query", k) for k, _ in parse_qsl(p.query, keep_blank_values=True)}
+    segments = [s for s in p.path.split("/") if s]
+    feats.update(("segment", i, s) for i, s in enumerate(segments))
+    if p.path.endswith("/") and segments:
+        feats.add(("slash",))
+    return feats
+
+def describe_feature(feat) -> str:
+    if feat[0] == "query":
+        return f"?{feat[1]}="
+    if feat[0] == "segment":
+        return f"path segment {feat[1]} == {feat[2]!r}"
+    return "trailing slash"
+
+class NearDuplicateFilter:
+    """
+    SimHash index plus URL-pattern learning.
+
+    check() returns the page a new page duplicates (or None and indexes it).
+    Each duplicate blames the URL traits it has and its original lacks (?lang=,
+    /v1.2/, trailing slash, ...); a trait seen on `min_evidence` duplicates and
+    never on a unique page makes blocked() reject matching URLs before fetching.
+    `pruned` counts each blocked URL once (up to `remember` URL hashes, then forgotten).
+    """
+    def __init__(self, threshold: int = 3, min_evidence: int = 5, remember: int = 200_000):
+        self.index = SimHashIndex(threshold)
+        self.min_evidence = min_evidence
+        self.remember = remember
+        self._dup_counts = {}
+        self._unique_counts = {}
+        self._rules = set()
+        self._pruned_urls = set()  # hash(url) of URLs already counted in pruned
+        self.pruned = 0
+
+    def check(self, url: str, fp: int):
+        if fp is None:
+            # too little text to fingerprint (see simhash): never a duplicate
+            return None
+        original = self.index.find(fp, exclude=url)
+        feats = url_features(url)
+        if original is None:
+            self.index.add(url, fp)
+            for f in feats:
+                self._unique_counts[f] = self._unique_counts.get(f, 0) + 1
+                self._rules.discard(f)
+            return None
+        for f in feats - url_features(original):
+            n = self._dup_counts[f] = self._dup_counts.get(f, 0) + 1
+            if n >= self.min_evidence and not self._unique_counts.get(f):
+                self._rules.add(f)
+        return original
+
+    def blocked(self, url: str):
+        """The learned rule url matches (see describe_feature), or None."""
+        if not self._rules:
+            return None
+        for f in url_features(url):
+            if f in self._rules:
+                key = hash(url)
+                if key not in self._pruned_urls:
+                    if len(self._pruned_urls) >= self.remember:
+                        self._pruned_urls.clear()
+                    self._pruned_urls.add(key)
+                    self.pruned += 1
+                return f
+        return None
+
+    def rules(self) -> list:
+        return [describe_feature(f) for f in sorted(self._rules, key=str)]
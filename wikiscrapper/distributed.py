@@ -0,0 +1,399 @@
+import hashlib
+import json
+import os
+import socket
+import sqlite3
+import time
+from pathlib import Path
+
+from rich.console import Console
+
+from .scheduler import host_of
+
+console = Console()
+
+QUEUED, ACTIVE, VISITED = 0, 1, 2
+
+SHARD_BY = ("url", "host")
+
+# seconds a claim / worker heartbeat stays valid without being renewed
+LEASE = 120.0
+
+def shard_of(url: str, shards: int, by: str = "url") -> int:
+    """Stable shard number of a normalized URL (the same in every process and on every machine)."""
+    key = host_of(url) if by == "host" else url
+    return int.from_bytes(hashlib.blake2b(key.encode("utf-8"), digest_size=8).digest(), "big") % shards
+
+def shared_db_path(output_dir: str) -> str:
+    return str(Path(output_dir) / ".wikiscrapper-frontier.sqlite")
+
+def worker_output_dir(output_dir: str, shard: int) -> str:
+    return str(Path(output_dir) / f"worker-{shard:02d}")
+
+def owner_id(shard: int, pid: int = None) -> str:
+    """Who holds a claim: the shard plus the host and pid of the worker process."""
+    return f"{shard}@{socket.gethostname()}:{pid or os.getpid()}"
+
+def _connect(path: str) -> sqlite3.Connection:
+    db = sqlite3.connect(path, isolation_level=None, timeout=60)
+    db.execute("PRAGMA journal_mode=WAL")
+    db.execute("PRAGMA synchronous=NORMAL")
+    db.execute(
+        "CREATE TABLE IF NOT EXISTS urls (id INTEGER PRIMARY KEY, url TEXT NOT NULL UNIQUE, depth INTEGER NOT NULL,"
+        " state INTEGER NOT NULL, shard INTEGER NOT NULL, owner TEXT, lease_until REAL)"
+    )
+    db.execute(f"CREATE INDEX IF NOT EXISTS urls_open ON urls(shard, id) WHERE state != {VISITED}")
+    db.execute(f"CREATE INDEX IF NOT EXISTS urls_claimed ON urls(owner) WHERE state = {ACTIVE}")
+    db.execute("CREATE TABLE IF NOT EXISTS workers (shard INTEGER PRIMARY KEY, heartbeat REAL NOT NULL, owner TEXT)")
+    if "owner" not in [row[1] for row in db.execute("PRAGMA table_info(workers)")]:
+        db.execute("ALTER TABLE workers ADD COLUMN owner TEXT")
+    db.execute("CREATE TABLE IF NOT EXISTS extra (key TEXT PRIMARY KEY, value TEXT NOT NULL)")
+    return db
+
+def init_shared(path: str, start_url: str, shards: int, by: str = "url", fresh: bool = False):
+    """
+    Create (or reuse) the shared frontier, seed start_url and register every shard.
+    Raises ValueError if the frontier was created with another shard count or --shard-by.
+    """
+    Path(path).parent.mkdir(parents=True, exist_ok=True)
+    if fresh:
+        for suffix in ("", "-wal", "-shm"):
+            stale = Path(path + suffix)
+            if stale.exists():
+                stale.unlink()
+    db = _connect(path)
+    now = time.time()
+    db.execute("BEGIN IMMEDIATE")
+    stored = {k: json.loads(v) for k, v in db.execute("SELECT key, value FROM extra WHERE key IN ('shards', 'shard_by')")}
+    if stored and (stored.get("shards"), stored.get("shard_by")) != (shards, by):
+        db.execute("ROLLBACK")
+        db.close()
+        raise ValueError(
+            f"{path} belongs to a crawl with {stored.get('shards')} shards by {stored.get('shard_by')}"
+            f" (not {shards} by {by}); use the same --shard N / --shard-by, or start fresh"
+        )
+    db.execute(
+        f"INSERT OR IGNORE INTO urls (url, depth, state, shard) VALUES (?, 0, {QUEUED}, ?)",
+        (start_url, shard_of(start_url, shards, by)),
+    )
+    # a shard whose worker never shows up counts as dead once its lease runs out; live workers are left alone
+    db.executemany(
+        "INSERT INTO workers (shard, heartbeat) VALUES (?, ?)"
+        " ON CONFLICT(shard) DO UPDATE SET heartbeat = excluded.heartbeat, owner = NULL WHERE heartbeat < ?",
+        [(i, now, now - LEASE) for i in range(shards)],
+    )
+    db.executemany(
+        "INSERT OR IGNORE INTO extra (key, value) VALUES (?, ?)",
+        [("shards", json.dumps(shards)), ("shard_by", json.dumps(by))],
+    )
+    db.execute("COMMIT")
+    db.close()
+
+class SharedFrontier:
+    """
+    Frontier shared by several worker processes (possibly on several machines
+    with the same directory mounted) through one SQLite database in WAL mode.
+
+    Every URL belongs to a shard (shard_of); a worker claims batches of queued
+    URLs of its own shard under a time-limited lease, renewed on every commit().
+    Claims are held by the worker process (owner_id), and only one live process
+    may work a shard: a second one is refused until the first one's heartbeat is
+    older than the lease. Claims of a worker that died expire and are picked up
+    again: by the same shard when its worker restarts (right away if the
+    coordinator released them, see release_owner), or by any worker once the
+    shard's heartbeat is older than the lease. Writes are buffered in memory and
+    applied in short transactions so workers never hold the database lock for long.
+
+    Same interface as frontier.Frontier / SqliteFrontier; `bool(frontier)` is
+    whether this worker has claimed work, finished() whether the whole crawl is.
+    """
+    def __init__(self, path: str, shard: int, shards: int, by: str = "url", batch_size: int = 32,
+                 lease: float = LEASE, commit_every: int = 2000, commit_interval: float = 1.0):
+        self.path = path
+        self.shard = shard
+        self.owner = owner_id(shard)
+        self.shards = shards
+        self.by = by
+        self.batch_size = batch_size
+        self.lease = lease
+        self.commit_every = commit_every
+        self.commit_interval = commit_interval
+        self._db = _connect(path)
+        self.extra = {k: json.loads(v) for k, v in self._db.execute("SELECT key, value FROM extra")}
+        self._claimed = {}   # claimed, not popped yet: url -> depth (in claim order)
+        self._active = {}    # popped url -> depth
+        self._new = {}       # not yet written: url -> depth
+        self._lower = {}     # known queued url -> shallower depth to write
+        self._done = set()   # visited, not yet written
+        self._dropped = set()
+        self._extra = {}
+        self._changes = 0
+        self._committed = time.monotonic()
+        self._last_claim = 0.0
+        self._write(self._register)
+
+    def _register(self, db):
+        # runs before _write's heartbeat: the row still shows the shard's previous worker
+        row = db.execute("SELECT owner, heartbeat FROM workers WHERE shard = ?", (self.shard,)).fetchone()
+        if row is not None and row[0] not in (None, self.owner) and row[1] >= time.time() - self.lease:
+            raise RuntimeError(
+                f"Shard {self.shard} is already being crawled by {row[0]}; each shard runs in one process"
+                f" (if it died, its lease runs out within {self.lease:g}s)"
+            )
+
+    # writes ----------------------------------------------------------------
+
+    def _write(self, fn=None):
+        """Apply buffered changes (and fn) in one short write transaction."""
+        db = self._db
+        db.execute("BEGIN IMMEDIATE")
+        try:
+            if self._new:
+                db.executemany(
+                    f"INSERT OR IGNORE INTO urls (url, depth, state, shard) VALUES (?, ?, {QUEUED}, ?)",
+                    [(u, d, shard_of(u, self.shards, self.by)) for u, d in self._new.items()],
+                )
+            if self._lower:
+                db.executemany(
+                    f"UPDATE urls SET depth = ? WHERE url = ? AND state = {QUEUED} AND depth > ?",
+                    [(d, u, d) for u, d in self._lower.items()],
+                )
+            if self._done:
+                db.executemany(
+                    f"INSERT INTO urls (url, depth, state, shard) VALUES (?, 0, {VISITED}, ?)"
+                    f" ON CONFLICT(url) DO UPDATE SET state = {VISITED}, owner = NULL, lease_until = NULL",
+                    [(u, shard_of(u, self.shards, self.by)) for u in self._done],
+                )
+            if self._dropped:
+                db.executemany("DELETE FROM urls WHERE url = ? AND owner = ?", [(u, self.owner) for u in self._dropped])
+            if self._extra:
+                db.executemany(
+                    "INSERT OR REPLACE INTO extra (key, value) VALUES (?, ?)",
+                    [(k, json.dumps(v)) for k, v in self._extra.items()],
+                )
+            result = fn(db) if fn is not None else None
+            now = time.time()
+            db.execute(
+                f"UPDATE urls SET lease_until = ? WHERE state = {ACTIVE} AND owner = ?", (now + self.lease, self.owner)
+            )
+            db.execute(
+                "INSERT OR REPLACE INTO workers (shard, heartbeat, owner) VALUES (?, ?, ?)", (self.shard, now, self.owner)
+            )
+            db.execute("COMMIT")
+        except BaseException:
+            db.execute("ROLLBACK")
+            raise
+        self._new.clear()
+        self._lower.clear()
+        self._done.clear()
+        self._dropped.clear()
+        self._extra.clear()
+        self._changes = 0
+        self._committed = time.monotonic()
+        return result
+
+    def _claim(self, db):
+        now = time.time()
+        dead = [s for (s,) in db.execute(
+            "SELECT shard FROM workers WHERE shard != ? AND heartbeat < ?", (self.shard, now - self.lease)
+        )]
+        shards = [self.shard] + dead
+        marks = ",".join("?" * len(shards))
+        rows = db.execute(
+            f"SELECT id, url, depth FROM urls WHERE state != {VISITED} AND shard IN ({marks})"
+            f" AND (state = {QUEUED} OR lease_until < ?) ORDER BY id LIMIT ?",
+            (*shards, now, self.batch_size),
+        ).fetchall()
+        db.executemany(
+            f"UPDATE urls SET state = {ACTIVE}, owner = ?, lease_until = ? WHERE id = ?",
+            [(self.owner, now + self.lease, row_id) for row_id, _, _ in rows],
+        )
+        return [(url, depth) for _, url, depth in rows]
+
+    def claim(self) -> int:
+        """Write pending changes and claim the next batch of this shard's URLs; returns how many."""
+        self._last_claim = time.monotonic()
+        for url, depth in self._write(self._claim):
+            self._claimed[url] = depth
+        return len(self._claimed)
+
+    # Frontier interface ----------------------------------------------------
+
+    def add(self, url: str, depth: int) -> bool:
+        """Enqueue url; returns False if it was already seen (by any worker)."""
+        if url in self._active or url in self._done:
+            return False
+        for pending in (self._new, self._claimed):
+            known = pending.get(url)
+            if known is not None:
+                if depth < known:
+                    pending[url] = depth
+                    if pending is self._claimed:
+                        self._lower[url] = depth
+                return False
+        row = self._db.execute("SELECT depth, state FROM urls WHERE url = ?", (url,)).fetchone()
+        if row is not None:
+            if row[1] == QUEUED and depth < min(row[0], self._lower.get(url, row[0])):
+                self._lower[url] = depth
+                self._changes += 1
+            return False
+        self._new[url] = depth
+        self._changes += 1
+        return True
+
+    def pop(self):
+        """Take the next claimed (url, depth) and mark it active."""
+        if not self._claimed:
+            self.claim()
+        url = next(iter(self._claimed))
+        depth = self._claimed.pop(url)
+        self._active[url] = depth
+        return url, depth
+
+    def done(self, url: str):
+        self._active.pop(url, None)
+        self._done.add(url)
+        self._changes += 1
+
+    def drop(self, url: str):
+        if self._active.pop(url, None) is not None:
+            self._dropped.add(url)
+            self._changes += 1
+
+    def is_seen(self, url: str) -> bool:
+        if url in self._active or url in self._claimed or url in self._new or url in self._done:
+            return True
+        return self._db.execute("SELECT 1 FROM urls WHERE url = ?", (url,)).fetchone() is not None
+
+    def is_empty(self) -> bool:
+        return not self._new and self._db.execute("SELECT 1 FROM urls LIMIT 1").fetchone() is None
+
+    @property
+    def active_count(self) -> int:
+        return len(self._active)
+
+    def visited_count(self) -> int:
+        return self._db.execute(f"SELECT COUNT(*) FROM urls WHERE state = {VISITED}").fetchone()[0]
+
+    def pending(self) -> list:
+        return list(self._active.items()) + list(self._claimed.items())
+
+    def set_extra(self, key: str, value):
+        self.extra[key] = value
+        self._extra[key] = value
+        self._changes += 1
+
+    def needs_commit(self) -> bool:
+        return self._changes >= self.commit_every or time.monotonic() - self._committed >= self.commit_interval
+
+    def commit(self):
+        """Write buffered changes, renew this worker's leases and heartbeat."""
+        self._write()
+
+    def finished(self) -> bool:
+        """True once no URL of any shard is queued or claimed."""
+        if self._active or self._claimed:
+            return False
+        self._write()
+        return self._db.execute(f"SELECT 1 FROM urls WHERE state != {VISITED} LIMIT 1").fetchone() is None
+
+    def close(self):
+        """Write everything and hand claimed-but-unfinished URLs back to the shard."""
+        if self._db is None:
+            return
+        self._write(lambda db: _release(db, self.owner))
+        # a clean exit frees the shard for the next run right away
+        self._db.execute("UPDATE workers SET owner = NULL WHERE shard = ? AND owner = ?", (self.shard, self.owner))
+        self._db.close()
+        self._db = None
+
+    def abandon(self):
+        """Drop the connection without writing or releasing anything, as a killed worker would."""
+        if self._db is not None:
+            self._db.close()
+            self._db = None
+
+    def __len__(self):
+        return len(self._claimed)
+
+    def __bool__(self):
+        # claiming is a write transaction: don't poll the database more than a few times a second
+        if not self._claimed and time.monotonic() - self._last_claim >= 0.2:
+            self.claim()
+        return bool(self._claimed)
+
+def _release(db, owner: str):
+    db.execute(f"UPDATE urls SET state = {QUEUED}, owner = NULL WHERE state = {ACTIVE} AND owner = ?", (owner,))
+
+def release_owner(path: str, owner: str):
+    """Hand the claims of a worker process known to be dead back to its shard (and free the shard)."""
+    db = _connect(path)
+    db.execute("BEGIN IMMEDIATE")
+    _release(db, owner)
+    db.execute("UPDATE workers SET owner = NULL WHERE owner = ?", (owner,))
+    db.execute("COMMIT")
+    db.close()
+
+def _worker_main(kwargs):
+    from .core import run_scrape
+    run_scrape(**kwargs)
+
+def run_workers(start_url: str, output_dir: str, procs: int, shard_by: str = "url",
+                ignore_checkpoint: bool = False, restarts: int = 2, shards: int = None, first_shard: int = 0,
+                **kwargs):
+    """
+    Coordinator: seed the shared frontier in output_dir and run `procs` local worker
+    processes for shards first_shard .. first_shard+procs-1 of `shards` (default: all
+    `procs` of them), each writing to output_dir/worker-NN. Other machines that mount
+    the same output_dir run the remaining shards; shards must not overlap.
+    A worker that crashes is restarted (up to `restarts` times); its claims are reclaimed.
+    """
+    import multiprocessing
+
+    from .utils import normalize_url
+
+    shards = shards or procs
+    mine = range(first_shard, first_shard + procs)
+    if first_shard < 0 or mine.stop > shards:
+        raise ValueError(f"Shards {mine.start}..{mine.stop - 1} are not all within 0..{shards - 1}")
+    db_path = shared_db_path(output_dir)
+    init_shared(db_path, normalize_url(start_url), shards, shard_by, fresh=ignore_checkpoint)
+    ctx = multiprocessing.get_context("spawn")
+
+    def spawn(i):
+        job = dict(kwargs, start_url=start_url, output_dir=worker_output_dir(output_dir, i),
+                   ignore_checkpoint=ignore_checkpoint, shared_frontier=db_path, shard=(i, shards), shard_by=shard_by)
+        p = ctx.Process(target=_worker_main, args=(job,), name=f"wikiscrapper-worker-{i}")
+        p.start()
+        return p
+
+    running = {i: spawn(i) for i in mine}
+    failures = {i: 0 for i in mine}
+    try:
+        while running:
+            for i, p in list(running.items()):
+                p.join(timeout=0.2)
+                if p.exitcode is None:
+                    continue
+                del running[i]
+                if p.exitcode != 0:
+                    # the process is gone: its claims can go back to the shard now rather than when the lease runs out
+                    release_owner(db_path, owner_id(i, p.pid))
+                    failures[i] += 1
+                    if failures[i] <= restarts:
+                        console.print(f"[yellow]Worker {i} exited with {p.exitcode}, restarting[/yellow]")
+                        running[i] = spawn(i)
+                    else:
+                        console.print(f"[red]Worker {i} failed {failures[i]} times; its shard is left to the others[/red]")
+    except BaseException:
+        for p in running.values():
+            p.terminate()
+        raise
+    db = _connect(db_path)
+    visited, left = db.execute(
+        f"SELECT SUM(state = {VISITED}), SUM(state != {VISITED} AND shard BETWEEN ? AND ?) FROM urls",
+        (mine.start, mine.stop - 1),
+    ).fetchone()
+    db.close()
+    console.print(f"[bold green]All workers done. Visited: {visited or 0}  Left: {left or 0}[/bold green]")
+    return not left
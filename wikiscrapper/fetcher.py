@@ -1,29 +1,162 @@
+import codecs
+import re
+import time
+from datetime import datetime, timezone
+from email.utils import parsedate_to_datetime
+from urllib.parse import urlparse
+
 import requests
 from requests.adapters import HTTPAdapter
 from urllib3.util.retry import Retry
 
-def make_session(retries: int = 3, backoff_factor: float = 0.5, timeout: int = 10):
+def make_session(retries: int = 3, backoff_factor: float = 0.5, timeout: int = 10, pool_size: int = 10,
+                 retry_statuses=(429, 500, 502, 503, 504)):
     """
     Create a requests.Session configured with retry and reasonable timeouts.
+    pool_size should be at least the number of concurrent fetch workers.
+    Statuses left out of retry_statuses are returned to the caller instead of
+    being retried (with a blocking backoff) inside the request.
     """
     session = requests.Session()
     retry = Retry(
         total=retries,
         backoff_factor=backoff_factor,
-        status_forcelist=[429, 500, 502, 503, 504],
+        status_forcelist=list(retry_statuses),
+        # urllib3 would otherwise still sleep out a 429/503 Retry-After inside the request
+        respect_retry_after_header=bool({429, 503} & set(retry_statuses)),
         allowed_methods=["HEAD", "GET", "OPTIONS"]
     )
-    adapter = HTTPAdapter(max_retries=retry)
+    adapter = HTTPAdapter(max_retries=retry, pool_connections=pool_size, pool_maxsize=pool_size)
     session.mount("http://", adapter)
     session.mount("https://", adapter)
     session.request_timeout = timeout  # attribute for callers to use
     return session
 
-def fetch(session: requests.Session, url: str, headers: dict, timeout: int = None):
+# pages we can extract; a response without a Content-Type is let through
+HTML_TYPES = ("text/html", "application/xhtml+xml")
+DEFAULT_MAX_BYTES = 10 * 1024 * 1024
+
+# links with these extensions are never requested
+DENY_EXTENSIONS = frozenset((
+    ".pdf", ".zip", ".tar", ".gz", ".tgz", ".bz2", ".xz", ".zst", ".7z", ".rar",
+    ".png", ".jpg", ".jpeg", ".gif", ".webp", ".svg", ".ico", ".bmp", ".tif", ".tiff", ".avif",
+    ".mp3", ".mp4", ".m4a", ".webm", ".avi", ".mov", ".mkv", ".wav", ".ogg", ".flac",
+    ".woff", ".woff2", ".ttf", ".otf", ".eot",
+    ".exe", ".dmg", ".iso", ".bin", ".msi", ".deb", ".rpm", ".apk", ".jar", ".whl", ".egg",
+    ".doc", ".docx", ".xls", ".xlsx", ".ppt", ".pptx", ".odt", ".epub",
+    ".css", ".js", ".map", ".wasm",
+))
+
+_META_CHARSET_RE = re.compile(rb"""<meta[^>]+charset\s*=\s*["']?\s*([A-Za-z0-9_\-:.]+)""", re.I)
+
+class SkippedContent(requests.RequestException):
+    """The response was dropped on purpose (not HTML, too large); reason says why."""
+    def __init__(self, reason: str, url: str = None):
+        super().__init__(f"{reason} ({url})" if url else reason)
+        self.reason = reason
+
+def is_denied_url(url: str, deny=DENY_EXTENSIONS) -> bool:
+    path = urlparse(url).path.lower()
+    dot = path.rfind(".")
+    return dot > path.rfind("/") and path[dot:] in deny
+
+def _valid_codec(name):
+    if not name:
+        return None
+    try:
+        return codecs.lookup(name.strip().strip("\"'")).name
+    except LookupError:
+        return None
+
+def sniff_charset(content_type: str, head: bytes):
+    """Charset from the Content-Type header, a BOM or a <meta> tag in the first bytes; None if unknown."""
+    for part in (content_type or "").split(";")[1:]:
+        key, _, value = part.partition("=")
+        if key.strip().lower() == "charset":
+            codec = _valid_codec(value)
+            if codec:
+                return codec
+    if head.startswith(codecs.BOM_UTF8):
+        return "utf-8"
+    if head.startswith((codecs.BOM_UTF16_LE, codecs.BOM_UTF16_BE)):
+        return "utf-16"
+    m = _META_CHARSET_RE.search(head[:4096])
+    return _valid_codec(m.group(1).decode("ascii", "ignore")) if m else None
+
+def parse_retry_after(value: str):
+    """Seconds to wait from a Retry-After header (delta-seconds or HTTP-date); None if absent/invalid."""
+    if not value:
+        return None
+    value = value.strip()
+    if value.isdigit():
+        return float(value)
+    try:
+        when = parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+    if when is None:
+        return None
+    if when.tzinfo is None:
+        when = when.replace(tzinfo=timezone.utc)
+    return max(0.0, (when - datetime.now(timezone.utc)).total_seconds())
+
+def fetch(session: requests.Session, url: str, headers: dict, timeout: int = None, validators: dict = None,
+          metrics=None, max_bytes: int = DEFAULT_MAX_BYTES, content_types=HTML_TYPES):
     """
     Fetch URL using the provided session; returns response object or raises requests exceptions.
+    validators (If-None-Match / If-Modified-Since) make the request conditional; callers must
+    handle a 304 response, which has no body.
+
+    The body is streamed: responses whose Content-Type is not in content_types, or that grow
+    past max_bytes, are abandoned early with SkippedContent. resp.encoding is set from the
+    header / BOM / <meta> charset (None if undeclared) so the parser needn't guess.
+    metrics (metrics.Metrics) records time to headers (fetch_ttfb), body download (fetch_body),
+    bytes in and the status per host.
     """
     t = timeout if timeout is not None else getattr(session, "request_timeout", 10)
-    resp = session.get(url, headers=headers, timeout=t)
-    resp.raise_for_status()
+    if validators:
+        headers = {**headers, **validators}
+    host = urlparse(url).netloc.lower()
+    t0 = time.perf_counter()
+    try:
+        resp = session.get(url, headers=headers, timeout=t, stream=True)
+    except requests.RequestException:
+        if metrics is not None:
+            metrics.status(host, "error")
+        raise
+    # elapsed stops once the headers are parsed; the rest is reading the body
+    ttfb = resp.elapsed.total_seconds()
+    try:
+        if metrics is not None:
+            metrics.status(host, resp.status_code)
+        resp.raise_for_status()
+        content_type = resp.headers.get("Content-Type", "")
+        mime = content_type.split(";", 1)[0].strip().lower()
+        if content_types and mime and mime not in content_types:
+            raise SkippedContent(f"content type {mime}", url)
+        length = resp.headers.get("Content-Length")
+        if max_bytes and length and length.isdigit() and int(length) > max_bytes:
+            raise SkippedContent(f"body of {int(length)} bytes exceeds {max_bytes}", url)
+
+        chunks = []
+        size = 0
+        for chunk in resp.iter_content(64 * 1024):
+            size += len(chunk)
+            if max_bytes and size > max_bytes:
+                raise SkippedContent(f"body exceeds {max_bytes} bytes", url)
+            chunks.append(chunk)
+        body = b"".join(chunks)
+    except BaseException:
+        resp.close()
+        raise
+    # make the streamed body available as resp.content / resp.text like a normal response
+    resp._content = body
+    resp._content_consumed = True
+    resp.encoding = sniff_charset(content_type, body[:4096]) if body else None
+    if metrics is not None:
+        total = time.perf_counter() - t0
+        ttfb = min(ttfb, total)
+        metrics.observe("fetch_ttfb", ttfb)
+        metrics.observe("fetch_body", total - ttfb)
+        metrics.inc("bytes_in", size)
     return resp
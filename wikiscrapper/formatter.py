@@ -1,25 +1,34 @@
-from bs4 import BeautifulSoup
-from markdownify import markdownify as md
+from bs4 import CData, Comment, Doctype, NavigableString, Tag
 import re
 from datetime import datetime
 
+# tags dropped from the content area before formatting
+REMOVED_TAGS = ("script", "style", "noscript", "header", "footer", "aside", "form", "svg")
+
 def clean_soup(soup):
     # Remove script, style, nav, footer, noscript tags
-    for tag in soup(["script", "style", "noscript", "header", "footer", "aside", "form", "svg"]):
+    for tag in soup(list(REMOVED_TAGS)):
         tag.decompose()
     # Optionally remove elements with "hidden" or aria-hidden
     for tag in soup.select("[hidden], [aria-hidden='true']"):
         tag.decompose()
     return soup
 
-def html_to_markdown(soup) -> str:
+def html_to_markdown(soup, engine: str = "native") -> str:
     """
     Convert a BeautifulSoup object (content area) to Markdown string.
+
+    The native engine walks the already-parsed node once and leaves it untouched;
+    engine="markdownify" is the original clean + serialize + re-parse path.
     """
-    clean = clean_soup(soup)
-    # Convert selected node's HTML to markdown
-    html = str(clean)
-    md_text = md(html, heading_style="ATX")
+    if engine == "markdownify":
+        from markdownify import markdownify as md
+        clean = clean_soup(soup)
+        # Convert selected node's HTML to markdown
+        html = str(clean)
+        md_text = md(html, heading_style="ATX")
+    else:
+        md_text = _MarkdownWalker(soup).convert()
     # Normalize whitespace & blank lines
     md_text = re.sub(r'\n{3,}', '\n\n', md_text).strip()
     return md_text
@@ -27,13 +36,11 @@ def html_to_markdown(soup) -> str:
 def html_to_text(soup) -> str:
     """
     Convert a BeautifulSoup object to plain text while preserving paragraphs and code blocks.
+    Code/pre elements become fenced blocks; the tree is not modified.
     """
-    clean = clean_soup(soup)
-    # Replace code/pre with fenced blocks
-    for pre in clean.find_all(["pre", "code"]):
-        text = pre.get_text()
-        pre.replace_with("\n```\n" + text.strip() + "\n```\n")
-    text = clean.get_text(separator="\n\n", strip=True)
+    parts = []
+    _collect_text(soup, parts)
+    text = "\n\n".join(parts)
     text = re.sub(r'\n{3,}', '\n\n', text).strip()
     return text
 
@@ -41,3 +48,429 @@ def make_frontmatter(url: str, title: str, selector: str):
     now = datetime.utcnow().isoformat() + "Z"
     fm = f"---\nsource_url: \"{url}\"\ntitle: \"{title}\"\ncrawl_date: \"{now}\"\nselector: \"{selector}\"\n---\n\n"
     return fm
+
+# --- single-pass walkers ---------------------------------------------------------
+#
+# Both walkers see the content node as clean_soup() would leave it (removed tags and
+# hidden elements are skipped, the text around them is merged) without mutating it.
+# The Markdown walker follows markdownify's rules (ATX headings, "*" bullets, escaped
+# "*" and "_") so output matches the markdownify engine.
+
+_REMOVED = frozenset(REMOVED_TAGS)
+_TEXT_TYPES = (NavigableString, CData)
+
+def _is_removed(tag) -> bool:
+    return tag.name in _REMOVED or tag.has_attr("hidden") or tag.get("aria-hidden") == "true"
+
+def _collect_text(node, parts: list):
+    for child in node.children:
+        if isinstance(child, Tag):
+            if _is_removed(child):
+                continue
+            if child.name in ("pre", "code"):
+                inner = []
+                _collect_raw(child, inner)
+                parts.append("```\n" + "".join(inner).strip() + "\n```")
+            else:
+                _collect_text(child, parts)
+        elif type(child) in _TEXT_TYPES:
+            s = child.strip()
+            if s:
+                parts.append(s)
+
+def _collect_raw(node, parts: list):
+    for child in node.children:
+        if isinstance(child, Tag):
+            if not _is_removed(child):
+                _collect_raw(child, parts)
+        elif type(child) in _TEXT_TYPES:
+            parts.append(child)
+
+_re_heading = re.compile(r'h(\d+)')
+_re_line_with_content = re.compile(r'^(.*)', flags=re.MULTILINE)
+_re_whitespace = re.compile(r'[\t ]+')
+_re_all_whitespace = re.compile(r'[\t \r\n]+')
+_re_newline_whitespace = re.compile(r'[\t \r\n]*[\r\n][\t \r\n]*')
+_re_pre_lstrip = re.compile(r'^[ \n]*\n')
+_re_pre_rstrip = re.compile(r'[ \n]*$')
+_re_extract_newlines = re.compile(r'^(\n*)((?:.*[^\n])?)(\n*)$', flags=re.DOTALL)
+_re_backtick_runs = re.compile(r'`+')
+
+_BLOCK_TAGS = frozenset((
+    'p', 'blockquote', 'article', 'div', 'section', 'ol', 'ul', 'li', 'dl', 'dt', 'dd',
+    'table', 'thead', 'tbody', 'tfoot', 'tr', 'td', 'th',
+))
+_INLINE_MARKUP = {"b": "**", "strong": "**", "em": "*", "i": "*", "del": "~~", "s": "~~", "sub": "", "sup": ""}
+
+def _is_heading(name) -> bool:
+    return bool(name) and _re_heading.match(name) is not None
+
+def _remove_ws_inside(el) -> bool:
+    name = getattr(el, "name", None)
+    return bool(name) and (name in _BLOCK_TAGS or _is_heading(name))
+
+def _remove_ws_outside(el) -> bool:
+    return _remove_ws_inside(el) or getattr(el, "name", None) == "pre"
+
+def _is_ignorable(el) -> bool:
+    return isinstance(el, (Comment, Doctype))
+
+def _is_block_content(el) -> bool:
+    if isinstance(el, Tag):
+        return True
+    if el is None or _is_ignorable(el):
+        return False
+    return el.strip() != ""
+
+def _chomp(text):
+    prefix = ' ' if text and text[0] == ' ' else ''
+    suffix = ' ' if text and text[-1] == ' ' else ''
+    return prefix, suffix, text.strip()
+
+def _escape(text: str) -> str:
+    return text.replace('*', r'\*').replace('_', r'\_') if text else ''
+
+def _colspan(cell) -> int:
+    span = cell.attrs.get('colspan')
+    if isinstance(span, str) and span.isdigit():
+        return max(1, min(1000, int(span)))
+    return 1
+
+class _MarkdownWalker:
+    def __init__(self, root):
+        self.root = root
+        self._kids = {}
+
+    def convert(self) -> str:
+        text = self.tag(self.root, frozenset(("[document]",)), [self.root], 0, 0)
+        return text.strip('\n')
+
+    # tree view without removed elements ------------------------------------------
+
+    def kids(self, node) -> list:
+        """Children of node minus removed elements, with adjacent text merged."""
+        cached = self._kids.get(id(node))
+        if cached is not None:
+            return cached
+        out = []
+        for c in node.children:
+            if isinstance(c, Tag):
+                if _is_removed(c):
+                    continue
+                out.append(c)
+            elif type(c) is NavigableString:
+                if out and type(out[-1]) is str:
+                    out[-1] += c
+                else:
+                    out.append(str(c))
+            else:
+                out.append(c)
+        self._kids[id(node)] = out
+        return out
+
+    def parent(self, el):
+        return None if el is self.root else el.parent
+
+    def find_all(self, node, names, include_self=False) -> list:
+        found = []
+        if node is None:
+            # the document above the root
+            node, include_self = self.root, True
+        if include_self and node.name in names:
+            found.append(node)
+        stack = [iter(self.kids(node))]
+        while stack:
+            for c in stack[-1]:
+                if isinstance(c, Tag):
+                    if c.name in names:
+                        found.append(c)
+                    stack.append(iter(self.kids(c)))
+                    break
+            else:
+                stack.pop()
+        return found
+
+    def prev_tag_sibling(self, el):
+        parent = self.parent(el)
+        if parent is None:
+            return None
+        prev = None
+        for c in self.kids(parent):
+            if c is el:
+                return prev
+            if isinstance(c, Tag):
+                prev = c
+        return None
+
+    # conversion --------------------------------------------------------------------
+
+    def text(self, el: str, parent, siblings, idx, parent_tags) -> str:
+        text = str(el)
+        if 'pre' not in parent_tags:
+            text = _re_newline_whitespace.sub('\n', text)
+            text = _re_whitespace.sub(' ', text)
+        if '_noformat' not in parent_tags:
+            text = _escape(text)
+        prev = siblings[idx - 1] if idx > 0 else None
+        nxt = siblings[idx + 1] if idx + 1 < len(siblings) else None
+        inside = _remove_ws_inside(parent)
+        if _remove_ws_outside(prev) or (inside and not prev):
+            text = text.lstrip(' \t\r\n')
+        if _remove_ws_outside(nxt) or (inside and not nxt):
+            text = text.rstrip()
+        return text
+
+    def tag(self, node, parent_tags, siblings, idx, ul_depth, li_index=0) -> str:
+        name = node.name
+        kids = self.kids(node)
+        inside = _remove_ws_inside(node)
+
+        child_tags = set(parent_tags)
+        child_tags.add(name)
+        if _is_heading(name) or name in ('td', 'th'):
+            child_tags.add('_inline')
+        if name in ('pre', 'code', 'kbd', 'samp'):
+            child_tags.add('_noformat')
+        child_tags = frozenset(child_tags)
+        child_ul = ul_depth + 1 if name == 'ul' else ul_depth
+        in_pre = 'pre' in child_tags
+
+        strings = []
+        li_count = 0
+        last = len(kids) - 1
+        for i, el in enumerate(kids):
+            if isinstance(el, Tag):
+                s = self.tag(el, child_tags, kids, i, child_ul, li_count)
+                if el.name == 'li':
+                    li_count += 1
+            elif _is_ignorable(el):
+                continue
+            else:
+                if el.strip() == '':
+                    prev = kids[i - 1] if i > 0 else None
+                    nxt = kids[i + 1] if i < last else None
+                    if inside and (not prev or not nxt):
+                        continue
+                    if _remove_ws_outside(prev) or _remove_ws_outside(nxt):
+                        continue
+                s = self.text(el, node, kids, i, child_tags)
+            if s:
+                strings.append(s)
+
+        if not in_pre:
+            # collapse newlines at child boundaries (max 2)
+            collapsed = ['']
+            for s in strings:
+                leading, content, trailing = _re_extract_newlines.match(s).groups()
+                if collapsed[-1] and leading:
+                    prev_trailing = collapsed.pop()
+                    leading = '\n' * min(2, max(len(prev_trailing), len(leading)))
+                collapsed.extend((leading, content, trailing))
+            strings = collapsed
+        text = ''.join(strings)
+        if name == 'li':
+            return self.li(node, text, ul_depth, li_index)
+        return self.finish(node, name, text, parent_tags, siblings, idx)
+
+    def li(self, el, text, ul_depth, li_index) -> str:
+        text = (text or '').strip()
+        if not text:
+            return "\n"
+        parent = self.parent(el)
+        if parent is not None and parent.name == 'ol':
+            start = parent.get("start")
+            start = int(start) if start and str(start).isnumeric() else 1
+            bullet = '%s.' % (start + li_index)
+        else:
+            # ul_depth counts <ul> ancestors; nesting cycles through the bullet styles
+            bullet = '*+-'[(ul_depth - 1) % 3]
+        bullet += ' '
+        indent = ' ' * len(bullet)
+        text = _re_line_with_content.sub(lambda m: indent + m.group(1) if m.group(1) else '', text)
+        return bullet + text[len(bullet):] + '\n'
+
+    def finish(self, el, name, text, parent_tags, siblings, idx) -> str:
+        inline = '_inline' in parent_tags
+        noformat = '_noformat' in parent_tags
+
+        if name in _INLINE_MARKUP:
+            if noformat:
+                return text
+            prefix, suffix, text = _chomp(text)
+            if not text:
+                return ''
+            mark = _INLINE_MARKUP[name]
+            return prefix + mark + text + mark + suffix
+
+        if _is_heading(name):
+            if inline:
+                return text
+            n = max(1, min(6, int(_re_heading.match(name).group(1))))
+            text = _re_all_whitespace.sub(' ', text.strip())
+            return '\n\n%s %s\n\n' % ('#' * n, text)
+
+        if name in ('div', 'article', 'section', 'dl'):
+            if inline:
+                return ' ' + text.strip() + ' '
+            text = text.strip()
+            return '\n\n%s\n\n' % text if text else ''
+
+        if name == 'p':
+            if inline:
+                return ' ' + text.strip(' \t\r\n') + ' '
+            text = text.strip(' \t\r\n')
+            return '\n\n%s\n\n' % text if text else ''
+
+        if name == 'a':
+            if noformat:
+                return text
+            prefix, suffix, text = _chomp(text)
+            if not text:
+                return ''
+            href = el.get('href')
+            title = el.get('title')
+            if text.replace(r'\_', '_') == href and not title:
+                return '<%s>' % href
+            title_part = ' "%s"' % title.replace('"', r'\"') if title else ''
+            return '%s[%s](%s%s)%s' % (prefix, text, href, title_part, suffix) if href else text
+
+        if name in ('code', 'kbd', 'samp'):
+            if noformat:
+                return text
+            prefix, suffix, text = _chomp(text)
+            if not text:
+                return ''
+            max_ticks = max((len(m) for m in _re_backtick_runs.findall(text)), default=0)
+            delim = '`' * (max_ticks + 1)
+            if max_ticks > 0:
+                text = " " + text + " "
+            return prefix + delim + text + delim + suffix
+
+        if name == 'pre':
+            if not text:
+                return ''
+            text = _re_pre_rstrip.sub('', _re_pre_lstrip.sub('', text))
+            return '\n\n```\n%s\n```\n\n' % text
+
+        if name in ('ul', 'ol'):
+            before_paragraph = False
+            nxt = None
+            for sib in siblings[idx + 1:]:
+                if _is_block_content(sib):
+                    nxt = sib
+                    break
+            if nxt is not None and getattr(nxt, "name", None) not in ('ul', 'ol'):
+                before_paragraph = True
+            if 'li' in parent_tags:
+                return '\n' + text.rstrip()
+            return '\n\n' + text + ('\n' if before_paragraph else '')
+
+        if name == 'blockquote':
+            text = (text or '').strip(' \t\r\n')
+            if inline:
+                return ' ' + text + ' '
+            if not text:
+                return "\n"
+            text = _re_line_with_content.sub(lambda m: '> ' + m.group(1) if m.group(1) else '>', text)
+            return '\n' + text + '\n\n'
+
+        if name == 'br':
+            if inline:
+                return text + ' ' if text else ' '
+            return '  \n' + text
+
+        if name == 'hr':
+            return '\n\n---\n\n'
+
+        if name == 'img':
+            alt = el.attrs.get('alt', None) or ''
+            if inline:
+                return alt
+            src = el.attrs.get('src', None) or ''
+            title = el.attrs.get('title', None) or ''
+            title_part = ' "%s"' % title.replace('"', r'\"') if title else ''
+            return '![%s](%s%s)' % (alt, src, title_part)
+
+        if name in ('td', 'th'):
+            return ' ' + text.strip().replace("\n", " ") + ' |' * _colspan(el)
+
+        if name == 'tr':
+            return self.tr(el, text)
+
+        if name == 'table':
+            return '\n\n' + text.strip() + '\n\n'
+
+        if name == 'caption':
+            return text.strip() + '\n\n'
+
+        if name == 'figcaption':
+            return '\n\n' + text.strip() + '\n\n'
+
+        if name == 'q':
+            return '"' + text + '"'
+
+        if name == 'dt':
+            text = _re_all_whitespace.sub(' ', (text or '').strip())
+            if inline:
+                return ' ' + text + ' '
+            if not text:
+                return '\n'
+            return '\n\n%s\n' % text
+
+        if name == 'dd':
+            text = (text or '').strip()
+            if inline:
+                return ' ' + text + ' '
+            if not text:
+                return '\n'
+            text = _re_line_with_content.sub(lambda m: '    ' + m.group(1) if m.group(1) else '', text)
+            return ':' + text[1:] + '\n'
+
+        if name == 'video':
+            if inline:
+                return text
+            src = el.attrs.get('src', None) or ''
+            if not src:
+                sources = [s for s in self.find_all(el, ('source',)) if s.has_attr('src')]
+                if sources:
+                    src = sources[0].attrs.get('src', None) or ''
+            poster = el.attrs.get('poster', None) or ''
+            if src and poster:
+                return '[![%s](%s)](%s)' % (text, poster, src)
+            if src:
+                return '[%s](%s)' % (text, src)
+            if poster:
+                return '![%s](%s)' % (text, poster)
+            return text
+
+        if name in ('script', 'style'):
+            return ''
+
+        return text
+
+    def tr(self, el, text) -> str:
+        cells = self.find_all(el, ('td', 'th'))
+        parent = self.parent(el)
+        parent_name = parent.name if parent is not None else '[document]'
+        is_first_row = self.prev_tag_sibling(el) is None
+        is_headrow = (
+            all(cell.name == 'th' for cell in cells)
+            or (parent_name == 'thead' and len(self.find_all(parent, ('tr',))) == 1)
+        )
+        grandparent = self.parent(parent) if parent is not None else None
+        is_head_row_missing = (
+            (is_first_row and not parent_name == 'tbody')
+            or (is_first_row and parent_name == 'tbody' and len(self.find_all(grandparent, ('thead',))) < 1)
+        )
+        full_colspan = sum(_colspan(cell) for cell in cells)
+        overline = ''
+        underline = ''
+        if is_headrow and is_first_row:
+            underline += '| ' + ' | '.join(['---'] * full_colspan) + ' |' + '\n'
+        elif is_head_row_missing or (
+            is_first_row
+            and (parent_name == 'table' or (parent_name == 'tbody' and self.prev_tag_sibling(parent) is None))
+        ):
+            overline += '| ' + ' | '.join([''] * full_colspan) + ' |' + '\n'
+            overline += '| ' + ' | '.join(['---'] * full_colspan) + ' |' + '\n'
+        return overline + '|' + text + '\n' + underline
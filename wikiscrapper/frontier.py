@@ -0,0 +1,313 @@
+import heapq
+import json
+import time
+from collections import deque
+from pathlib import Path
+from typing import Iterable
+
+
+class Frontier:
+    """
+    Priority crawl frontier with a "seen" index.
+
+    Every URL is in at most one state: queued, active (popped, being fetched or
+    parked) or visited. Duplicates are rejected at insert time and the
+    shallowest depth seen for a queued URL wins, so memory and checkpoint size
+    scale with unique URLs rather than total links.
+
+    Without a `score` function this is plain BFS (insertion order). With one,
+    score(url, depth, anchor, inlinks) -> float decides the order (highest
+    first, ties in insertion order); a queued URL is rescored as more links to
+    it are found and its priority only goes up. Priorities are part of
+    pending() and the journal, so a resumed crawl keeps the same order.
+
+    If a journal (storage.CheckpointJournal) is given, state changes made after
+    construction are appended to it.
+    """
+    def __init__(self, visited: Iterable[str] = (), queue: Iterable[tuple] = (), journal=None, score=None):
+        self.visited = set(visited)
+        self.score = score
+        self._queue = deque() if score is None else None  # BFS: urls in insertion order
+        self._heap = []     # scored: (-priority, seq, url); entries of popped or rescored urls are skipped
+        self._seq = 0
+        self._depth = {}    # queued url -> shallowest depth
+        self._prio = {}     # queued or active url -> priority
+        self._inlinks = {}  # queued url -> links seen to it (scored frontiers only)
+        self._active = {}   # popped url -> depth
+        self.journal = None
+        for item in queue:
+            self.add(item[0], item[1], priority=item[2] if len(item) > 2 else None)
+        self.journal = journal
+
+    def _live(self, entry) -> bool:
+        return entry[2] in self._depth and -entry[0] == self._prio[entry[2]]
+
+    def _push(self, url: str, priority: float):
+        if self._queue is not None:
+            self._queue.append(url)
+            return
+        self._prio[url] = priority
+        heapq.heappush(self._heap, (-priority, self._seq, url))
+        self._seq += 1
+        if len(self._heap) > 2 * len(self._depth) + 1024:
+            # rescoring leaves the old entries behind; drop them once they dominate
+            self._heap = [e for e in self._heap if self._live(e)]
+            heapq.heapify(self._heap)
+
+    def add(self, url: str, depth: int, anchor: str = None, priority: float = None) -> bool:
+        """
+        Enqueue url; returns False if it was already seen. anchor is the link text
+        (for scoring); priority is a stored one (from a checkpoint) to use as is.
+        """
+        if url in self.visited or url in self._active:
+            return False
+        known = self._depth.get(url)
+        if known is not None:
+            if depth < known:
+                self._depth[url] = depth
+            if self.score is not None:
+                self._inlinks[url] += 1
+                prio = self.score(url, self._depth[url], anchor, self._inlinks[url])
+                if priority is not None:
+                    prio = max(prio, priority)
+                if prio > self._prio[url]:
+                    self._push(url, prio)
+            # in-link rescoring alone isn't journaled: the next snapshot picks it up
+            if depth < known and self.journal:
+                self.journal.enqueued(url, depth, self._prio[url] if self.score is not None else None)
+            return False
+        self._depth[url] = depth
+        if self.score is not None:
+            self._inlinks[url] = 0 if priority is not None else 1
+            prio = priority if priority is not None else self.score(url, depth, anchor, 1)
+        else:
+            prio = 0
+        self._push(url, prio)
+        if self.journal:
+            self.journal.enqueued(url, depth, prio if self.score is not None else None)
+        return True
+
+    def pop(self):
+        """Take the next queued (url, depth) and mark it active."""
+        if self._queue is not None:
+            url = self._queue.popleft()
+        else:
+            while True:
+                entry = heapq.heappop(self._heap)
+                if self._live(entry):
+                    break
+            url = entry[2]
+        depth = self._depth.pop(url)
+        self._inlinks.pop(url, None)
+        self._active[url] = depth
+        return url, depth
+
+    def done(self, url: str):
+        """Mark url visited (fetched, skipped or failed for good)."""
+        self._active.pop(url, None)
+        self._prio.pop(url, None)
+        self.visited.add(url)
+        if self.journal:
+            self.journal.visited(url)
+
+    def drop(self, url: str):
+        """Forget an active url without visiting it (e.g. beyond max depth)."""
+        if self._active.pop(url, None) is not None:
+            self._prio.pop(url, None)
+
+    def is_seen(self, url: str) -> bool:
+        return url in self.visited or url in self._active or url in self._depth
+
+    def is_empty(self) -> bool:
+        """True if no url was ever queued (a fresh crawl)."""
+        return not self.visited and not self._depth and not self._active
+
+    @property
+    def active_count(self) -> int:
+        return len(self._active)
+
+    def pending(self) -> list:
+        """
+        All not-yet-visited (url, depth) pairs, active ones first, then in crawl order
+        (for checkpoints); (url, depth, priority) when scored.
+        """
+        if self._queue is not None:
+            items = list(self._active.items())
+            items.extend((url, self._depth[url]) for url in self._queue)
+            return items
+        queued = sorted(e for e in self._heap if self._live(e))
+        items = [(url, depth, self._prio[url]) for url, depth in self._active.items()]
+        items.extend((url, self._depth[url], self._prio[url]) for _, _, url in queued)
+        return items
+
+    def __len__(self):
+        return len(self._depth)
+
+    def __bool__(self):
+        return bool(self._depth)
+
+
+QUEUED, VISITED = 0, 2
+
+
+class SqliteFrontier:
+    """
+    Disk-backed frontier with the same interface as Frontier, for crawls too big
+    to keep every URL in memory.
+
+    Queued and visited URLs live in one SQLite table (WAL mode); only the
+    active pages and the next `batch_size` queued ones are held in memory.
+    Changes go into an open transaction that is committed in batches (commit()),
+    so the database doubles as the checkpoint: resuming just reopens it, and
+    pages that were active when the crawl stopped are still queued there.
+    Extra state (e.g. learned crawl rates) is kept in a key/value table.
+    """
+    def __init__(self, path: str, fresh: bool = False, batch_size: int = 1000,
+                 commit_every: int = 20000, commit_interval: float = 2.0):
+        import sqlite3  # only needed with --frontier sqlite
+
+        self.path = path
+        self.batch_size = batch_size
+        self.commit_every = commit_every
+        self.commit_interval = commit_interval
+        p = Path(path)
+        p.parent.mkdir(parents=True, exist_ok=True)
+        if fresh:
+            for suffix in ("", "-wal", "-shm"):
+                stale = Path(path + suffix)
+                if stale.exists():
+                    stale.unlink()
+        self._db = sqlite3.connect(path, isolation_level=None)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute("PRAGMA synchronous=NORMAL")
+        self._db.execute("PRAGMA cache_size=-16000")  # KiB: bounds the page cache
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS urls (id INTEGER PRIMARY KEY, url TEXT NOT NULL UNIQUE,"
+            " depth INTEGER NOT NULL, state INTEGER NOT NULL)"
+        )
+        self._db.execute(f"CREATE INDEX IF NOT EXISTS urls_queued ON urls(id) WHERE state = {QUEUED}")
+        self._db.execute("CREATE TABLE IF NOT EXISTS extra (key TEXT PRIMARY KEY, value TEXT NOT NULL)")
+        self.extra = {k: json.loads(v) for k, v in self._db.execute("SELECT key, value FROM extra")}
+        self._queued = self._db.execute(f"SELECT COUNT(*) FROM urls WHERE state = {QUEUED}").fetchone()[0]
+        self._head = deque()  # queued urls loaded from the table, in crawl order
+        self._depth = {}      # head url -> depth
+        self._last_id = 0     # highest id loaded into the head
+        self._active = {}     # popped url -> depth (still QUEUED in the table until done)
+        self._changes = 0
+        self._committed = time.monotonic()
+        self._db.execute("BEGIN")
+
+    def _touch(self):
+        self._changes += 1
+
+    def add(self, url: str, depth: int) -> bool:
+        """Enqueue url; returns False if it was already seen."""
+        if url in self._active:
+            return False
+        cur = self._db.execute(
+            f"INSERT OR IGNORE INTO urls (url, depth, state) VALUES (?, ?, {QUEUED})", (url, depth)
+        )
+        if cur.rowcount == 1:
+            self._queued += 1
+            self._touch()
+            return True
+        # already known: keep the shallowest depth for a url that is still queued
+        cur = self._db.execute(
+            f"UPDATE urls SET depth = ? WHERE url = ? AND state = {QUEUED} AND depth > ?", (depth, url, depth)
+        )
+        if cur.rowcount:
+            self._touch()
+            if url in self._depth:
+                self._depth[url] = depth
+        return False
+
+    def _refill(self):
+        rows = self._db.execute(
+            f"SELECT id, url, depth FROM urls WHERE state = {QUEUED} AND id > ? ORDER BY id LIMIT ?",
+            (self._last_id, self.batch_size),
+        ).fetchall()
+        for row_id, url, depth in rows:
+            self._last_id = row_id
+            if url not in self._active:
+                self._head.append(url)
+                self._depth[url] = depth
+
+    def pop(self):
+        """Take the next queued (url, depth) and mark it active."""
+        if not self._head:
+            self._refill()
+        url = self._head.popleft()
+        depth = self._depth.pop(url)
+        self._active[url] = depth
+        self._queued -= 1
+        return url, depth
+
+    def done(self, url: str):
+        """Mark url visited (fetched, skipped or failed for good)."""
+        self._active.pop(url, None)
+        cur = self._db.execute(f"UPDATE urls SET state = {VISITED} WHERE url = ?", (url,))
+        if not cur.rowcount:
+            self._db.execute(f"INSERT INTO urls (url, depth, state) VALUES (?, 0, {VISITED})", (url,))
+        self._touch()
+
+    def drop(self, url: str):
+        """Forget an active url without visiting it (e.g. beyond max depth)."""
+        if self._active.pop(url, None) is not None:
+            self._db.execute("DELETE FROM urls WHERE url = ?", (url,))
+            self._touch()
+
+    def is_seen(self, url: str) -> bool:
+        if url in self._active or url in self._depth:
+            return True
+        return self._db.execute("SELECT 1 FROM urls WHERE url = ?", (url,)).fetchone() is not None
+
+    def is_empty(self) -> bool:
+        return not self._active and self._db.execute("SELECT 1 FROM urls LIMIT 1").fetchone() is None
+
+    @property
+    def active_count(self) -> int:
+        return len(self._active)
+
+    def visited_count(self) -> int:
+        return self._db.execute(f"SELECT COUNT(*) FROM urls WHERE state = {VISITED}").fetchone()[0]
+
+    def pending(self) -> list:
+        """All not-yet-visited (url, depth) pairs, active ones first (reads the whole queue)."""
+        items = list(self._active.items())
+        items.extend(
+            (url, depth)
+            for url, depth in self._db.execute(f"SELECT url, depth FROM urls WHERE state = {QUEUED} ORDER BY id")
+            if url not in self._active
+        )
+        return items
+
+    def set_extra(self, key: str, value):
+        """Store a piece of extra state (JSON-serializable) with the next commit."""
+        self.extra[key] = value
+        self._db.execute("INSERT OR REPLACE INTO extra (key, value) VALUES (?, ?)", (key, json.dumps(value)))
+        self._touch()
+
+    def needs_commit(self) -> bool:
+        return bool(self._changes) and (
+            self._changes >= self.commit_every or time.monotonic() - self._committed >= self.commit_interval
+        )
+
+    def commit(self):
+        """Make every change so far durable (one WAL transaction)."""
+        self._db.execute("COMMIT")
+        self._db.execute("BEGIN")
+        self._changes = 0
+        self._committed = time.monotonic()
+
+    def close(self):
+        if self._db is None:
+            return
+        self._db.execute("COMMIT")
+        self._db.close()
+        self._db = None
+
+    def __len__(self):
+        return self._queued
+
+    def __bool__(self):
+        return self._queued > 0
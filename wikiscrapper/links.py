@@ -0,0 +1,179 @@
+import re
+from html.parser import HTMLParser
+from urllib.parse import urljoin, urlsplit
+
+from .utils import normalize_url
+
+try:
+    from lxml import etree
+except Exception:  # pragma: no cover - lxml is a dependency, html.parser is the fallback
+    etree = None
+
+_SCHEME_RE = re.compile(r"^[A-Za-z][A-Za-z0-9+.\-]*:")
+_SKIP_PREFIXES = ("mailto:", "tel:", "javascript:")
+
+class _LinkTarget:
+    """lxml parser target: collects <base href> and <a href> without building a tree."""
+    def __init__(self):
+        self.base = None
+        self.hrefs = []
+
+    def start(self, tag, attrib):
+        if tag == "a":
+            href = attrib.get("href")
+            if href is not None:
+                self.hrefs.append(href)
+        elif tag == "base" and self.base is None:
+            self.base = attrib.get("href")
+
+    def close(self):
+        return self
+
+class _AnchorTarget(_LinkTarget):
+    """_LinkTarget that also collects the text of each <a href> (only used when asked for)."""
+    def __init__(self):
+        super().__init__()
+        self.texts = []
+        self._text = None
+
+    def start(self, tag, attrib):
+        super().start(tag, attrib)
+        if tag == "a" and attrib.get("href") is not None:
+            self._text = []
+            self.texts.append(self._text)
+
+    def end(self, tag):
+        if tag == "a":
+            self._text = None
+
+    def data(self, data):
+        if self._text is not None:
+            self._text.append(data)
+
+class _StdlibLinkParser(HTMLParser):
+    def __init__(self, with_text: bool = False):
+        super().__init__(convert_charrefs=True)
+        self.base = None
+        self.hrefs = []
+        self.texts = [] if with_text else None
+        self._text = None
+
+    def handle_starttag(self, tag, attrs):
+        if tag == "a":
+            for k, v in attrs:
+                if k == "href" and v is not None:
+                    self.hrefs.append(v)
+                    if self.texts is not None:
+                        self._text = []
+                        self.texts.append(self._text)
+                    break
+        elif tag == "base" and self.base is None:
+            self.base = dict(attrs).get("href")
+
+    def handle_endtag(self, tag):
+        if tag == "a":
+            self._text = None
+
+    def handle_data(self, data):
+        if self._text is not None:
+            self._text.append(data)
+
+def scan_hrefs(content: bytes, encoding: str = None):
+    """Return (base href or None, [raw href, ...]) from raw HTML bytes (in `encoding` if known)."""
+    if etree is not None:
+        target = _LinkTarget()
+        parser = etree.HTMLParser(target=target, recover=True, encoding=encoding)
+        try:
+            parser.feed(content)
+            parser.close()
+            return target.base, target.hrefs
+        except Exception:
+            pass
+    p = _StdlibLinkParser()
+    p.feed(content.decode(encoding or "utf-8", errors="ignore") if isinstance(content, bytes) else content)
+    p.close()
+    return p.base, p.hrefs
+
+def scan_anchors(content: bytes, encoding: str = None):
+    """Like scan_hrefs, but returns (base href or None, [(raw href, link text), ...])."""
+    if etree is not None:
+        target = _AnchorTarget()
+        parser = etree.HTMLParser(target=target, recover=True, encoding=encoding)
+        try:
+            parser.feed(content)
+            parser.close()
+            return target.base, list(zip(target.hrefs, (" ".join("".join(t).split()) for t in target.texts)))
+        except Exception:
+            pass
+    p = _StdlibLinkParser(with_text=True)
+    p.feed(content.decode(encoding or "utf-8", errors="ignore") if isinstance(content, bytes) else content)
+    p.close()
+    return p.base, list(zip(p.hrefs, (" ".join("".join(t).split()) for t in p.texts)))
+
+class LinkExtractor:
+    """
+    Extract normalized absolute links from raw HTML without a BeautifulSoup walk.
+
+    urljoin + normalize_url results are memoized on the part of the base URL the
+    href actually depends on, so repeated nav links (root-relative or absolute)
+    are resolved once per site instead of once per page.
+    """
+    def __init__(self, max_cache: int = 200_000):
+        self.max_cache = max_cache
+        self._cache = {}
+
+    def _key(self, base: str, href: str):
+        if _SCHEME_RE.match(href):
+            return href
+        parts = urlsplit(base)
+        if href.startswith("//"):
+            return (parts.scheme, href)
+        if href.startswith("/"):
+            return (parts.scheme, parts.netloc, href)
+        if href.startswith(("?", "#")) or not href:
+            return (parts.scheme, parts.netloc, parts.path, parts.query, href)
+        # plain relative path: only the base "directory" matters
+        return (parts.scheme, parts.netloc, parts.path.rsplit("/", 1)[0], href)
+
+    def resolve(self, base: str, href: str) -> str:
+        key = self._key(base, href)
+        url = self._cache.get(key)
+        if url is None:
+            if len(self._cache) >= self.max_cache:
+                self._cache.clear()
+            url = self._cache[key] = normalize_url(urljoin(base, href))
+        return url
+
+    def extract(self, content: bytes, page_url: str, encoding: str = None) -> list:
+        """Normalized absolute links of every <a href> (deduped, document order), honoring <base href>."""
+        base_href, hrefs = scan_hrefs(content, encoding)
+        base = urljoin(page_url, base_href.strip()) if base_href else page_url
+        links = {}
+        for href in hrefs:
+            href = href.strip()
+            if href.startswith(_SKIP_PREFIXES):
+                continue
+            links[self.resolve(base, href)] = None
+        return list(links)
+
+    def extract_anchors(self, content: bytes, page_url: str, encoding: str = None, max_text: int = 200) -> dict:
+        """Normalized absolute link -> its first non-empty link text (document order), honoring <base href>."""
+        base_href, anchors = scan_anchors(content, encoding)
+        base = urljoin(page_url, base_href.strip()) if base_href else page_url
+        links = {}
+        for href, text in anchors:
+            href = href.strip()
+            if href.startswith(_SKIP_PREFIXES):
+                continue
+            url = self.resolve(base, href)
+            if not links.get(url):
+                links[url] = text[:max_text]
+        return links
+
+_default = LinkExtractor()
+
+def extract_links(content: bytes, page_url: str, encoding: str = None) -> list:
+    return _default.extract(content, page_url, encoding)
+
+def extract_anchors(content: bytes, page_url: str, encoding: str = None) -> dict:
+    return _default.extract_anchors(content, page_url, encoding)
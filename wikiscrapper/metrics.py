@@ -0,0 +1,183 @@
+import bisect
+import contextlib
+import json
+import os
+import threading
+import time
+from pathlib import Path
+
+# seconds; a final +Inf bucket is implied
+BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+class Histogram:
+    """Fixed-bucket latency histogram (Prometheus-style, non-cumulative counts internally)."""
+    def __init__(self, buckets=BUCKETS):
+        self.buckets = tuple(buckets)
+        self.counts = [0] * (len(self.buckets) + 1)
+        self.count = 0
+        self.sum = 0.0
+        self.max = 0.0
+
+    def observe(self, value: float):
+        self.counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.count += 1
+        self.sum += value
+        if value > self.max:
+            self.max = value
+
+    def quantile(self, q: float) -> float:
+        """Upper bound of the bucket holding the q-quantile (max for the +Inf bucket)."""
+        if not self.count:
+            return 0.0
+        rank = q * self.count
+        seen = 0
+        for i, c in enumerate(self.counts):
+            seen += c
+            if seen >= rank:
+                return self.buckets[i] if i < len(self.buckets) else self.max
+        return self.max
+
+    def to_dict(self) -> dict:
+        return {
+            "count": self.count,
+            "sum": round(self.sum, 6),
+            "mean": round(self.sum / self.count, 6) if self.count else 0.0,
+            "p50": self.quantile(0.5),
+            "p95": self.quantile(0.95),
+            "max": round(self.max, 6),
+            "buckets": {str(b): c for b, c in zip(self.buckets + ("+Inf",), self.counts)},
+        }
+
+class Metrics:
+    """
+    Per-stage timings, byte counters and per-host status counts for one crawl.
+    Thread-safe: fetch workers and the output writer record into it too.
+    """
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.stages = {}
+        self.counters = {}
+        self.statuses = {}  # (host, status) -> count
+        self.gauges = {}
+        self.started = time.time()
+
+    def observe(self, stage: str, seconds: float):
+        with self._lock:
+            h = self.stages.get(stage)
+            if h is None:
+                h = self.stages[stage] = Histogram()
+            h.observe(seconds)
+
+    @contextlib.contextmanager
+    def timer(self, stage: str):
+        t0 = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(stage, time.perf_counter() - t0)
+
+    def inc(self, name: str, n: int = 1):
+        with self._lock:
+            self.counters[name] = self.counters.get(name, 0) + n
+
+    def status(self, host: str, status):
+        with self._lock:
+            key = (host, str(status))
+            self.statuses[key] = self.statuses.get(key, 0) + 1
+
+    def set(self, name: str, value):
+        self.gauges[name] = value
+
+    def to_dict(self) -> dict:
+        with self._lock:
+            per_host = {}
+            for (host, status), n in sorted(self.statuses.items()):
+                per_host.setdefault(host, {})[status] = n
+            return {
+                "started": self.started,
+                "elapsed_s": round(time.time() - self.started, 3),
+                "stages": {k: h.to_dict() for k, h in sorted(self.stages.items())},
+                "counters": dict(sorted(self.counters.items())),
+                "gauges": dict(sorted(self.gauges.items())),
+                "status_by_host": per_host,
+            }
+
+    def to_prometheus(self) -> str:
+        lines = []
+        with self._lock:
+            lines.append("# HELP wikiscrapper_stage_seconds Time spent per crawl stage.")
+            lines.append("# TYPE wikiscrapper_stage_seconds histogram")
+            for stage, h in sorted(self.stages.items()):
+                cumulative = 0
+                for bound, c in zip(h.buckets + ("+Inf",), h.counts):
+                    cumulative += c
+                    lines.append(f'wikiscrapper_stage_seconds_bucket{{stage="{stage}",le="{bound}"}} {cumulative}')
+                lines.append(f'wikiscrapper_stage_seconds_sum{{stage="{stage}"}} {h.sum:.6f}')
+                lines.append(f'wikiscrapper_stage_seconds_count{{stage="{stage}"}} {h.count}')
+            for name, n in sorted(self.counters.items()):
+                lines.append(f"# TYPE wikiscrapper_{name}_total counter")
+                lines.append(f"wikiscrapper_{name}_total {n}")
+            lines.append("# TYPE wikiscrapper_responses_total counter")
+            for (host, status), n in sorted(self.statuses.items()):
+                lines.append(f'wikiscrapper_responses_total{{host="{host}",status="{status}"}} {n}')
+            for name, v in sorted(self.gauges.items()):
+                lines.append(f"# TYPE wikiscrapper_{name} gauge")
+                lines.append(f"wikiscrapper_{name} {v}")
+        return "\n".join(lines) + "\n"
+
+    def write_json(self, path: str):
+        _atomic_write(path, json.dumps(self.to_dict(), indent=2) + "\n")
+
+    def write_prometheus(self, path: str):
+        # node_exporter's textfile collector must never see a half-written file
+        _atomic_write(path, self.to_prometheus())
+
+    def summary_lines(self) -> list:
+        """One line per stage: count, mean, p95 (for the console)."""
+        with self._lock:
+            return [
+                f"{stage:<12} n={h.count:<7} mean={h.sum / h.count * 1000:8.2f}ms  p95<={h.quantile(0.95) * 1000:.1f}ms"
+                for stage, h in sorted(self.stages.items()) if h.count
+            ]
+
+def _atomic_write(path: str, text: str):
+    p = Path(path)
+    p.parent.mkdir(parents=True, exist_ok=True)
+    tmp = p.with_name(p.name + ".tmp")
+    with tmp.open("w", encoding="utf-8") as f:
+        f.write(text)
+        f.flush()
+        os.fsync(f.fileno())
+    tmp.replace(p)
+
+@contextlib.contextmanager
+def profiled(prefix: str, top: int = 25):
+    """
+    cProfile + tracemalloc around a block. Writes <prefix>.pstats (for snakeviz /
+    pstats) and <prefix>-memory.txt (top allocation sites and peak traced memory).
+    """
+    import cProfile
+    import io
+    import pstats
+    import tracemalloc
+
+    Path(prefix).parent.mkdir(parents=True, exist_ok=True)
+    tracemalloc.start(10)
+    prof = cProfile.Profile()
+    prof.enable()
+    try:
+        yield
+    finally:
+        prof.disable()
+        snapshot = tracemalloc.take_snapshot()
+        current, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        prof.dump_stats(f"{prefix}.pstats")
+        out = io.StringIO()
+        pstats.Stats(prof, stream=out).sort_stats("cumulative").print_stats(top)
+        with open(f"{prefix}-cpu.txt", "w", encoding="utf-8") as f:
+            f.write(out.getvalue())
+        with open(f"{prefix}-memory.txt", "w", encoding="utf-8") as f:
+            f.write(f"current: {current / 1024 / 1024:.1f} MiB  peak: {peak / 1024 / 1024:.1f} MiB\n\n")
+            for stat in snapshot.statistics("lineno")[:top]:
+                f.write(f"{stat}\n")
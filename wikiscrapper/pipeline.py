@@ -0,0 +1,121 @@
+import hashlib
+import time
+from collections import namedtuple
+
+from bs4 import BeautifulSoup
+
+from .links import extract_links, extract_anchors
+from .dedup import simhash
+from .formatter import html_to_markdown, html_to_text, make_frontmatter
+from .utils import detect_best_selector
+
+# final is None when none of the selectors matched; fingerprint is the body's SimHash (if asked for);
+# template / selectors are the page's DOM template and the selectors used for it (auto-detection only);
+# timings maps stage -> seconds (parse, select, format, links, fingerprint);
+# anchors maps link -> link text (only if asked for, for prioritized crawls)
+PageResult = namedtuple(
+    "PageResult",
+    ["final", "selector", "title", "links", "fingerprint", "template", "selectors", "timings", "anchors"],
+    defaults=(None, None, None, None, None),
+)
+
+DEFAULT_SELECTORS = ["main", "article", "div.content"]
+
+def choose_parser():
+    try:
+        import lxml
+        return "lxml"
+    except Exception:
+        return "html.parser"
+
+def parse_html(content: bytes, parser: str = None, encoding: str = None):
+    """encoding (e.g. from the Content-Type header) spares BeautifulSoup its charset guessing."""
+    try:
+        return BeautifulSoup(content, parser or choose_parser(), from_encoding=encoding)
+    except Exception:
+        return BeautifulSoup(content, "html.parser", from_encoding=encoding)
+
+def dom_fingerprint(soup, depth: int = 4) -> str:
+    """
+    Short hash of a page's layout: the set of tag.class names in the top `depth`
+    levels under <body>. Pages rendered from the same template share it even
+    though their text and list lengths differ.
+    """
+    body = soup.body or soup
+    shapes = set()
+    level = [body]
+    for _ in range(depth):
+        nxt = []
+        for node in level:
+            for child in node.find_all(True, recursive=False):
+                shapes.add(".".join([child.name] + sorted(child.get("class") or [])))
+                nxt.append(child)
+        level = nxt
+    return hashlib.sha1("|".join(sorted(shapes)).encode("utf-8")).hexdigest()[:12]
+
+def extract_page(url: str, content: bytes, selectors, file_format: str, parser: str = None,
+                 with_links: bool = True, with_fingerprint: bool = False, templates: dict = None,
+                 encoding: str = None, with_anchors: bool = False) -> PageResult:
+    """
+    parse -> select -> clean -> format -> extract links for one page.
+    Pure function of its arguments, so it can run in worker processes.
+
+    selectors=None auto-detects: the page's DOM template is looked up in `templates`
+    (fingerprint -> selectors) and only detected, on this same tree, if it is new.
+    """
+    timings = {}
+    t0 = time.perf_counter()
+    soup = parse_html(content, parser, encoding)
+    t1 = time.perf_counter()
+    timings["parse"] = t1 - t0
+
+    template = None
+    if selectors is None:
+        template = dom_fingerprint(soup)
+        selectors = (templates or {}).get(template) or detect_best_selector(soup) or DEFAULT_SELECTORS
+
+    # try selectors in order
+    content_node = None
+    used_sel = None
+    for sel in selectors:
+        node = soup.select_one(sel)
+        if node:
+            content_node = node
+            used_sel = sel
+            break
+
+    t0 = time.perf_counter()
+    timings["select"] = t0 - t1
+
+    title = soup.title.string.strip() if soup.title and soup.title.string else "Scraped Page"
+    final = None
+    body = None
+    if content_node is not None:
+        front = make_frontmatter(url, title, used_sel or selectors[0])
+        if file_format == "md":
+            body = html_to_markdown(content_node)
+            final = front + "# " + title + "\n\n" + body
+        else:
+            body = html_to_text(content_node)
+            final = front + body
+
+    t1 = time.perf_counter()
+    timings["format"] = t1 - t0
+
+    # links come from a streaming scan of the raw bytes, not a walk over the soup
+    links = []
+    anchors = None
+    if with_links and final is not None:
+        if with_anchors:
+            anchors = extract_anchors(content, url, encoding)
+            links = list(anchors)
+        else:
+            links = extract_links(content, url, encoding)
+        t0, t1 = t1, time.perf_counter()
+        timings["links"] = t1 - t0
+    # fingerprint the extracted body only: the frontmatter carries the URL and crawl date
+    fingerprint = None
+    if with_fingerprint and body is not None:
+        fingerprint = simhash(body)
+        timings["fingerprint"] = time.perf_counter() - t1
+    return PageResult(final, used_sel, title, links, fingerprint, template, selectors if template else None, timings, anchors)
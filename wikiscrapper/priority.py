@@ -0,0 +1,110 @@
+import importlib
+import math
+import re
+from urllib.parse import urlsplit
+
+PRIORITY_KINDS = ("auto", "bfs", "score")
+
+# pages that are cheap to reach from everywhere and rarely worth a slot of a page budget
+LOW_VALUE_PATTERNS = (
+    r"/(changelog|changes|release-?notes|releases|history|archives?|news|blog)(/|\.|$)",
+    r"/(tags?|categor(y|ies)|labels?|topics|authors?|users?|contributors)(/|\.|$)",
+    r"/page/\d+",
+    r"/\d{4}/\d{1,2}(/|$)",
+    r"/(search|login|signin|signup|register|edit|print)(/|\.|$)",
+    r"[?&](page|p|offset|start|sort|order|filter|oldid|diff|action|printable|redirect)=",
+)
+HIGH_VALUE_PATTERNS = (
+    r"/(api|reference|ref|guides?|manual|tutorials?|howto|how-to|concepts?|getting-started|quickstart)(/|\.|$)",
+)
+# anchor text keywords that mark a link as worth following early
+DEFAULT_KEYWORDS = ("api", "reference", "guide", "tutorial", "overview", "getting started", "introduction", "manual")
+
+_PAGINATION_RE = re.compile(r"^(\d+|next|prev(ious)?|older|newer|more|last|first|[«»‹›<>]+)(\s*(page|posts|entries))?\W*$", re.I)
+
+def _segments(path: str) -> list:
+    return [s for s in path.split("/") if s]
+
+class LinkScorer:
+    """
+    Default priority for budgeted crawls (higher is fetched sooner), made of:
+    depth, how close the URL is to the start path, low/high value path patterns,
+    keywords (or pagination) in the anchor text and the number of links seen to it.
+    """
+    def __init__(self, start_url: str, keywords=DEFAULT_KEYWORDS,
+                 low_value=LOW_VALUE_PATTERNS, high_value=HIGH_VALUE_PATTERNS):
+        parts = urlsplit(start_url)
+        self.host = parts.netloc.lower()
+        segs = _segments(parts.path)
+        # the start "directory": /docs/intro.html -> [docs], /docs/guide/ -> [docs, guide]
+        self.start_dir = segs if parts.path.endswith("/") else segs[:-1]
+        self.keywords = tuple(k.lower() for k in keywords)
+        self._low = re.compile("|".join(low_value), re.I) if low_value else None
+        self._high = re.compile("|".join(high_value), re.I) if high_value else None
+        self._url_scores = {}  # url -> the part of the score that only depends on the url
+
+    def __call__(self, url: str, depth: int, anchor: str = None, inlinks: int = 0) -> float:
+        score = self._url_scores.get(url)
+        if score is None:
+            if len(self._url_scores) >= 100_000:
+                self._url_scores.clear()
+            score = self._url_scores[url] = self._url_score(url)
+        score -= depth
+        if anchor:
+            text = anchor.lower()
+            if _PAGINATION_RE.match(text):
+                score -= 1.5
+            elif any(k in text for k in self.keywords):
+                score += 1.5
+        if inlinks:
+            score += 0.5 * math.log2(1 + inlinks)
+        # rounded: priorities go through JSON checkpoints and are compared after reloading
+        return round(score, 3)
+
+    def _url_score(self, url: str) -> float:
+        # frontier urls are normalized (lowercase host, no fragment): plain splits are enough, and much cheaper than urlsplit
+        netloc, _, rest = url.partition("://")[2].partition("/")
+        path, _, query = ("/" + rest).partition("?")
+        score = 0.0
+        if netloc == self.host:
+            common = 0
+            for a, b in zip(_segments(path), self.start_dir):
+                if a != b:
+                    break
+                common += 1
+            if common == len(self.start_dir):
+                score += 1.0
+            else:
+                # each directory step out of the start path
+                score -= 0.5 * (len(self.start_dir) - common)
+        else:
+            score -= 2.0
+        target = f"{path}?{query}" if query else path
+        if self._low is not None and self._low.search(target):
+            score -= 3.0
+        if self._high is not None and self._high.search(target):
+            score += 1.0
+        return score
+
+def make_scorer(priority, start_url: str, max_pages: int = 0, keywords=None):
+    """
+    Scoring function for --priority: None for plain BFS ('bfs', or 'auto' without a page
+    budget), LinkScorer for 'score' ('auto' with one), or a 'module:function' taking
+    (url, depth, anchor, inlinks) and returning a float. A callable is used as is.
+    """
+    if callable(priority):
+        return priority
+    if priority in (None, "bfs") or (priority == "auto" and not max_pages):
+        return None
+    if priority in ("auto", "score"):
+        return LinkScorer(start_url, keywords or DEFAULT_KEYWORDS)
+    module, sep, name = str(priority).partition(":")
+    if not sep:
+        raise ValueError(f"Unknown priority '{priority}' (expected one of: {', '.join(PRIORITY_KINDS)}, or module:function)")
+    try:
+        fn = getattr(importlib.import_module(module), name)
+    except (ImportError, AttributeError) as e:
+        raise ValueError(f"Cannot load scoring function '{priority}': {e}") from e
+    if not callable(fn):
+        raise ValueError(f"Scoring function '{priority}' is not callable")
+    return fn
@@ -0,0 +1,147 @@
+import asyncio
+import atexit
+import concurrent.futures
+import threading
+
+# resource types that never matter for extracted text
+DEFAULT_BLOCKED = ("image", "font", "media")
+LOAD_STATES = ("load", "domcontentloaded", "networkidle", "commit")
+
+class BrowserPool:
+    """
+    One headless Chromium for the whole crawl with a pool of reusable pages.
+
+    Playwright's async API runs on a private event-loop thread, so render() is a
+    plain blocking call that any number of fetch threads can use at once; each
+    call borrows one of `size` pages (each in its own browser context).
+
+    wait_for is the readiness condition: a load state ("load", "domcontentloaded",
+    "networkidle", "commit") or a CSS selector to wait for after DOMContentLoaded.
+    """
+    def __init__(self, size: int = 2, user_agent: str = None, wait_for: str = "networkidle",
+                 block_resources=DEFAULT_BLOCKED, headless: bool = True):
+        self.size = max(1, int(size))
+        self.user_agent = user_agent
+        self.wait_for = wait_for or "networkidle"
+        self.block_resources = set(block_resources or ())
+        self.headless = headless
+        self._loop = None
+        self._thread = None
+        self._pw = None
+        self._browser = None
+        self._pages = None
+        self._closed = False
+
+    def start(self):
+        """Launch Chromium and open the pages; raises RuntimeError if Playwright can't run."""
+        try:
+            from playwright.async_api import async_playwright  # noqa: F401
+        except ImportError as e:
+            raise RuntimeError(f"Playwright is not installed: {e}") from e
+        self._loop = asyncio.new_event_loop()
+        self._thread = threading.Thread(target=self._loop.run_forever, name="wikiscrapper-renderer", daemon=True)
+        self._thread.start()
+        try:
+            self._call(self._astart(), timeout=60)
+        except Exception as e:
+            self.close()
+            raise RuntimeError(f"Failed to launch Chromium (did you run `playwright install`?): {e}") from e
+        atexit.register(self.close)
+        return self
+
+    def render(self, url: str, timeout: int = 10000) -> str:
+        """Render url and return the resulting HTML. timeout is in milliseconds."""
+        if self._closed or self._loop is None:
+            raise RuntimeError("BrowserPool is not running")
+        fut = asyncio.run_coroutine_threadsafe(self._arender(url, timeout), self._loop)
+        try:
+            return fut.result(timeout / 1000 + 30)
+        except concurrent.futures.TimeoutError:
+            # the page is hung past Playwright's own timeout: stop it (the page goes back to the pool)
+            fut.cancel()
+            raise RuntimeError(f"Render timed out for {url}") from None
+
+    def close(self):
+        """Close pages, browser and Playwright; safe to call more than once (also on Ctrl-C)."""
+        if self._closed:
+            return
+        self._closed = True
+        if self._loop is None:
+            return
+        try:
+            if self._pw is not None:
+                self._call(self._aclose(), timeout=30)
+        except Exception:
+            pass
+        self._loop.call_soon_threadsafe(self._loop.stop)
+        self._thread.join(timeout=5)
+        if not self._loop.is_running():
+            self._loop.close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.close()
+
+    # event-loop side ----------------------------------------------------------
+
+    def _call(self, coro, timeout=None):
+        return asyncio.run_coroutine_threadsafe(coro, self._loop).result(timeout)
+
+    async def _astart(self):
+        from playwright.async_api import async_playwright
+        self._pw = await async_playwright().start()
+        self._browser = await self._pw.chromium.launch(headless=self.headless)
+        self._pages = asyncio.Queue()
+        for _ in range(self.size):
+            self._pages.put_nowait(await self._new_page())
+
+    async def _new_page(self):
+        kwargs = {"user_agent": self.user_agent} if self.user_agent else {}
+        context = await self._browser.new_context(**kwargs)
+        if self.block_resources:
+            await context.route("**/*", self._route)
+        return await context.new_page()
+
+    async def _route(self, route):
+        if route.request.resource_type in self.block_resources:
+            await route.abort()
+        else:
+            await route.continue_()
+
+    async def _arender(self, url: str, timeout: int) -> str:
+        page = await self._pages.get()
+        try:
+            if self.wait_for in LOAD_STATES:
+                await page.goto(url, wait_until=self.wait_for, timeout=timeout)
+            else:
+                await page.goto(url, wait_until="domcontentloaded", timeout=timeout)
+                await page.wait_for_selector(self.wait_for, timeout=timeout)
+            return await page.content()
+        except Exception as e:
+            raise RuntimeError(f"Render failed for {url}: {e}") from e
+        finally:
+            if page.is_closed():
+                # a crashed page is replaced so the pool keeps its size
+                try:
+                    await page.context.close()
+                except Exception:
+                    pass
+                page = await self._new_page()
+            self._pages.put_nowait(page)
+
+    async def _aclose(self):
+        try:
+            if self._browser is not None:
+                await self._browser.close()
+        finally:
+            await self._pw.stop()
+
+def render_page(url: str, timeout: int = 10000, user_agent: str = None, wait_for: str = "networkidle") -> str:
+    """
+    Render a single page with a throwaway browser. For crawls use BrowserPool,
+    which keeps Chromium running across pages.
+    """
+    with BrowserPool(size=1, user_agent=user_agent, wait_for=wait_for) as pool:
+        return pool.render(url, timeout=timeout)
@@ -1,29 +1,202 @@
+import json
+import os
+import threading
+import time
 import urllib.robotparser
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
 from urllib.parse import urljoin, urlparse
-from functools import lru_cache
+
+import requests
+
+# Google stops reading robots.txt after 500 KiB; so do we
+MAX_ROBOTS_BYTES = 500 * 1024
+
+def _origin(url: str) -> str:
+    parsed = urlparse(url)
+    return f"{parsed.scheme}://{parsed.netloc}"
+
+def _parser(status: int, body: str) -> urllib.robotparser.RobotFileParser:
+    """
+    Build a RobotFileParser from a fetched robots.txt: 401/403 and 5xx disallow
+    everything, other 4xx allow everything (RFC 9309).
+    """
+    rp = urllib.robotparser.RobotFileParser()
+    if status in (401, 403) or status >= 500:
+        rp.disallow_all = True
+    elif status >= 400:
+        rp.allow_all = True
+    else:
+        rp.parse(body.splitlines())
+    return rp
 
 class RobotsCache:
     """
     Cache RobotFileParser per origin.
+
+    robots.txt is fetched through the crawl's requests session (pooled, with
+    retries and a timeout). Results are kept for `ttl` seconds and, if `path`
+    is given, persisted as JSON so the next run doesn't refetch them.
+    prefetch() loads robots.txt for a new host on a background thread; ready()
+    tells whether allowed() would answer without blocking.
+
+    An unreachable robots.txt (5xx, network error) disallows the whole origin,
+    but is not cached: retry_in() tells when it is fetched again (backoff from
+    retry_backoff seconds). After `unreachable_retries` more failures the origin
+    stays disallowed for the rest of the run.
     """
-    def __init__(self):
-        self._cache = {}
+    def __init__(self, session=None, headers: dict = None, timeout: float = None, ttl: float = 86400,
+                 path: str = None, prefetch_workers: int = 4, unreachable_retries: int = 3,
+                 retry_backoff: float = 30.0):
+        self.session = session or requests.Session()
+        self.headers = dict(headers or {})
+        self.timeout = timeout if timeout is not None else getattr(self.session, "request_timeout", 10)
+        self.ttl = ttl
+        self.path = Path(path) if path else None
+        self._cache = {}    # origin -> RobotFileParser
+        self._records = {}  # origin -> {"fetched_at", "status", "body"} (persisted)
+        self._pending = {}  # origin -> Future of a prefetch
+        self._failures = {} # origin -> (failed fetches, monotonic time of the next one)
+        self.unreachable_retries = unreachable_retries
+        self.retry_backoff = retry_backoff
+        self._lock = threading.Lock()
+        self._pool = None
+        self._prefetch_workers = prefetch_workers
+        self._dirty = False
+        if self.path is not None and self.path.exists():
+            self._load()
 
-    def allowed(self, user_agent: str, url: str) -> bool:
-        parsed = urlparse(url)
-        origin = f"{parsed.scheme}://{parsed.netloc}"
-        rp = self._cache.get(origin)
-        if rp is None:
-            rp = urllib.robotparser.RobotFileParser()
-            robots_txt = urljoin(origin, "/robots.txt")
-            try:
-                rp.set_url(robots_txt)
-                rp.read()
-            except Exception:
-                # If robots.txt cannot be fetched/parsed, be conservative: allow
-                pass
+    def _load(self):
+        try:
+            with self.path.open("r", encoding="utf-8") as f:
+                records = json.load(f)
+        except (OSError, ValueError):
+            return
+        now = time.time()
+        for origin, rec in records.items():
+            if now - rec.get("fetched_at", 0) < self.ttl:
+                self._records[origin] = rec
+                self._cache[origin] = _parser(rec["status"], rec.get("body", ""))
+
+    def _fetch(self, origin: str):
+        """RobotFileParser for origin, or None if robots.txt is unreachable (5xx, network error)."""
+        try:
+            resp = self.session.get(urljoin(origin, "/robots.txt"), headers=self.headers, timeout=self.timeout)
+            status = resp.status_code
+            body = resp.content[:MAX_ROBOTS_BYTES].decode("utf-8", errors="ignore") if status < 400 else ""
+        except requests.RequestException:
+            return None
+        if status >= 500:
+            return None
+        with self._lock:
+            self._records[origin] = {"fetched_at": time.time(), "status": status, "body": body}
+            self._dirty = True
+        return _parser(status, body)
+
+    def _load_origin(self, origin: str):
+        rp = self._fetch(origin)
+        with self._lock:
+            self._pending.pop(origin, None)
+            if rp is None:
+                # unreachable: disallow everything, and try again after a backoff while retries are left
+                rp = _parser(503, "")
+                n = self._failures.get(origin, (0, 0))[0] + 1
+                if n <= self.unreachable_retries:
+                    self._failures[origin] = (n, time.monotonic() + min(3600, self.retry_backoff * 2 ** (n - 1)))
+                    return rp
+            self._failures.pop(origin, None)
             self._cache[origin] = rp
+        return rp
+
+    def _backing_off(self, origin: str) -> bool:
+        failure = self._failures.get(origin)
+        return failure is not None and failure[1] > time.monotonic()
+
+    def _get(self, url: str):
+        origin = _origin(url)
+        with self._lock:
+            rp = self._cache.get(origin)
+            fut = self._pending.get(origin)
+            if rp is None and fut is None and self._backing_off(origin):
+                return _parser(503, "")
+        if rp is not None:
+            return rp
+        if fut is not None:
+            return fut.result()
+        return self._load_origin(origin)
+
+    def ready(self, url: str) -> bool:
+        """True if robots.txt for url's origin is loaded or unreachable for now (allowed() won't block)."""
+        origin = _origin(url)
+        return origin in self._cache or self._backing_off(origin)
+
+    def retry_in(self, url: str):
+        """Seconds until an unreachable robots.txt of url's origin is fetched again, or None."""
+        failure = self._failures.get(_origin(url))
+        if failure is None:
+            return None
+        return max(0.0, failure[1] - time.monotonic())
+
+    def prefetch(self, url: str):
+        """Start loading robots.txt for url's origin in the background (no-op if known, in flight or backing off)."""
+        origin = _origin(url)
+        with self._lock:
+            if origin in self._cache or origin in self._pending or self._backing_off(origin):
+                return
+            if self._pool is None:
+                self._pool = ThreadPoolExecutor(max_workers=self._prefetch_workers, thread_name_prefix="wikiscrapper-robots")
+            self._pending[origin] = self._pool.submit(self._load_origin, origin)
+
+    def allowed(self, user_agent: str, url: str) -> bool:
+        rp = self._get(url)
         try:
             return rp.can_fetch(user_agent, url)
         except Exception:
             return True
+
+    def delay(self, user_agent: str, url: str):
+        """Seconds between requests asked for by Crawl-delay / Request-rate, or None."""
+        rp = self._get(url)
+        try:
+            delays = []
+            crawl_delay = rp.crawl_delay(user_agent)
+            if crawl_delay is not None:
+                delays.append(float(crawl_delay))
+            rate = rp.request_rate(user_agent)
+            if rate is not None and rate.requests:
+                delays.append(rate.seconds / rate.requests)
+        except Exception:
+            return None
+        return max(delays) if delays else None
+
+    def sitemaps(self, url: str) -> list:
+        """Sitemap: URLs listed in the robots.txt of url's origin."""
+        try:
+            return list(self._get(url).site_maps() or [])
+        except Exception:
+            return []
+
+    def save(self):
+        """Write fetched robots.txt files to path (atomically), if anything changed."""
+        if self.path is None or not self._dirty:
+            return
+        with self._lock:
+            records = dict(self._records)
+            self._dirty = False
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = self.path.with_suffix(".tmp")
+        with tmp.open("w", encoding="utf-8") as f:
+            json.dump(records, f, separators=(",", ":"))
+            f.flush()
+            os.fsync(f.fileno())
+        tmp.replace(self.path)
+
+    def close(self):
+        if self._pool is not None:
+            # drop prefetches that have not started (shutdown's cancel_futures needs Python 3.9)
+            with self._lock:
+                pending = list(self._pending.values())
+            for fut in pending:
+                fut.cancel()
+            self._pool.shutdown(wait=False)
+        self.save()
@@ -0,0 +1,236 @@
+import heapq
+import random
+import time
+from collections import deque
+from urllib.parse import urlparse
+
+
+def host_of(url: str) -> str:
+    return urlparse(url).netloc.lower()
+
+
+class HostScheduler:
+    """
+    Per-host politeness scheduler.
+
+    Instead of a global sleep after every page, each host gets its own
+    "next allowed request" time. Work for a host that is still cooling down
+    is parked here and handed back once the host is ready, so waits on
+    different hosts overlap.
+    """
+    def __init__(self, delay: float = 1.0):
+        self.delay = max(0.0, float(delay or 0.0))
+        self._delays = {}
+        self._next = {}
+        self._parked = {}
+        self._parked_count = 0
+
+    def set_delay(self, host: str, delay: float):
+        self._delays[host] = max(0.0, float(delay))
+
+    def delay_for(self, host: str) -> float:
+        return self._delays.get(host, self.delay)
+
+    def wait_time(self, host: str) -> float:
+        return max(0.0, self._next.get(host, 0.0) - time.monotonic())
+
+    def acquire(self, host: str):
+        """Reserve the next request slot for host (call right before fetching)."""
+        now = time.monotonic()
+        self._next[host] = max(now, self._next.get(host, 0.0)) + self.delay_for(host)
+
+    def release(self, host: str):
+        """Mark a request to host as finished; the delay restarts from now."""
+        self._next[host] = max(self._next.get(host, 0.0), time.monotonic() + self.delay_for(host))
+
+    def defer(self, host: str, seconds: float):
+        """Keep host from being ready for at least `seconds` (e.g. while its robots.txt loads)."""
+        self._next[host] = max(self._next.get(host, 0.0), time.monotonic() + seconds)
+
+    # parked work -----------------------------------------------------------
+
+    def park(self, host: str, item):
+        self._parked.setdefault(host, deque()).append(item)
+        self._parked_count += 1
+
+    def pop_ready(self):
+        """Return a parked item whose host is ready, or None."""
+        for host, items in self._parked.items():
+            if items and self.wait_time(host) <= 0:
+                self._parked_count -= 1
+                item = items.popleft()
+                if not items:
+                    del self._parked[host]
+                return item
+        return None
+
+    def next_ready_in(self):
+        """Seconds until the earliest parked host becomes ready (None if nothing is parked)."""
+        if not self._parked:
+            return None
+        return min(self.wait_time(h) for h in self._parked)
+
+    def pending(self) -> list:
+        return [item for items in self._parked.values() for item in items]
+
+    def __len__(self):
+        return self._parked_count
+
+
+class RateController:
+    """
+    Adaptive per-host request rate (AIMD) between a floor and a ceiling delay.
+
+    A host starts at the ceiling. Until its first overload signal the rate grows
+    by 25% per healthy response (slow start), afterwards by `increase` requests/s.
+    429/503 halve the rate, other server errors cut it by a quarter, and a
+    latency well above the best seen for the host holds it where it is.
+    Delays are what HostScheduler enforces; state() / load() carry them across runs.
+    """
+    def __init__(self, floor: float, ceiling: float, increase: float = 0.1):
+        self.floor = max(0.0, float(floor or 0.0))
+        self.ceiling = max(self.floor, float(ceiling))
+        self.increase = increase
+        self._delays = {}
+        self._floors = {}   # per-host floors (robots.txt Crawl-delay)
+        self._best = {}     # lowest latency seen per host
+        self._ewma = {}
+        self._steady = set()  # hosts past slow start
+        self.changed = False
+
+    def floor_for(self, host: str) -> float:
+        return max(self.floor, self._floors.get(host, 0.0))
+
+    def set_floor(self, host: str, delay: float):
+        self._floors[host] = max(0.0, float(delay))
+        self._set(host, self.delay(host))
+
+    def delay(self, host: str) -> float:
+        return self._delays.get(host, max(self.ceiling, self.floor_for(host)))
+
+    def _set(self, host: str, delay: float) -> float:
+        floor = self.floor_for(host)
+        delay = min(max(delay, floor), max(self.ceiling, floor))
+        if self._delays.get(host) != delay:
+            self._delays[host] = delay
+            self.changed = True
+        return delay
+
+    def on_success(self, host: str, latency: float = None) -> float:
+        d = self.delay(host)
+        if latency is not None:
+            best = self._best[host] = min(self._best.get(host, latency), latency)
+            ewma = self._ewma[host] = latency if host not in self._ewma else 0.8 * self._ewma[host] + 0.2 * latency
+            if ewma > 2 * best + 0.05:
+                # the server is slowing down: don't push harder
+                return d
+        if d <= 0:
+            return d
+        if host in self._steady:
+            return self._set(host, 1.0 / (1.0 / d + self.increase))
+        return self._set(host, d / 1.25)
+
+    def on_overload(self, host: str) -> float:
+        """429 / 503: halve the rate."""
+        self._steady.add(host)
+        return self._set(host, max(2 * self.delay(host), 0.25))
+
+    def on_error(self, host: str) -> float:
+        """Other 5xx, timeouts, connection errors."""
+        self._steady.add(host)
+        return self._set(host, max(self.delay(host) * 4 / 3, 0.1))
+
+    def state(self) -> dict:
+        return {h: {"delay": round(d, 4), "steady": h in self._steady} for h, d in self._delays.items()}
+
+    def load(self, state: dict):
+        for host, entry in (state or {}).items():
+            self._set(host, float(entry.get("delay", self.ceiling)))
+            if entry.get("steady"):
+                self._steady.add(host)
+        self.changed = False
+
+
+# statuses that won't change on a retry
+PERMANENT_STATUSES = frozenset((400, 401, 403, 404, 405, 410, 414, 451))
+
+
+class RetryLane:
+    """
+    Failed fetches waiting for another attempt, outside the main queue.
+
+    A transient failure (timeout, connection error, 5xx, 429, ...) puts the URL
+    back after base * 2**(attempt-1) seconds (+/-25% jitter, at most `cap`, or
+    the server's Retry-After if longer) until max_attempts; the crawl keeps going
+    meanwhile. Permanent failures (404, 410, other client errors listed in
+    PERMANENT_STATUSES) and URLs out of attempts are given up. Attempt counts
+    are carried across a resumed crawl with state() / load().
+    """
+    def __init__(self, max_attempts: int = 4, base: float = 2.0, cap: float = 120.0):
+        self.max_attempts = max(1, int(max_attempts))
+        self.base = base
+        self.cap = cap
+        self.attempts = {}  # url -> failed attempts so far (urls still being retried)
+        self.retried = 0
+        self._heap = []     # (due, seq, url, depth)
+        self._seq = 0
+        self.changed = False
+
+    @staticmethod
+    def is_permanent(status) -> bool:
+        return status in PERMANENT_STATUSES
+
+    def fail(self, url: str, depth: int, status=None, retry_after: float = None):
+        """
+        Record a failed attempt. Returns the seconds until the retry, or None if the
+        url is given up (permanent failure or out of attempts).
+        """
+        if self.is_permanent(status):
+            self.forget(url)
+            return None
+        n = self.attempts.get(url, 0) + 1
+        if n >= self.max_attempts:
+            self.forget(url)
+            return None
+        self.attempts[url] = n
+        self.changed = True
+        delay = min(self.cap, self.base * 2 ** (n - 1)) * random.uniform(0.75, 1.25)
+        if retry_after:
+            delay = max(delay, min(retry_after, 3600))
+        heapq.heappush(self._heap, (time.monotonic() + delay, self._seq, url, depth))
+        self._seq += 1
+        self.retried += 1
+        return delay
+
+    def failed_attempts(self, url: str) -> int:
+        return self.attempts.get(url, 0)
+
+    def forget(self, url: str):
+        """The url succeeded or was given up: drop its attempt count."""
+        if self.attempts.pop(url, None) is not None:
+            self.changed = True
+
+    def pop_ready(self):
+        """Return a (url, depth) whose backoff is over, or None."""
+        if self._heap and self._heap[0][0] <= time.monotonic():
+            _, _, url, depth = heapq.heappop(self._heap)
+            return url, depth
+        return None
+
+    def next_ready_in(self):
+        """Seconds until the next retry is due (None if nothing is waiting)."""
+        if not self._heap:
+            return None
+        return max(0.0, self._heap[0][0] - time.monotonic())
+
+    def state(self) -> dict:
+        self.changed = False
+        return {"attempts": dict(self.attempts)}
+
+    def load(self, state: dict):
+        # waiting urls are back in the frontier's queue after a restart; only their attempt counts are kept
+        self.attempts.update((state or {}).get("attempts") or {})
+        self.changed = False
+
+    def __len__(self):
+        return len(self._heap)
@@ -0,0 +1,186 @@
+import fnmatch
+import re
+import sys
+from urllib.parse import parse_qsl, urlencode
+
+# tracking and session parameters: they never change the page, only multiply its URLs
+DEFAULT_STRIP_PARAMS = (
+    "utm_*", "fbclid", "gclid", "dclid", "msclkid", "mc_cid", "mc_eid", "_ga", "_gl", "yclid",
+    "sessionid", "session_id", "sid", "jsessionid", "phpsessid", "aspsessionid*", "cfid", "cftoken",
+)
+
+# a path or query value that is a number, a date, a hex id or a UUID: the varying part of a URL pattern
+_VARIABLE_RE = re.compile(
+    r"^(\d+|\d{4}-\d{1,2}(-\d{1,2})?|(?=[a-f-]*\d)[0-9a-f]{8,}|[0-9a-f]{8}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{12})$",
+    re.I,
+)
+
+def _split(url: str):
+    """(netloc, path, query) of a normalized url (cheaper than urlsplit on the enqueue path)."""
+    netloc, _, rest = url.partition("://")[2].partition("/")
+    path, _, query = ("/" + rest).partition("?")
+    return netloc, path, query
+
+def url_pattern(url: str):
+    """
+    The url with its varying parts (numbers, dates, ids in the path or query values)
+    replaced by {n}, e.g. example.com/calendar/{n}/{n}?view=month; None if it has none.
+    """
+    netloc, path, query = _split(url)
+    variable = False
+    segments = []
+    for seg in path.split("/"):
+        if seg and _VARIABLE_RE.match(seg):
+            seg = "{n}"
+            variable = True
+        segments.append(seg)
+    params = []
+    for key, value in parse_qsl(query, keep_blank_values=True) if query else ():
+        if value and _VARIABLE_RE.match(value):
+            value = "{n}"
+            variable = True
+        params.append(f"{key}={value}")
+    if not variable:
+        return None
+    pattern = netloc + "/".join(segments)
+    return f"{pattern}?{'&'.join(params)}" if params else pattern
+
+def repeated_segments(segments: list, max_block: int = 4, repeats: int = 3) -> bool:
+    """True if a run of 1..max_block path segments repeats `repeats` times in a row (/a/b/a/b/a/b)."""
+    n = len(segments)
+    for size in range(1, max_block + 1):
+        if size * repeats > n:
+            break
+        for start in range(n - size * repeats + 1):
+            block = segments[start:start + size]
+            if all(segments[start + i * size:start + (i + 1) * size] == block for i in range(1, repeats)):
+                return True
+    return False
+
+class ScopeRules:
+    """
+    Which discovered URLs are worth queueing, decided at enqueue time.
+
+    - include / exclude: regexes matched (re.search) against the whole URL, each
+      list compiled into one alternation; with include rules a URL must match one.
+    - strip_params: query parameter names (globs) removed by canonical().
+    - crawler traps: paths deeper than max_path_depth segments, repeating path
+      segments, and URL patterns (see url_pattern) that already had pattern_cap
+      URLs queued -- calendars, ?page=N pagination, ever-changing ids.
+
+    check() returns the rule that prunes a URL (and counts it for this run's
+    report and the urls_pruned metric) or None; queued() records a URL that
+    made it into the frontier against its pattern's cap. Pruned URLs are
+    remembered (as hashes, up to `remember` of them) so links seen again skip
+    the rules. At most `max_patterns` patterns are counted: past that, the
+    least-seen half is forgotten (they start from zero if they show up again).
+    state() / load() carry the pattern counts across a resumed crawl.
+    """
+    def __init__(self, include=(), exclude=(), strip_params=DEFAULT_STRIP_PARAMS,
+                 max_path_depth: int = 15, pattern_cap: int = 500, metrics=None, remember: int = 200_000,
+                 max_patterns: int = 10_000):
+        self.include = list(include or ())
+        self.exclude = list(exclude or ())
+        self._include = self._compile(self.include)
+        self._exclude = self._compile(self.exclude)
+        strip = [fnmatch.translate(p.lower()) for p in strip_params or ()]
+        self._strip = re.compile("|".join(strip)) if strip else None
+        self.max_path_depth = max_path_depth
+        self.pattern_cap = pattern_cap
+        self.pattern_counts = {}  # url pattern -> URLs queued with it
+        self.max_patterns = max_patterns
+        self.pruned = {}          # rule -> URLs pruned by it (this run)
+        self.metrics = metrics
+        self.remember = remember
+        self._pruned_urls = {}    # hash(url) -> rule
+        self._pattern = (None, None)  # (url, pattern) of the last check, for queued()
+        self.changed = False      # pattern counts changed since the last state()
+
+    @staticmethod
+    def _compile(rules):
+        if not rules:
+            return None
+        # one pass over the URL for all rules; the matching group tells which rule it was
+        try:
+            return re.compile("|".join(f"(?P<r{i}>{rule})" for i, rule in enumerate(rules)))
+        except re.error:
+            for rule in rules:
+                re.compile(rule)  # raises for the culprit
+            raise
+
+    def canonical(self, url: str) -> str:
+        """url without the stripped query parameters."""
+        if self._strip is None or "?" not in url:
+            return url
+        base, _, query = url.partition("?")
+        params = parse_qsl(query, keep_blank_values=True)
+        kept = [(k, v) for k, v in params if not self._strip.match(k.lower())]
+        if len(kept) == len(params):
+            return url
+        return f"{base}?{urlencode(kept, doseq=True)}" if kept else base
+
+    def _rule(self, url: str):
+        if self._exclude is not None:
+            m = self._exclude.search(url)
+            if m:
+                return f"exclude {self.exclude[int(m.lastgroup[1:])]}"
+        if self._include is not None and not self._include.search(url):
+            return "not included"
+        segments = [s for s in _split(url)[1].split("/") if s]
+        if self.max_path_depth and len(segments) > self.max_path_depth:
+            return f"path depth > {self.max_path_depth}"
+        if repeated_segments(segments):
+            return "repeated path segments"
+        if self.pattern_cap:
+            pattern = url_pattern(url)
+            self._pattern = (url, pattern)
+            if pattern is not None and self.pattern_counts.get(pattern, 0) >= self.pattern_cap:
+                return f"page cap {pattern}"
+        return None
+
+    def check(self, url: str):
+        """The rule that prunes url, or None."""
+        key = hash(url)
+        rule = self._pruned_urls.get(key)
+        if rule is not None:
+            return rule
+        rule = self._rule(url)
+        if rule is not None:
+            if len(self._pruned_urls) >= self.remember:
+                self._pruned_urls.clear()
+            rule = self._pruned_urls[key] = sys.intern(rule)
+            self.pruned[rule] = self.pruned.get(rule, 0) + 1
+            if self.metrics is not None:
+                self.metrics.inc("urls_pruned")
+        return rule
+
+    def queued(self, url: str):
+        """Count url (checked and added to the frontier) towards its pattern's cap."""
+        if not self.pattern_cap:
+            return
+        last_url, pattern = self._pattern
+        if last_url != url:
+            pattern = url_pattern(url)
+        if pattern is not None:
+            if pattern not in self.pattern_counts and len(self.pattern_counts) >= self.max_patterns:
+                self._forget_patterns()
+            self.pattern_counts[pattern] = self.pattern_counts.get(pattern, 0) + 1
+            self.changed = True
+
+    def _forget_patterns(self):
+        keep = sorted(self.pattern_counts.items(), key=lambda kv: kv[1], reverse=True)[:self.max_patterns // 2]
+        self.pattern_counts = dict(keep)
+
+    def report(self) -> list:
+        """(rule, URLs pruned) pairs, most first."""
+        return sorted(self.pruned.items(), key=lambda kv: (-kv[1], kv[0]))
+
+    def state(self) -> dict:
+        self.changed = False
+        return {"patterns": dict(self.pattern_counts)}
+
+    def load(self, state):
+        if state:
+            self.pattern_counts.update(state.get("patterns") or {})
+            if len(self.pattern_counts) > self.max_patterns:
+                self._forget_patterns()
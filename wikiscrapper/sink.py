@@ -0,0 +1,412 @@
+import gzip
+import io
+import json
+import os
+import queue
+import threading
+import time
+import zlib
+from pathlib import Path
+
+from rich.console import Console
+
+from .utils import url_to_filepath
+
+console = Console()
+
+SINK_KINDS = ("tree", "jsonl", "jsonl.gz", "jsonl.zst", "bundle")
+
+_STOP = object()
+
+class OutputSink:
+    """
+    Where extracted pages go. write() only queues the page; a background thread
+    writes queued pages in batches, so slow disks never block the crawl loop.
+    Errors are reported on the console and the crawl keeps going (as before);
+    a failed flush / close of the output (e.g. a full disk) is also raised by
+    the next flush() or close().
+    """
+    batch_size = 256
+
+    def __init__(self, max_pending: int = 1024, metrics=None):
+        self.metrics = metrics
+        self._queue = queue.Queue(maxsize=max_pending)
+        self._error = None
+        self._thread = threading.Thread(target=self._run, name="wikiscrapper-writer", daemon=True)
+        self._thread.start()
+        self._closed = False
+
+    def write(self, url: str, text: str) -> str:
+        """Queue a page for writing; returns where it will end up (for messages)."""
+        self._queue.put((url, text))
+        return self.location(url)
+
+    def flush(self):
+        """Block until everything queued so far is on disk."""
+        if self._closed:
+            return
+        done = threading.Event()
+        self._queue.put(done)
+        done.wait()
+        self._raise_error()
+
+    def close(self):
+        if self._closed:
+            return
+        self._closed = True
+        self._queue.put(_STOP)
+        self._thread.join()
+        self._raise_error()
+
+    def _raise_error(self):
+        error, self._error = self._error, None
+        if error is not None:
+            raise error
+
+    def _guard(self, step):
+        # the writer thread must outlive any error: flush() / close() wait for it
+        try:
+            step()
+        except Exception as e:
+            self._error = e
+            console.print(f"[red]Failed to write output:[/red] {e}")
+
+    def _run(self):
+        while True:
+            batch = [self._queue.get()]
+            while len(batch) < self.batch_size:
+                try:
+                    batch.append(self._queue.get_nowait())
+                except queue.Empty:
+                    break
+            pages = [b for b in batch if isinstance(b, tuple)]
+            if pages:
+                t0 = time.perf_counter()
+                try:
+                    self._write_batch(pages)
+                except Exception as e:
+                    console.print(f"[red]Failed to write output:[/red] {e}")
+                if self.metrics is not None:
+                    self.metrics.observe("write", time.perf_counter() - t0)
+                    self.metrics.inc("bytes_out", sum(len(text.encode("utf-8")) for _, text in pages))
+            for b in batch:
+                if isinstance(b, threading.Event):
+                    self._guard(self._sync)
+                    b.set()
+            if _STOP in batch:
+                self._guard(self._sync)
+                self._guard(self._finish)
+                return
+
+    # subclass hooks ------------------------------------------------------------
+
+    def location(self, url: str) -> str:
+        raise NotImplementedError
+
+    def exists(self, url: str) -> bool:
+        """True if url's page is already in the output (used by incremental re-crawls)."""
+        raise NotImplementedError
+
+    def _write_batch(self, pages):
+        raise NotImplementedError
+
+    def _sync(self):
+        pass
+
+    def _finish(self):
+        pass
+
+class KnownUrls:
+    """
+    Which URLs a sink holds, for exists(): a set of URL hashes, forgotten all at
+    once past `limit` entries (a forgotten page is only extracted and written again).
+    """
+    def __init__(self, limit: int = None):
+        self.limit = limit
+        self._hashes = set()
+
+    def add(self, url: str):
+        if self.limit and len(self._hashes) >= self.limit:
+            self._hashes.clear()
+        self._hashes.add(hash(url))
+
+    def update(self, urls):
+        for url in urls:
+            self.add(url)
+
+    def __contains__(self, url: str) -> bool:
+        return hash(url) in self._hashes
+
+    def __len__(self):
+        return len(self._hashes)
+
+class TreeSink(OutputSink):
+    """The classic layout: one file per page under output_dir/<host>/<path>."""
+    def __init__(self, output_dir: str, file_format: str, **kwargs):
+        self.output_dir = output_dir
+        self.file_format = file_format
+        self._dirs = set()     # directories known to exist (writer thread only)
+        self._written = set()  # urls queued and not written yet (then the file answers exists())
+        super().__init__(**kwargs)
+
+    def location(self, url: str) -> str:
+        return url_to_filepath(self.output_dir, url, self.file_format, mkdir=False)
+
+    def exists(self, url: str) -> bool:
+        return url in self._written or os.path.exists(self.location(url))
+
+    def write(self, url: str, text: str) -> str:
+        self._written.add(url)
+        return super().write(url, text)
+
+    def _write_batch(self, pages):
+        for url, text in pages:
+            filepath = self.location(url)
+            parent = os.path.dirname(filepath)
+            if parent not in self._dirs:
+                os.makedirs(parent, exist_ok=True)
+                self._dirs.add(parent)
+            try:
+                with open(filepath, "w", encoding="utf-8") as f:
+                    f.write(text)
+            except Exception as e:
+                console.print(f"[red]Failed to write file:[/red] {e}")
+            self._written.discard(url)
+
+def _open_compressed(path: Path, compression: str):
+    """Append-mode binary stream; gzip members / zstd frames concatenate cleanly."""
+    if compression == "gzip":
+        return gzip.open(path, "ab")
+    if compression == "zstd":
+        return _zstandard().ZstdCompressor().stream_writer(open(path, "ab"), closefd=True)
+    return open(path, "ab")
+
+def _zstandard():
+    try:
+        import zstandard
+    except ImportError as e:
+        raise RuntimeError("zstd output needs the 'zstandard' package (pip install zstandard)") from e
+    return zstandard
+
+def require_sink(kind: str):
+    """Raise RuntimeError if the optional package --sink kind needs is not installed."""
+    if kind == "jsonl.zst":
+        _zstandard()
+
+def _truncation_errors(compression: str) -> tuple:
+    """What reading a compressed file cut off mid-stream (e.g. by a crash) raises."""
+    errors = (EOFError, zlib.error, gzip.BadGzipFile)
+    if compression == "zstd":
+        import zstandard
+        errors += (zstandard.ZstdError,)
+    return errors
+
+def _read_compressed(path: Path, compression: str):
+    if compression == "gzip":
+        return gzip.open(path, "rb")
+    if compression == "zstd":
+        import zstandard
+        raw = zstandard.ZstdDecompressor().stream_reader(open(path, "rb"), read_across_frames=True, closefd=True)
+        return io.BufferedReader(raw)
+    return open(path, "rb")
+
+class JsonlSink(OutputSink):
+    """
+    All pages in one streaming JSON-lines file ({"url", "format", "content"} per line),
+    optionally gzip- or zstd-compressed. Re-written pages are appended again; the last
+    line for a URL wins. max_urls bounds the memory used to tell which URLs it holds
+    (see KnownUrls).
+    """
+    def __init__(self, path: str, file_format: str, compression: str = None, max_urls: int = None, **kwargs):
+        self.path = Path(path)
+        self.file_format = file_format
+        self.compression = compression
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._urls = KnownUrls(max_urls)
+        if self.path.exists():
+            try:
+                self._urls.update(r["url"] for r in _iter_records(self.path, compression))
+            except _truncation_errors(compression):
+                # cut off by a crash: anything appended after the torn stream would be unreadable
+                self._repair()
+            self._end_with_newline()
+        self._f = _open_compressed(self.path, compression)
+        super().__init__(**kwargs)
+
+    def location(self, url: str) -> str:
+        return str(self.path)
+
+    def exists(self, url: str) -> bool:
+        return url in self._urls
+
+    def write(self, url: str, text: str) -> str:
+        self._urls.add(url)
+        return super().write(url, text)
+
+    def _write_batch(self, pages):
+        lines = [
+            json.dumps({"url": url, "format": self.file_format, "content": text}, ensure_ascii=False) + "\n"
+            for url, text in pages
+        ]
+        self._f.write("".join(lines).encode("utf-8"))
+
+    def _sync(self):
+        self._f.flush()
+
+    def _finish(self):
+        self._f.close()
+
+    def _repair(self):
+        """Rewrite the readable records of a torn compressed file as a clean stream."""
+        tmp = self.path.with_name(self.path.name + ".tmp")
+        tmp.unlink(missing_ok=True)
+        out = _open_compressed(tmp, self.compression)
+        try:
+            for r in iter_jsonl(self.path, self.compression):
+                self._urls.add(r["url"])
+                out.write((json.dumps(r, ensure_ascii=False) + "\n").encode("utf-8"))
+        finally:
+            out.close()
+        tmp.replace(self.path)
+
+    def _end_with_newline(self):
+        # an uncompressed file torn mid-line: drop the partial line so the next one isn't glued to it
+        if self.compression or not self.path.stat().st_size:
+            return
+        with self.path.open("rb+") as f:
+            f.seek(-1, os.SEEK_END)
+            if f.read(1) == b"\n":
+                return
+            f.seek(0)
+            data = f.read()
+            f.truncate(data.rfind(b"\n") + 1)
+
+def _iter_records(path, compression: str = None):
+    with _read_compressed(Path(path), compression) as f:
+        for line in f:
+            try:
+                yield json.loads(line)
+            except ValueError:
+                continue
+
+def iter_jsonl(path, compression: str = None):
+    """Records of a JsonlSink file (a torn last line or compressed stream is ignored)."""
+    try:
+        yield from _iter_records(path, compression)
+    except _truncation_errors(compression):
+        return
+
+class BundleSink(OutputSink):
+    """
+    Pages appended to size-capped shard files (shard-NNNNN.<format>, pages separated by
+    a newline) plus index.jsonl with {"url", "shard", "offset", "length"} per page, so a
+    page can be read back with one seek (see BundleReader). Each run starts a new shard.
+    max_urls bounds the memory used to tell which URLs it holds (see KnownUrls).
+    """
+    def __init__(self, root: str, file_format: str, shard_bytes: int = 64 * 1024 * 1024, max_urls: int = None,
+                 **kwargs):
+        self.root = Path(root)
+        self.file_format = file_format
+        self.shard_bytes = shard_bytes
+        self.root.mkdir(parents=True, exist_ok=True)
+        self._urls = KnownUrls(max_urls)
+        self._urls.update(entry["url"] for entry in _iter_bundle_index(self.root))
+        existing = sorted(self.root.glob(f"shard-*.{file_format}"))
+        self._shard_no = int(existing[-1].stem.split("-")[1]) + 1 if existing else 0
+        self._shard = None
+        self._offset = 0
+        self._index = (self.root / "index.jsonl").open("a", encoding="utf-8")
+        super().__init__(**kwargs)
+
+    def location(self, url: str) -> str:
+        return str(self.root)
+
+    def exists(self, url: str) -> bool:
+        return url in self._urls
+
+    def write(self, url: str, text: str) -> str:
+        self._urls.add(url)
+        return super().write(url, text)
+
+    def _open_shard(self):
+        if self._shard is not None:
+            self._shard.close()
+        self._shard_name = f"shard-{self._shard_no:05d}.{self.file_format}"
+        self._shard_no += 1
+        self._shard = (self.root / self._shard_name).open("ab")
+        self._offset = 0
+
+    def _write_batch(self, pages):
+        entries = []
+        for url, text in pages:
+            data = text.encode("utf-8")
+            if self._shard is None or (self._offset and self._offset + len(data) > self.shard_bytes):
+                self._open_shard()
+            self._shard.write(data + b"\n")
+            entries.append(json.dumps(
+                {"url": url, "shard": self._shard_name, "offset": self._offset, "length": len(data)},
+                separators=(",", ":"),
+            ) + "\n")
+            self._offset += len(data) + 1
+        # the index only points at bytes that have been handed to the OS already
+        self._shard.flush()
+        self._index.write("".join(entries))
+
+    def _sync(self):
+        if self._shard is not None:
+            self._shard.flush()
+        self._index.flush()
+
+    def _finish(self):
+        if self._shard is not None:
+            self._shard.close()
+        self._index.close()
+
+def _iter_bundle_index(root):
+    p = Path(root) / "index.jsonl"
+    if p.exists():
+        with p.open("r", encoding="utf-8") as f:
+            for line in f:
+                try:
+                    yield json.loads(line)
+                except ValueError:
+                    continue
+
+def load_bundle_index(root) -> dict:
+    return {entry["url"]: entry for entry in _iter_bundle_index(root)}
+
+class BundleReader:
+    """Random access to the pages of a BundleSink directory."""
+    def __init__(self, root: str):
+        self.root = Path(root)
+        self.index = load_bundle_index(self.root)
+
+    def get(self, url: str):
+        entry = self.index.get(url)
+        if entry is None:
+            return None
+        with (self.root / entry["shard"]).open("rb") as f:
+            f.seek(entry["offset"])
+            return f.read(entry["length"]).decode("utf-8")
+
+    def urls(self) -> list:
+        return list(self.index)
+
+    def __len__(self):
+        return len(self.index)
+
+def make_sink(kind: str, output_dir: str, file_format: str, metrics=None, max_urls: int = None) -> OutputSink:
+    """Build the output sink for --sink (see SINK_KINDS); max_urls bounds the single-file sinks' URL sets."""
+    if kind == "tree":
+        return TreeSink(output_dir, file_format, metrics=metrics)
+    if kind == "jsonl":
+        return JsonlSink(Path(output_dir) / "pages.jsonl", file_format, max_urls=max_urls, metrics=metrics)
+    if kind == "jsonl.gz":
+        return JsonlSink(Path(output_dir) / "pages.jsonl.gz", file_format, compression="gzip", max_urls=max_urls,
+                         metrics=metrics)
+    if kind == "jsonl.zst":
+        return JsonlSink(Path(output_dir) / "pages.jsonl.zst", file_format, compression="zstd", max_urls=max_urls,
+                         metrics=metrics)
+    if kind == "bundle":
+        return BundleSink(Path(output_dir) / "bundle", file_format, max_urls=max_urls, metrics=metrics)
+    raise ValueError(f"Unknown sink '{kind}' (expected one of: {', '.join(SINK_KINDS)})")
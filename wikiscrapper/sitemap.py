@@ -0,0 +1,80 @@
+import zlib
+import xml.etree.ElementTree as ET
+from collections import namedtuple
+from urllib.parse import urljoin, urlparse
+
+import requests
+
+SitemapEntry = namedtuple("SitemapEntry", ["url", "lastmod"])
+
+def _local(tag: str) -> str:
+    return tag.rsplit("}", 1)[-1]
+
+def _decoded_chunks(chunks):
+    """Pass chunks through, gunzipping on the fly if the body is a .xml.gz file."""
+    inflater = None
+    for chunk in chunks:
+        if inflater is None:
+            if not chunk:
+                continue
+            # gzip file served as application/x-gzip (Content-Encoding is already undone by requests)
+            inflater = zlib.decompressobj(wbits=31) if chunk[:2] == b"\x1f\x8b" else False
+        yield inflater.decompress(chunk) if inflater else chunk
+    if inflater:
+        yield inflater.flush()
+
+def parse_sitemap(chunks):
+    """
+    Stream-parse a sitemap or sitemap index from an iterable of byte chunks.
+    Yields ("url", SitemapEntry) for <url> entries and ("sitemap", SitemapEntry)
+    for nested sitemaps in an index. Elements are cleared as they are consumed,
+    so memory stays flat for 50k-entry files.
+    """
+    parser = ET.XMLPullParser(events=("end",))
+    loc = lastmod = None
+    for chunk in _decoded_chunks(chunks):
+        parser.feed(chunk)
+        for event, elem in parser.read_events():
+            name = _local(elem.tag)
+            if name == "loc":
+                loc = (elem.text or "").strip()
+            elif name == "lastmod":
+                lastmod = (elem.text or "").strip() or None
+            elif name in ("url", "sitemap"):
+                if loc:
+                    yield ("url" if name == "url" else "sitemap"), SitemapEntry(loc, lastmod)
+                loc = lastmod = None
+                elem.clear()
+    parser.close()
+
+def iter_sitemap_urls(session, sitemap_urls, headers: dict = None, timeout: int = None, max_files: int = 1000):
+    """
+    Walk sitemaps (following sitemap indexes) and yield SitemapEntry for every page.
+    Unreachable or malformed sitemaps are skipped.
+    """
+    t = timeout if timeout is not None else getattr(session, "request_timeout", 10)
+    pending = list(sitemap_urls)
+    seen = set()
+    while pending and len(seen) < max_files:
+        sm_url = pending.pop(0)
+        if sm_url in seen:
+            continue
+        seen.add(sm_url)
+        try:
+            with session.get(sm_url, headers=headers, timeout=t, stream=True) as resp:
+                if resp.status_code != 200:
+                    continue
+                for kind, entry in parse_sitemap(resp.iter_content(64 * 1024)):
+                    if kind == "sitemap":
+                        pending.append(urljoin(sm_url, entry.url))
+                    else:
+                        yield SitemapEntry(urljoin(sm_url, entry.url), entry.lastmod)
+        except (requests.RequestException, ET.ParseError, zlib.error):
+            continue
+
+def default_sitemaps(start_url: str, robots_sitemaps=()) -> list:
+    """Sitemaps announced in robots.txt, else the conventional /sitemap.xml."""
+    if robots_sitemaps:
+        return list(dict.fromkeys(robots_sitemaps))
+    p = urlparse(start_url)
+    return [f"{p.scheme}://{p.netloc}/sitemap.xml"]
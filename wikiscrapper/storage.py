@@ -1,25 +1,304 @@
+import hashlib
 import json
+import os
 from pathlib import Path
 from typing import Iterable
 
-def save_checkpoint(path: str, visited: Iterable[str], queue: Iterable[tuple]):
-    checkpoint = {
-        "visited": list(visited),
-        "queue": list(queue),
-    }
+def save_checkpoint(path: str, visited: Iterable[str], queue: Iterable[tuple], extra: dict = None):
+    """
+    Write a full checkpoint snapshot atomically (tmp file + rename).
+    """
+    checkpoint = dict(extra or {})
+    checkpoint["visited"] = list(visited)
+    checkpoint["queue"] = list(queue)
     p = Path(path)
     p.parent.mkdir(parents=True, exist_ok=True)
     tmp = p.with_suffix(".tmp")
     with tmp.open("w", encoding="utf-8") as f:
-        json.dump(checkpoint, f, indent=2)
+        json.dump(checkpoint, f, separators=(",", ":"))
+        f.flush()
+        os.fsync(f.fileno())
     tmp.replace(p)
 
-def load_checkpoint(path: str):
+def _read_snapshot(path: str) -> dict:
     p = Path(path)
     if not p.exists():
-        return set(), []
+        return {}
     with p.open("r", encoding="utf-8") as f:
-        data = json.load(f)
-    visited = set(data.get("visited", []))
-    queue = data.get("queue", [])
+        return json.load(f)
+
+def journal_path(path: str) -> Path:
+    return Path(str(path) + ".log")
+
+def load_checkpoint(path: str):
+    """
+    Load a checkpoint: the JSON snapshot (old full-rewrite files included) plus
+    any journal events appended since. Returns (visited set, queue list); queue
+    entries are (url, depth), or (url, depth, priority) for prioritized crawls.
+    """
+    visited, queue, _ = _replay(path)
     return visited, queue
+
+def _replay(path: str):
+    data = _read_snapshot(path)
+    visited = set(data.get("visited", []))
+    extra = {k: v for k, v in data.items() if k not in ("visited", "queue")}
+    queued = {}  # url -> [shallowest depth, highest priority or None]
+
+    def enqueue(url, depth, priority):
+        known = queued.get(url)
+        if known is None:
+            queued[url] = [depth, priority]
+            return
+        known[0] = min(known[0], depth)
+        if priority is not None and (known[1] is None or priority > known[1]):
+            known[1] = priority
+
+    for item in data.get("queue", []):
+        if item[0] not in visited:
+            enqueue(item[0], item[1], item[2] if len(item) > 2 else None)
+    jp = journal_path(path)
+    if jp.exists():
+        with jp.open("r", encoding="utf-8") as f:
+            for line in f:
+                try:
+                    ev = json.loads(line)
+                except ValueError:
+                    # torn last line from a crash mid-write: everything before it is intact
+                    break
+                url = ev.get("u")
+                if ev.get("e") == "v":
+                    visited.add(url)
+                    queued.pop(url, None)
+                elif ev.get("e") == "q" and url not in visited:
+                    enqueue(url, ev.get("d", 0), ev.get("p"))
+                elif ev.get("e") == "x":
+                    extra[ev["k"]] = ev.get("v")
+    queue = [(url, depth) if prio is None else (url, depth, prio) for url, (depth, prio) in queued.items()]
+    return visited, queue, extra
+
+def _trim_torn_tail(jp: Path):
+    """Cut a partial last line left by a crash, so new appends start on a fresh line."""
+    if not jp.exists():
+        return
+    with jp.open("rb+") as f:
+        size = f.seek(0, os.SEEK_END)
+        if size == 0:
+            return
+        f.seek(size - 1)
+        if f.read(1) == b"\n":
+            return
+        f.seek(0)
+        f.truncate(f.read().rfind(b"\n") + 1)
+
+class CheckpointJournal:
+    """
+    Append-only checkpoint: a JSON snapshot at `path` plus a line-per-event log
+    at `path.log` ("v" = visited, "q" = enqueued, with its priority if the crawl
+    is prioritized, "x" = extra state such as
+    learned crawl rates). Each page costs a couple of
+    small appends; the log is folded into a new snapshot once it grows past the
+    snapshot size, so total checkpoint I/O stays linear in the crawl size.
+    Events stay in memory until flush(), so the caller decides when they may
+    reach the disk (e.g. only once the pages they mark visited are written).
+    """
+    def __init__(self, path: str, fresh: bool = False, compact_every: int = 5000):
+        self.path = path
+        self.compact_every = compact_every
+        self.extra = {}
+        self._events = 0
+        self._snapshot_size = 0
+        self._buffer = []
+        p = Path(path)
+        p.parent.mkdir(parents=True, exist_ok=True)
+        if fresh:
+            for stale in (p, journal_path(path)):
+                if stale.exists():
+                    stale.unlink()
+        _trim_torn_tail(journal_path(path))
+        self._log = journal_path(path).open("a", encoding="utf-8")
+
+    def load(self):
+        visited, queue, self.extra = _replay(self.path)
+        self._snapshot_size = len(visited) + len(queue)
+        return visited, queue
+
+    def _append(self, event: dict):
+        self._buffer.append(json.dumps(event, separators=(",", ":")) + "\n")
+        self._events += 1
+
+    def visited(self, url: str):
+        self._append({"e": "v", "u": url})
+
+    def enqueued(self, url: str, depth: int, priority: float = None):
+        event = {"e": "q", "u": url, "d": depth}
+        if priority is not None:
+            event["p"] = priority
+        self._append(event)
+
+    def set_extra(self, key: str, value):
+        """Record a piece of extra state (JSON-serializable); the last value wins on replay."""
+        self.extra[key] = value
+        self._append({"e": "x", "k": key, "v": value})
+
+    def needs_compaction(self) -> bool:
+        return self._events >= max(self.compact_every, self._snapshot_size)
+
+    def flush(self):
+        if self._buffer:
+            self._log.write("".join(self._buffer))
+            self._buffer.clear()
+        self._log.flush()
+
+    def compact(self, visited: Iterable[str], queue: Iterable[tuple], extra: dict = None):
+        """Write a fresh snapshot of the full state and truncate the log."""
+        if extra is not None:
+            self.extra = dict(extra)
+        visited = list(visited)
+        queue = list(queue)
+        self.flush()
+        save_checkpoint(self.path, visited, queue, self.extra)
+        # a crash between the rename above and this truncate only means replaying
+        # events that are already in the snapshot, which is idempotent
+        self._log.close()
+        self._log = journal_path(self.path).open("w", encoding="utf-8")
+        self._events = 0
+        self._snapshot_size = len(visited) + len(queue)
+
+    def close(self):
+        self.flush()
+        self._log.close()
+
+def content_hash(data: bytes) -> str:
+    return hashlib.sha256(data).hexdigest()
+
+class ValidatorStore:
+    """
+    Persistent per-URL validators for incremental re-crawls, keyed by normalized URL:
+    ETag, Last-Modified, a hash of the raw body, the outlinks found on the page, the
+    output settings it was written with, the sitemap <lastmod> it was fetched at and
+    the SimHash of its extracted text. Stored as JSON lines (last entry wins);
+    updates are appended and the file is compacted on close when it has grown.
+    """
+    def __init__(self, path: str):
+        self.path = Path(path)
+        self._entries = {}
+        self._lines = 0
+        if self.path.exists():
+            with self.path.open("r", encoding="utf-8") as f:
+                for line in f:
+                    try:
+                        entry = json.loads(line)
+                    except ValueError:
+                        continue
+                    self._entries[entry["url"]] = entry
+                    self._lines += 1
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        _trim_torn_tail(self.path)
+        self._log = self.path.open("a", encoding="utf-8")
+
+    def get(self, url: str):
+        return self._entries.get(url)
+
+    def items(self):
+        return self._entries.items()
+
+    def conditional_headers(self, url: str) -> dict:
+        entry = self.get(url) or {}
+        headers = {}
+        if entry.get("etag"):
+            headers["If-None-Match"] = entry["etag"]
+        if entry.get("last_modified"):
+            headers["If-Modified-Since"] = entry["last_modified"]
+        return headers
+
+    def put(self, url: str, etag: str = None, last_modified: str = None, content_hash: str = None,
+            outlinks: Iterable[str] = (), settings: str = None, lastmod: str = None, simhash: int = None):
+        entry = {
+            "url": url,
+            "etag": etag,
+            "last_modified": last_modified,
+            "hash": content_hash,
+            "outlinks": list(outlinks),
+            "settings": settings,
+            "lastmod": lastmod,
+            "simhash": simhash,
+        }
+        self._store(url, entry)
+
+    def _store(self, url: str, entry: dict):
+        self._entries[url] = entry
+        self._log.write(json.dumps(entry, separators=(",", ":")) + "\n")
+        self._lines += 1
+
+    def flush(self):
+        self._log.flush()
+
+    def close(self):
+        self._log.close()
+        if self._lines > 2 * len(self._entries):
+            tmp = self.path.with_suffix(".tmp")
+            with tmp.open("w", encoding="utf-8") as f:
+                for entry in self._entries.values():
+                    f.write(json.dumps(entry, separators=(",", ":")) + "\n")
+            tmp.replace(self.path)
+
+    def __len__(self):
+        return len(self._entries)
+
+class SqliteValidatorStore(ValidatorStore):
+    """
+    ValidatorStore kept in an SQLite database instead of memory (used with the disk
+    frontiers, so memory stays flat however many pages the site has). Entries are
+    looked up on demand; writes are committed by flush(). A JSON-lines store at
+    `import_from` is imported the first time, so switching stores keeps the state.
+    """
+    def __init__(self, path: str, import_from: str = None):
+        import sqlite3  # only needed with the disk frontiers
+
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        new = not self.path.exists()
+        self._db = sqlite3.connect(str(self.path), isolation_level=None)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute("PRAGMA synchronous=NORMAL")
+        self._db.execute("PRAGMA cache_size=-8000")  # KiB: bounds the page cache
+        self._db.execute("CREATE TABLE IF NOT EXISTS validators (url TEXT PRIMARY KEY, entry TEXT NOT NULL)")
+        self._db.execute("BEGIN")
+        if new and import_from and Path(import_from).exists():
+            with open(import_from, "r", encoding="utf-8") as f:
+                for line in f:
+                    try:
+                        entry = json.loads(line)
+                    except ValueError:
+                        continue
+                    self._db.execute("INSERT OR REPLACE INTO validators (url, entry) VALUES (?, ?)",
+                                     (entry["url"], line.strip()))
+            self.flush()
+
+    def get(self, url: str):
+        row = self._db.execute("SELECT entry FROM validators WHERE url = ?", (url,)).fetchone()
+        return json.loads(row[0]) if row is not None else None
+
+    def items(self):
+        # a cursor of its own: streamed, not loaded
+        for url, entry in self._db.execute("SELECT url, entry FROM validators"):
+            yield url, json.loads(entry)
+
+    def _store(self, url: str, entry: dict):
+        self._db.execute("INSERT OR REPLACE INTO validators (url, entry) VALUES (?, ?)",
+                         (url, json.dumps(entry, separators=(",", ":"))))
+
+    def flush(self):
+        self._db.execute("COMMIT")
+        self._db.execute("BEGIN")
+
+    def close(self):
+        if self._db is None:
+            return
+        self._db.execute("COMMIT")
+        self._db.close()
+        self._db = None
+
+    def __len__(self):
+        return self._db.execute("SELECT COUNT(*) FROM validators").fetchone()[0]
@@ -1,7 +1,6 @@
 import re
 from urllib.parse import urlparse, urlunparse, parse_qsl, urlencode, urljoin
 from pathlib import Path
-from bs4 import BeautifulSoup
 
 def normalize_url(url: str) -> str:
     p = urlparse(url)
@@ -21,7 +20,7 @@ def slugify_segment(segment: str, max_len: int = 120) -> str:
     seg = re.sub(r'-{2,}', '-', seg)
     return seg.strip('-')[:max_len] or "segment"
 
-def url_to_filepath(output_root: str, url: str, file_format: str) -> str:
+def url_to_filepath(output_root: str, url: str, file_format: str, mkdir: bool = True) -> str:
     p = urlparse(url)
     host = slugify_segment(p.netloc)
     parts = [slugify_segment(s) for s in p.path.split('/') if s and s != '/']
@@ -31,7 +30,8 @@ def url_to_filepath(output_root: str, url: str, file_format: str) -> str:
     else:
         filename = parts[-1]
         dirpath = Path(output_root) / host / Path("/".join(parts[:-1])) if len(parts) > 1 else Path(output_root) / host
-    dirpath.mkdir(parents=True, exist_ok=True)
+    if mkdir:
+        dirpath.mkdir(parents=True, exist_ok=True)
     return str((dirpath / f"{filename}.{file_format}").resolve())
 
 def ensure_relative_link(base_url: str, href: str):
@@ -44,8 +44,13 @@ def detect_best_selector(html: str):
     - Then <main>
     - Then classes that contain 'content', 'docs', 'markdown', 'container'
     - Return a list (ordered) of selectors to try.
+    html may be markup or an already-parsed BeautifulSoup tree.
     """
-    soup = BeautifulSoup(html, "html.parser")
+    if hasattr(html, "find_all"):
+        soup = html
+    else:
+        from bs4 import BeautifulSoup  # utils is imported on light paths too (cli, workers)
+        soup = BeautifulSoup(html, "html.parser")
     selectors = []
     if soup.find("article"):
         selectors.append("article")